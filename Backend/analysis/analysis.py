@@ -1,9 +1,13 @@
 import datetime
 import logging
-from typing import List, Optional
+from typing import List, Optional, Dict
+
+import pandas as pd
+
 from Backend.analysis.patient import Patient
 from Backend.common.database import DBManager
-from Backend.common.omop_enums import OmopPersonFieldsEnum, OmopTableEnum, OmopObservationPeriodFieldsEnum
+from Backend.common.omop_enums import OmopPersonFieldsEnum, OmopTableEnum, OmopObservationPeriodFieldsEnum, \
+    OmopConditionOccurrenceFieldsEnum, OmopMeasurementEnum, SnomedConcepts
 
 
 def evaluate_patient(db_manager: DBManager, patient_id: int) -> Optional[Patient]:
@@ -69,42 +73,141 @@ def evaluate_patient(db_manager: DBManager, patient_id: int) -> Optional[Patient
 def evaluate_patients(db_manager: DBManager, patient_ids: List[int]) -> List[Patient]:
     """
     Evaluates all given patients for having kawasaki or pims.
+    The patients are evaluated in batch (see evaluate_patients_in_batch), so a failed database operation returns no
+    patients at all. Patients with invalid person data are skipped.
 
     :param db_manager: Database-Manager with a running connection to the database
     :param patient_ids: list of patient ids
-    :return: List of patients
+    :return: List of patients, empty if the evaluation failed
     """
     patients: List[Patient] = list()
     try:
         logging.info(f"Evaluating {len(patient_ids)} patients.")
-        patients = list()
-        for patient_id in patient_ids:
-            patient = evaluate_patient(db_manager, patient_id)
-            if patient:
-                patients.append(patient)
+        patients = evaluate_patients_in_batch(db_manager, patient_ids)
         logging.info(f"Finished evaluating {len(patient_ids)} patients.")
-    except TypeError:
-        # None returned
-        logging.error("Error during evaluation. List of Patients might be incomplete")
+    except (TypeError, AttributeError):
+        logging.error("Error during evaluation. No patients were evaluated.")
     return patients
 
 
+def evaluate_patients_in_batch(db_manager: DBManager, patient_ids: Optional[List[int]] = None) -> List[Patient]:
+    """
+    Evaluates the given patients (or all patients in the database) for having kawasaki or pims.
+    Unlike evaluate_patient this needs one query per table (person, observation_period, condition_occurrence and
+    measurement) for all patients together. The rows are grouped by person id and the patients are built from the
+    grouped values.
+
+    :param db_manager: Database-Manager with a running connection to the database
+    :param patient_ids: list of patient ids or None for all patients in the database
+    :return: List of patients in the order of the person table
+    :raises AttributeError: If a database operation fails
+    """
+    schema: str = db_manager.DB_SCHEMA
+    person_id_field: str = OmopPersonFieldsEnum.PERSON_ID.value
+    if patient_ids is None:
+        condition: str = ""
+    elif len(patient_ids) == 0:
+        return list()
+    else:
+        ids: str = ",".join(str(int(patient_id)) for patient_id in patient_ids)
+        condition: str = f" WHERE {person_id_field} IN ({ids})"
+
+    # Get basic person data
+    query = f"SELECT {person_id_field}, {OmopPersonFieldsEnum.DAY_OF_BIRTH.value}, " \
+            f"{OmopPersonFieldsEnum.MONTH_OF_BIRTH.value}, {OmopPersonFieldsEnum.YEAR_OF_BIRTH.value}, " \
+            f"{OmopPersonFieldsEnum.PERSON_SOURCE_VALUE.value} FROM {schema}.{OmopTableEnum.PERSON.value}{condition}"
+    person_df: pd.DataFrame = db_manager.send_query(query)
+
+    # Get latest case date of every patient from the observation periods
+    query = f"SELECT {OmopObservationPeriodFieldsEnum.PERSON_ID.value}, " \
+            f"MAX({OmopObservationPeriodFieldsEnum.END_DATE.value}) AS case_date " \
+            f"FROM {schema}.{OmopTableEnum.OBSERVATION_PERIOD.value}{condition} " \
+            f"GROUP BY {OmopObservationPeriodFieldsEnum.PERSON_ID.value}"
+    case_dates: Dict[int, datetime.date] = db_manager.send_query(query).set_index(person_id_field)['case_date'] \
+        .to_dict()
+
+    # Get all conditions of every patient
+    query = f"SELECT {OmopConditionOccurrenceFieldsEnum.PERSON_ID.value}, " \
+            f"{OmopConditionOccurrenceFieldsEnum.CONDITION_CONCEPT_ID.value} " \
+            f"FROM {schema}.{OmopTableEnum.CONDITION_OCCURRENCE.value}{condition}"
+    conditions: Dict[int, list] = _group_by_person(db_manager.send_query(query),
+                                                   OmopConditionOccurrenceFieldsEnum.CONDITION_CONCEPT_ID.value)
+
+    # Get all measurements with a high value of every patient
+    # For Kawasaki and PIMS only high lab results seem to be relevant for other diseases the concepts for
+    # normal = 4124457 and low = 4267416 should be checked
+    high_condition: str = f"{OmopMeasurementEnum.VALUE_CONCEPT.value} = {SnomedConcepts.HIGH.value}"
+    high_condition = f"{condition} AND {high_condition}" if condition else f" WHERE {high_condition}"
+    query = f"SELECT {OmopMeasurementEnum.PERSON_ID.value}, {OmopMeasurementEnum.CONCEPT_ID.value} " \
+            f"FROM {schema}.{OmopTableEnum.MEASUREMENT.value}{high_condition}"
+    high_measurements: Dict[int, list] = _group_by_person(db_manager.send_query(query),
+                                                          OmopMeasurementEnum.CONCEPT_ID.value)
+
+    patients: List[Patient] = list()
+    missing_case_dates: int = 0
+    invalid_patients: int = 0
+    today: datetime.date = datetime.date.today()
+    for person_id, day, month, year, name in person_df.itertuples(index=False, name=None):
+        # A single invalid person (e.g. without a year of birth) shouldn't abort the analysis of all others.
+        # Columns with missing values are read as floats, therefore the parts of the birthdate are cast to int.
+        try:
+            birthdate: datetime.date = datetime.date(int(year), int(month), int(day))
+        except (TypeError, ValueError) as error:
+            invalid_patients += 1
+            logging.warning(f"Could not evaluate the patient {person_id}: {error}")
+            continue
+
+        case_date = case_dates.get(person_id)
+        if case_date is None or pd.isna(case_date):
+            missing_case_dates += 1
+            case_date = today
+
+        # Create patient object from the grouped query results
+        patient = Patient(patient_id=person_id, name=name, birthdate=birthdate, case_date=case_date)
+        for concept_id in conditions.get(person_id, ()):
+            patient.add_condition(concept_id)
+        for concept_id in high_measurements.get(person_id, ()):
+            patient.add_high_measurement(concept_id)
+
+        patient.calculate_kawasaki_score()
+        patient.calculate_pims_score()
+        patients.append(patient)
+
+    if missing_case_dates > 0:
+        logging.warning(f"Could not find a valid case date for {missing_case_dates} patients. Using today.")
+    if invalid_patients > 0:
+        logging.warning(f"Skipped {invalid_patients} patients with invalid person data.")
+    return patients
+
+
+def _group_by_person(df: pd.DataFrame, value_field: str) -> Dict[int, list]:
+    """
+    Groups the values of the given field by person id.
+
+    :param df: dataframe with the column 'person_id' and the given field
+    :param value_field: column name of the values
+    :return: dict mapping every person id to the list of its values
+    """
+    if df.empty:
+        return dict()
+    return df.groupby(OmopPersonFieldsEnum.PERSON_ID.value, sort=False)[value_field].agg(list).to_dict()
+
+
 def evaluate_all_in_database(db_manager: DBManager) -> List[Patient]:
     """
     Evaluates all patients currently stored in the database.
+    The patients are evaluated in batch (see evaluate_patients_in_batch), so a failed database operation returns no
+    patients at all. Patients with invalid person data are skipped.
 
     :param db_manager: DatabaseManager with an active connection to the database
-    :return: List of patients
+    :return: List of patients, empty if the evaluation failed
     """
     patients: List[Patient] = list()
     try:
         # load all patient_ids from db as patient_ids
         logging.info("Evaluating all patients currently in the given OMOP-Database.")
-        query = f"SELECT {OmopPersonFieldsEnum.PERSON_ID.value} FROM {db_manager.DB_SCHEMA}.{OmopTableEnum.PERSON.value}"
-        df = db_manager.send_query(query)
-        patient_ids = df['person_id'].values.tolist()
-        patients = evaluate_patients(db_manager, patient_ids)
-        logging.info(f"Finished evaluating all patients currently in the database.")
+        patients = evaluate_patients_in_batch(db_manager)
+        logging.info(f"Finished evaluating all {len(patients)} patients currently in the database.")
     except (TypeError, AttributeError):
-        logging.error("Error during evaluation. List of Patients might be incomplete")
+        logging.error("Error during evaluation. No patients were evaluated.")
     return patients
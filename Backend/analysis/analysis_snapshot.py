@@ -0,0 +1,171 @@
+import datetime
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from Backend.analysis.patient import Patient
+from Backend.common.omop_enums import OmopTableEnum, OmopPersonFieldsEnum, OmopObservationPeriodFieldsEnum, \
+    OmopConditionOccurrenceFieldsEnum, OmopMeasurementEnum
+from config.definitions import ROOT_DIR
+
+# Default location of the snapshot file
+DEFAULT_ANALYSIS_SNAPSHOT_PATH: str = os.path.join(ROOT_DIR, "data", "analysis", "analysis_snapshot.npz")
+# Tables the analysis reads from, with the column that holds their ids
+FINGERPRINT_TABLES: Dict[str, str] = {
+    OmopTableEnum.PERSON.value: OmopPersonFieldsEnum.PERSON_ID.value,
+    OmopTableEnum.OBSERVATION_PERIOD.value: OmopObservationPeriodFieldsEnum.ID.value,
+    OmopTableEnum.CONDITION_OCCURRENCE.value: OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value,
+    OmopTableEnum.MEASUREMENT.value: OmopMeasurementEnum.ID.value
+}
+
+
+def get_database_fingerprint(db_manager) -> dict:
+    """
+    Gets a fingerprint of the analyzed data in the database: the schema and the row count and highest id of every table
+    the analysis reads from.
+    Changes made by inserting or deleting rows are detected. Updates of existing rows are not.
+
+    :param db_manager: DBManager with an active connection to the database
+    :return: the fingerprint as a json serializable dict
+    :raises AttributeError: If the database operation fails
+    """
+    return {
+        'db_schema': db_manager.DB_SCHEMA,
+        'tables': db_manager.get_table_fingerprint(FINGERPRINT_TABLES)
+    }
+
+
+class AnalysisSnapshot:
+    """
+    Evaluated patients of the whole database together with the fingerprint of the database they were evaluated from.
+    The snapshot is saved as a (compressed) numpy .npz file with one array per patient attribute. The conditions and
+    measurements of all patients are stored as one flat array each, split by offsets.
+    """
+
+    # Has to be increased whenever the layout of the file changes
+    FORMAT_VERSION: int = 1
+
+    def __init__(self, patients: List[Patient], fingerprint: dict):
+        """
+        Creates a new snapshot.
+
+        :param patients: evaluated patients
+        :param fingerprint: fingerprint of the database, see get_database_fingerprint
+        """
+        self.patients: List[Patient] = patients
+        self.fingerprint: dict = fingerprint
+
+    def matches(self, fingerprint: dict) -> bool:
+        """
+        Checks whether the snapshot was created from a database with the given fingerprint.
+
+        :param fingerprint: current fingerprint of the database
+        :return: True if the fingerprints are equal
+        """
+        return self.fingerprint == fingerprint
+
+    def save(self, path: str = DEFAULT_ANALYSIS_SNAPSHOT_PATH):
+        """
+        Saves the snapshot to the given path.
+
+        :param path: path of the .npz file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        patients = self.patients
+        metadata = {
+            'format_version': self.FORMAT_VERSION,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'fingerprint': self.fingerprint
+        }
+        arrays: Dict[str, np.ndarray] = {
+            'metadata': np.array(json.dumps(metadata)),
+            'ids': np.array([patient.id for patient in patients], dtype=np.int64),
+            'names': np.array([patient.name if patient.name is not None else "" for patient in patients], dtype=str),
+            'birthdates': np.array([patient.birthdate.toordinal() for patient in patients], dtype=np.int64),
+            'case_dates': np.array([patient.case_date.toordinal() for patient in patients], dtype=np.int64),
+            'kawasaki_scores': np.array([patient.kawasaki_score for patient in patients], dtype=np.float64),
+            'pims_scores': np.array([patient.pims_score for patient in patients], dtype=np.float64),
+            'reason_codes': np.array([patient.reason_codes for patient in patients], dtype=np.int64).reshape(-1, 4)
+        }
+        for name in ('conditions', 'high_measurements'):
+            id_arrays = [getattr(patient, name) for patient in patients]
+            arrays[f"{name}_offsets"] = np.cumsum([0] + [len(ids) for ids in id_arrays], dtype=np.int64)
+            arrays[name] = np.concatenate([np.frombuffer(ids, dtype=np.int64) for ids in id_arrays]) \
+                if id_arrays else np.zeros(0, dtype=np.int64)
+
+        # Write to a temporary file first, so an existing snapshot is never left half written
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        logging.info(f"Saved analysis snapshot with {len(patients)} patients to {path}.")
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_ANALYSIS_SNAPSHOT_PATH) -> "AnalysisSnapshot":
+        """
+        Loads a snapshot from the given path.
+
+        :param path: path of the .npz file
+        :return: the loaded snapshot
+        :raises ValueError: If the file is not a valid snapshot or has an unsupported format version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            try:
+                metadata: dict = json.loads(str(data['metadata']))
+            except KeyError:
+                raise ValueError(f"{path} is not an analysis snapshot.")
+            if metadata.get('format_version') != cls.FORMAT_VERSION:
+                raise ValueError(f"Unsupported format version {metadata.get('format_version')} of the analysis "
+                                 f"snapshot {path}. Expected version {cls.FORMAT_VERSION}.")
+            arrays: Dict[str, np.ndarray] = {name: data[name] for name in data.files if name != 'metadata'}
+
+        conditions = np.split(arrays['conditions'], arrays['conditions_offsets'][1:-1])
+        high_measurements = np.split(arrays['high_measurements'], arrays['high_measurements_offsets'][1:-1])
+        patients: List[Patient] = list()
+        for index, patient_id in enumerate(arrays['ids'].tolist()):
+            patient = Patient(patient_id=patient_id,
+                              name=str(arrays['names'][index]),
+                              birthdate=datetime.date.fromordinal(int(arrays['birthdates'][index])),
+                              case_date=datetime.date.fromordinal(int(arrays['case_dates'][index])))
+            for condition in conditions[index].tolist():
+                patient.add_condition(condition)
+            for measurement in high_measurements[index].tolist():
+                patient.add_high_measurement(measurement)
+            patient.kawasaki_score = float(arrays['kawasaki_scores'][index])
+            patient.pims_score = float(arrays['pims_scores'][index])
+            patient.reason_codes = arrays['reason_codes'][index].tolist()
+            patients.append(patient)
+        logging.info(f"Loaded analysis snapshot with {len(patients)} patients from {path}.")
+        return cls(patients, metadata['fingerprint'])
+
+
+def remove_snapshot(path: str = DEFAULT_ANALYSIS_SNAPSHOT_PATH):
+    """
+    Removes the snapshot at the given path, if it exists.
+
+    :param path: path of the .npz file
+    """
+    try:
+        os.remove(path)
+        logging.info(f"Removed outdated analysis snapshot {path}.")
+    except FileNotFoundError:
+        pass
+
+
+def try_load_snapshot(path: str = DEFAULT_ANALYSIS_SNAPSHOT_PATH) -> Optional[AnalysisSnapshot]:
+    """
+    Loads the snapshot at the given path, if it exists and is readable.
+
+    :param path: path of the .npz file
+    :return: the snapshot or None if it can't be loaded
+    """
+    try:
+        return AnalysisSnapshot.load(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as error:
+        logging.warning(f"Could not load the analysis snapshot {path}.")
+        logging.warning(error)
+        return None
@@ -1,19 +1,142 @@
 import datetime
+from array import array
+from bisect import bisect_left
+from enum import IntEnum
+from typing import Dict, FrozenSet, List, Tuple
 
 from Backend.common.omop_enums import SnomedConcepts
 
+# Ids of the conditions and measurements that belong to a symptom group
+FEVER_IDS: FrozenSet[int] = frozenset({SnomedConcepts.FEVER.value,
+                                       SnomedConcepts.FEVER_WITH_CHILLS.value,
+                                       SnomedConcepts.FEBRILE_CONVULSIONS.value,
+                                       SnomedConcepts.CONTINUOUS_FEVER.value})
+EXANTHEM_IDS: FrozenSet[int] = frozenset({SnomedConcepts.ERUPTION.value,
+                                          SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_VIRUS.value,
+                                          SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_OTHER_VIRUSES.value})
+ENANTHEM_IDS: FrozenSet[int] = frozenset({SnomedConcepts.DISORDER_OF_ORAL_SOFT_TISSUE.value,
+                                          SnomedConcepts.DISORDER_OF_LIP.value,
+                                          SnomedConcepts.LESION_OF_ORAL_MUCOSA.value,
+                                          SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_VIRUS.value,
+                                          SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_OTHER_VIRUSES.value})
+SWOLLEN_EXTREMITIES_IDS: FrozenSet[int] = frozenset({SnomedConcepts.SWELLING.value,
+                                                     SnomedConcepts.SWELLING_UPPER_LIMB.value,
+                                                     SnomedConcepts.SWELLING_LOWER_LIMB.value})
+CONJUNCTIVITIS_IDS: FrozenSet[int] = frozenset({SnomedConcepts.OTHER_CONJUNCTIVITIS.value,
+                                                SnomedConcepts.MUCOPURULENT_CONJUNCTIVITIS.value,
+                                                SnomedConcepts.ACUTE_CONJUNCTIVITIS.value})
+LYMPHADENOPATHY_IDS: FrozenSet[int] = frozenset({SnomedConcepts.LYMPHADENOPATHY.value,
+                                                 SnomedConcepts.LOCALIZED_ENLARGED_LYMPH_NODES.value,
+                                                 SnomedConcepts.GENERALIZED_ENLARGED_LYMPH_NODES.value})
+# I30: Akute Perikarditis: .0 (315293) .1 (4217075) .8/.9 (320116)
+# I21: Akuter Myokardinfarkt: .0 (434376) .1 (438170) .2/.3 (312327) .4 (4270024) .9 (312327)
+# I40: Myokariditis: .0 (4331309) .1 (4143969) .8/.9 (312653)
+CARDIAC_CONDITION_IDS: FrozenSet[int] = frozenset({SnomedConcepts.PERICARDITIS.value, 4217075, 320116,
+                                                   SnomedConcepts.MYOCARDIAL_INFARCTION.value, 438170, 312327,
+                                                   4270024,
+                                                   SnomedConcepts.MYOCARDITIS.value, 4143969, 312653,
+                                                   SnomedConcepts.PERICARDIAL_EFFUSION})
+# Nausea and vomiting (ICD10GM R11 --> SNOMED-ID 27674)
+# (lower) Abdominal Pain (ICD10GM R10.3, R10.4, R10 --> SNOMED-ID 4182562, 200219, 4116811)
+# (Severe) Diarrhea (and vomiting) (SNOMED-ID 196523, 4091519, 4249551, 196151)
+GASTRO_INTESTINAL_CONDITION_IDS: FrozenSet[int] = frozenset({SnomedConcepts.NAUSEA_AND_VOMITING.value,
+                                                             4182562, 200219, 4116811, 196523, 4091519, 4249551,
+                                                             196151})
+EFFUSION_IDS: FrozenSet[int] = frozenset({SnomedConcepts.ASCITES.value,
+                                          SnomedConcepts.PLEURAL_EFFUSION.value,
+                                          SnomedConcepts.PERICARDIAL_EFFUSION.value})
+COVID_IDS: FrozenSet[int] = frozenset({SnomedConcepts.COVID_19.value,
+                                       SnomedConcepts.COVID_19_VIRUS_NOT_IDENTIFIED.value,
+                                       SnomedConcepts.COVID_19_IN_PERSONAL_HISTORY.value,
+                                       SnomedConcepts.POST_COVID.value})
+KAWASAKI_IDS: FrozenSet[int] = frozenset({SnomedConcepts.KAWASAKI.value})
+PIMS_IDS: FrozenSet[int] = frozenset({SnomedConcepts.PIMS.value})
+# CRP (different methods): (LOINC 1988-5, 71426-1 -> LOINC-Ids 3020460, 42870365)
+# Erythrocyte sedimentation rate: (4537-7 -> 3013707)
+# Leukocytes: (6690-2 -> 3000905)
+# Procalictonin (33959-8 -> 3046279)
+INFLAMMATION_LAB_IDS: FrozenSet[int] = frozenset({3020460, 42870365, 3013707, 3000905, 3046279})
+COAGULOPATHY_IDS: FrozenSet[int] = frozenset({SnomedConcepts.PTT_BLOOD.value,
+                                              SnomedConcepts.PTT_PLASMA.value,
+                                              SnomedConcepts.D_DIMER.value,
+                                              SnomedConcepts.PT.value})
+
+
+class SymptomGroup(IntEnum):
+    """
+    Symptom groups of a patient. The value is the position of the group's bit in the symptom bitmask of a patient.
+    """
+    FEVER = 0
+    EXANTHEM = 1
+    ENANTHEM = 2
+    SWOLLEN_EXTREMITIES = 3
+    CONJUNCTIVITIS = 4
+    LYMPHADENOPATHY = 5
+    CARDIAC_CONDITION = 6
+    GASTRO_INTESTINAL_CONDITION = 7
+    INFLAMMATION_LAB = 8
+    COVID = 9
+    KAWASAKI = 10
+    PIMS = 11
+    COAGULOPATHY = 12
+    EFFUSION = 13
+
+    @property
+    def bit(self) -> int:
+        return 1 << self.value
+
+
+def _build_symptom_bits(groups: Dict[SymptomGroup, FrozenSet[int]]) -> Dict[int, int]:
+    """
+    Maps every id of the given groups to the bitmask of all groups it belongs to.
+    """
+    symptom_bits: Dict[int, int] = dict()
+    for group, ids in groups.items():
+        for concept_id in ids:
+            symptom_bits[concept_id] = symptom_bits.get(concept_id, 0) | group.bit
+    return symptom_bits
+
+
+# Bitmask of the symptom groups for every condition and (high) measurement id
+CONDITION_SYMPTOM_BITS: Dict[int, int] = _build_symptom_bits({
+    SymptomGroup.FEVER: FEVER_IDS,
+    SymptomGroup.EXANTHEM: EXANTHEM_IDS,
+    SymptomGroup.ENANTHEM: ENANTHEM_IDS,
+    SymptomGroup.SWOLLEN_EXTREMITIES: SWOLLEN_EXTREMITIES_IDS,
+    SymptomGroup.CONJUNCTIVITIS: CONJUNCTIVITIS_IDS,
+    SymptomGroup.LYMPHADENOPATHY: LYMPHADENOPATHY_IDS,
+    SymptomGroup.CARDIAC_CONDITION: CARDIAC_CONDITION_IDS,
+    SymptomGroup.GASTRO_INTESTINAL_CONDITION: GASTRO_INTESTINAL_CONDITION_IDS,
+    SymptomGroup.COVID: COVID_IDS,
+    SymptomGroup.KAWASAKI: KAWASAKI_IDS,
+    SymptomGroup.PIMS: PIMS_IDS,
+    SymptomGroup.EFFUSION: EFFUSION_IDS
+})
+MEASUREMENT_SYMPTOM_BITS: Dict[int, int] = _build_symptom_bits({
+    SymptomGroup.INFLAMMATION_LAB: INFLAMMATION_LAB_IDS,
+    SymptomGroup.COAGULOPATHY: COAGULOPATHY_IDS
+})
+
 
 class Patient:
     """
     Representation of patient. Has an id as a unique identifier.
-    A patient also has a birthdate (a combination of year, month and day of birth) and lists of conditions, measurements
-    and procedures. New elements can be added to these lists using the setters.
+    A patient also has a birthdate (a combination of year, month and day of birth) and sorted arrays of the distinct ids
+    of its conditions, measurements and procedures. New elements have to be added using the setters.
 
     The has_X() methods return a boolean stating whether or not a patient has the type of condition described by 'X'.
+    They only test a bit of the symptom bitmask, that is updated whenever a condition or measurement is added.
     The methods calculate_pims_score() and calculate_kawasaki_score() can be used to calculate a likelihood for that
     disease, taking the patients condition, age, etc. into account.
+
+    Patients are kept in memory for a whole cohort, so the representation is kept compact: The attributes are stored in
+    slots, the ids in int64 arrays and the reasons for and against a disease as bitmasks over the REASON strings.
     """
 
+    __slots__ = ('id', 'name', 'birthdate', 'case_date', 'conditions', 'high_measurements', 'procedures', 'symptoms',
+                 'kawasaki_score', 'pims_score', '_reasons_for_kawasaki', '_missing_for_kawasaki', '_reasons_for_pims',
+                 '_missing_for_pims')
+
     # Static fields for Strings that detail a reason for an increased likelihood for PIMS or Kawasaki disease
     REASON_YOUNGER_THAN_EIGHT: str = "0-7 Jahre alt"
     REASON_YOUNGER_THAN_TWENTY: str = "0-19 Jahre alt"
@@ -32,6 +155,17 @@ class Patient:
     REASON_KAWASAKI_SYMPTOMS: str = "Exanthem, Enanthem, Konjunktivitis oder geschwollene, gerötete Extremitäten"
     REASON_COAGULOPATHY = "Gerinnungsstörung"
 
+    # Possible reasons in the order they are listed. The position of a reason is its bit in the reason bitmasks
+    KAWASAKI_REASONS: Tuple[str, ...] = (REASON_YOUNGER_THAN_EIGHT, REASON_FEVER, REASON_EXANTHEM,
+                                         REASON_SWOLLEN_EXTREMITIES, REASON_CONJUNCTIVITIS, REASON_SWOLLEN_LYMPHNODES,
+                                         REASON_ENANTHEM, REASON_KAWASAKI)
+    PIMS_REASONS: Tuple[str, ...] = (REASON_YOUNGER_THAN_TWENTY, REASON_FEVER, REASON_KAWASAKI,
+                                     REASON_KAWASAKI_SYMPTOMS, REASON_CARDIAL_CONDITION, REASON_COAGULOPATHY,
+                                     REASON_GASTRO_INTESTINAL_CONDITION, REASON_COVID, REASON_INFLAMMATION_LAB,
+                                     REASON_PIMS)
+    _KAWASAKI_REASON_BITS: Dict[str, int] = {reason: 1 << bit for bit, reason in enumerate(KAWASAKI_REASONS)}
+    _PIMS_REASON_BITS: Dict[str, int] = {reason: 1 << bit for bit, reason in enumerate(PIMS_REASONS)}
+
     def __init__(self, patient_id: int, name: str, birthdate: datetime.date, case_date: datetime.date):
         """
         Creates a new patient.
@@ -44,19 +178,61 @@ class Patient:
         self.id: int = patient_id
         self.name: str = name
         self.birthdate: datetime.date = birthdate
-        self.day: int = birthdate.day
-        self.month: int = birthdate.month
-        self.year: int = birthdate.year
         self.case_date: datetime.date = case_date
-        self.conditions = list()
-        self.high_measurements = list()
-        self.procedures = list()
+        self.conditions: array = array('q')
+        self.high_measurements: array = array('q')
+        self.procedures: array = array('q')
+        # Bitmask of the SymptomGroups of all conditions and measurements
+        self.symptoms: int = 0
         self.kawasaki_score: float = 0.0
         self.pims_score: float = 0.0
-        self.reasons_for_kawasaki = list()
-        self.missing_for_kawasaki = list()
-        self.reasons_for_pims = list()
-        self.missing_for_pims = list()
+        # Bitmasks over KAWASAKI_REASONS and PIMS_REASONS
+        self._reasons_for_kawasaki: int = 0
+        self._missing_for_kawasaki: int = 0
+        self._reasons_for_pims: int = 0
+        self._missing_for_pims: int = 0
+
+    @property
+    def day(self) -> int:
+        return self.birthdate.day
+
+    @property
+    def month(self) -> int:
+        return self.birthdate.month
+
+    @property
+    def year(self) -> int:
+        return self.birthdate.year
+
+    @property
+    def reasons_for_kawasaki(self) -> List[str]:
+        return _decode_reasons(self._reasons_for_kawasaki, self.KAWASAKI_REASONS)
+
+    @property
+    def missing_for_kawasaki(self) -> List[str]:
+        return _decode_reasons(self._missing_for_kawasaki, self.KAWASAKI_REASONS)
+
+    @property
+    def reasons_for_pims(self) -> List[str]:
+        return _decode_reasons(self._reasons_for_pims, self.PIMS_REASONS)
+
+    @property
+    def missing_for_pims(self) -> List[str]:
+        return _decode_reasons(self._missing_for_pims, self.PIMS_REASONS)
+
+    @property
+    def reason_codes(self) -> Tuple[int, int, int, int]:
+        """
+        Bitmasks of the reasons for and missing for kawasaki and pims, see KAWASAKI_REASONS and PIMS_REASONS.
+
+        :return: tuple (reasons for kawasaki, missing for kawasaki, reasons for pims, missing for pims)
+        """
+        return self._reasons_for_kawasaki, self._missing_for_kawasaki, self._reasons_for_pims, self._missing_for_pims
+
+    @reason_codes.setter
+    def reason_codes(self, codes: Tuple[int, int, int, int]):
+        self._reasons_for_kawasaki, self._missing_for_kawasaki, self._reasons_for_pims, self._missing_for_pims = \
+            (int(code) for code in codes)
 
     def __str__(self):
         return f"{self.id}: {self.day}-{self.month}-{self.year}, Kawsawki: {self.kawasaki_score}, " \
@@ -64,30 +240,34 @@ class Patient:
 
     def add_condition(self, condition):
         """
-        Adds the condition to the list of conditions for the patient.
+        Adds the condition to the conditions of the patient, if it is not already present.
 
         :param condition: condition to be added
         :return: void
         """
-        self.conditions.append(condition)
+        condition = int(condition)
+        if _insert_sorted(self.conditions, condition):
+            self.symptoms |= CONDITION_SYMPTOM_BITS.get(condition, 0)
 
     def add_high_measurement(self, measurement):
         """
-        Adds the abnormally high measurement to the list of measurements for the patient.
+        Adds the abnormally high measurement to the measurements of the patient, if it is not already present.
 
         :param measurement: measurement to be added
         :return: void
         """
-        self.high_measurements.append(measurement)
+        measurement = int(measurement)
+        if _insert_sorted(self.high_measurements, measurement):
+            self.symptoms |= MEASUREMENT_SYMPTOM_BITS.get(measurement, 0)
 
     def add_procedure(self, procedure):
         """
-        Adds the procedure to the list of procedures of the patient.
+        Adds the procedure to the procedures of the patient, if it is not already present.
 
         :param procedure: procedure to be added
         :return: void
         """
-        self.procedures.append(procedure)
+        _insert_sorted(self.procedures, int(procedure))
 
     def calculate_age(self) -> int:
         """
@@ -97,16 +277,15 @@ class Patient:
         """
         return self.case_date.year - self.year - ((self.case_date.month, self.case_date.day) < (self.month, self.day))
 
+    def _has_symptom(self, group: SymptomGroup) -> bool:
+        return bool(self.symptoms & group.bit)
+
     def has_fever(self) -> bool:
         """
         Returns True if the patient has condition that corresponds to or includes fever.
         :return: True if the patient has a fever
         """
-        snomed_fever_ids = [SnomedConcepts.FEVER.value,
-                            SnomedConcepts.FEVER_WITH_CHILLS.value,
-                            SnomedConcepts.FEBRILE_CONVULSIONS.value,
-                            SnomedConcepts.CONTINUOUS_FEVER.value]
-        return any(x in snomed_fever_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.FEVER)
 
     def has_exanthem(self) -> bool:
         """
@@ -114,10 +293,7 @@ class Patient:
 
         :return: True if the patient has an exanthem
         """
-        snomed_exanthem_ids = [SnomedConcepts.ERUPTION.value,
-                               SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_VIRUS.value,
-                               SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_OTHER_VIRUSES.value]
-        return any(x in snomed_exanthem_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.EXANTHEM)
 
     def has_swollen_extremities(self) -> bool:
         """
@@ -125,10 +301,7 @@ class Patient:
 
         :return: True if the patient has swollen extremities
         """
-        swollen_extremities_ids = [SnomedConcepts.SWELLING.value,
-                                   SnomedConcepts.SWELLING_UPPER_LIMB.value,
-                                   SnomedConcepts.SWELLING_LOWER_LIMB.value]
-        return any(x in swollen_extremities_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.SWOLLEN_EXTREMITIES)
 
     def has_conjunctivitis(self):
         """
@@ -136,10 +309,7 @@ class Patient:
 
         :return: True if the patient has conjunctivitis
         """
-        conjunctivitis_ids = [SnomedConcepts.OTHER_CONJUNCTIVITIS.value,
-                              SnomedConcepts.MUCOPURULENT_CONJUNCTIVITIS.value,
-                              SnomedConcepts.ACUTE_CONJUNCTIVITIS.value]
-        return any(x in conjunctivitis_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.CONJUNCTIVITIS)
 
     def has_lymphadenopathy(self):
         """
@@ -147,10 +317,7 @@ class Patient:
 
         :return: True if the patient has lymphadenopathy
         """
-        lymphadenopathy_ids = [SnomedConcepts.LYMPHADENOPATHY.value,
-                               SnomedConcepts.LOCALIZED_ENLARGED_LYMPH_NODES.value,
-                               SnomedConcepts.GENERALIZED_ENLARGED_LYMPH_NODES.value]
-        return any(x in lymphadenopathy_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.LYMPHADENOPATHY)
 
     def has_enanthem(self):
         """
@@ -159,12 +326,7 @@ class Patient:
 
         :return: True if the patient has an inflammation of the mouth or mucosa
         """
-        snomed_enanthem_ids = [SnomedConcepts.DISORDER_OF_ORAL_SOFT_TISSUE.value,
-                               SnomedConcepts.DISORDER_OF_LIP.value,
-                               SnomedConcepts.LESION_OF_ORAL_MUCOSA.value,
-                               SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_VIRUS.value,
-                               SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_OTHER_VIRUSES.value]
-        return any(x in snomed_enanthem_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.ENANTHEM)
 
     def has_cardiac_condition(self):
         """
@@ -173,15 +335,7 @@ class Patient:
 
         :return: True if the patient has a heart condition
         """
-        # Snomed ids for:
-        # I30: Akute Perikarditis: .0 (315293) .1 (4217075) .8/.9 (320116)
-        # I21: Akuter Myokardinfarkt: .0 (434376) .1 (438170) .2/.3 (312327) .4 (4270024) .9 (312327)
-        # I40: Myokariditis: .0 (4331309) .1 (4143969) .8/.9 (312653)
-        snomed_cor_ids = [SnomedConcepts.PERICARDITIS.value, 4217075, 320116,
-                          SnomedConcepts.MYOCARDIAL_INFARCTION.value, 438170, 312327, 4270024, 312327,
-                          SnomedConcepts.MYOCARDITIS.value, 4143969, 312653,
-                          SnomedConcepts.PERICARDIAL_EFFUSION]
-        return any(x in snomed_cor_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.CARDIAC_CONDITION)
 
     def has_gastro_intestinal_condition(self):
         """
@@ -189,12 +343,7 @@ class Patient:
 
         :return: True if the patient has a gastro-intestinal condition
         """
-        # Nausea and vomiting (ICD10GM R11 --> SNOMED-ID 27674)
-        # (lower) Abdominal Pain (ICD10GM R10.3, R10.4, R10 --> SNOMED-ID 4182562, 200219, 4116811)
-        # (Severe) Diarrhea (and vomiting) (SNOMED-ID 196523, 4091519, 4249551, 196151)
-        snomed_gastro_ids = [SnomedConcepts.NAUSEA_AND_VOMITING.value,
-                             4182562, 200219, 4116811, 196523, 4091519, 4249551, 196151]
-        return any(x in snomed_gastro_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.GASTRO_INTESTINAL_CONDITION)
 
     def has_inflammation_lab(self):
         """
@@ -203,12 +352,7 @@ class Patient:
 
         :return: True if the patient has an increase of inflammation parameters in his blood
         """
-        # CRP (different methods): (LOINC 1988-5, 71426-1 -> LOINC-Ids 3020460, 42870365)
-        # Erythrocyte sedimentation rate: (4537-7 -> 3013707)
-        # Leukocytes: (6690-2 -> 3000905)
-        # Procalictonin (33959-8 -> 3046279)
-        loinc_ids = [3020460, 42870365, 3013707, 3000905, 3046279]
-        return any(x in loinc_ids for x in self.high_measurements)
+        return self._has_symptom(SymptomGroup.INFLAMMATION_LAB)
 
     def has_effusion(self):
         """
@@ -217,10 +361,7 @@ class Patient:
 
         :return: True if the patient has effusions
         """
-        snomed_oedema_ids = [SnomedConcepts.ASCITES.value,
-                             SnomedConcepts.PLEURAL_EFFUSION.value,
-                             SnomedConcepts.PERICARDIAL_EFFUSION.value]
-        return any(x in snomed_oedema_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.EFFUSION)
 
     def has_covid(self):
         """
@@ -229,19 +370,13 @@ class Patient:
 
         :return: True if the patient has COVID-19
         """
-        snomed_covid_ids = [SnomedConcepts.COVID_19.value,
-                            SnomedConcepts.COVID_19_VIRUS_NOT_IDENTIFIED.value,
-                            SnomedConcepts.COVID_19_IN_PERSONAL_HISTORY.value,
-                            SnomedConcepts.POST_COVID.value]
-        return any(x in snomed_covid_ids for x in self.conditions)
+        return self._has_symptom(SymptomGroup.COVID)
 
     def has_kawasaki(self):
-        snomed_kawasaki_id = SnomedConcepts.KAWASAKI.value
-        return snomed_kawasaki_id in self.conditions
+        return self._has_symptom(SymptomGroup.KAWASAKI)
 
     def has_pims(self):
-        snomed_pims_id = SnomedConcepts.PIMS.value
-        return snomed_pims_id in self.conditions
+        return self._has_symptom(SymptomGroup.PIMS)
 
     def calculate_kawasaki_score(self) -> float:
         """
@@ -257,15 +392,15 @@ class Patient:
 
         :return: The score as a float
         """
-        self.reasons_for_kawasaki.clear()
-        self.missing_for_kawasaki.clear()
+        self._reasons_for_kawasaki = 0
+        self._missing_for_kawasaki = 0
 
         # Count number of present symptoms and update reason/missing lists
         num_of_symptoms = self._count_kawasaki_symptoms()
 
         # Kawasaki is already registered as a condition -> Return 100%
         if self.has_kawasaki():
-            self.reasons_for_kawasaki.append(self.REASON_KAWASAKI)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_KAWASAKI]
             self.kawasaki_score = 1.0
 
         # Too old -> Not Kawasaki -> Return 0%
@@ -310,45 +445,45 @@ class Patient:
         num_of_symptoms = 0
 
         if self.calculate_age() < 8:
-            self.reasons_for_kawasaki.append(self.REASON_YOUNGER_THAN_EIGHT)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_YOUNGER_THAN_EIGHT]
         else:
-            self.missing_for_kawasaki.append(self.REASON_YOUNGER_THAN_EIGHT)
+            self._missing_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_YOUNGER_THAN_EIGHT]
 
         if self.has_fever():
             num_of_symptoms += 1
-            self.reasons_for_kawasaki.append(self.REASON_FEVER)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_FEVER]
         else:
-            self.missing_for_kawasaki.append(self.REASON_FEVER)
+            self._missing_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_FEVER]
 
         if self.has_exanthem():
             num_of_symptoms += 1
-            self.reasons_for_kawasaki.append(self.REASON_EXANTHEM)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_EXANTHEM]
         else:
-            self.missing_for_kawasaki.append(self.REASON_EXANTHEM)
+            self._missing_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_EXANTHEM]
 
         if self.has_swollen_extremities():
             num_of_symptoms += 1
-            self.reasons_for_kawasaki.append(self.REASON_SWOLLEN_EXTREMITIES)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_SWOLLEN_EXTREMITIES]
         else:
-            self.missing_for_kawasaki.append(self.REASON_SWOLLEN_EXTREMITIES)
+            self._missing_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_SWOLLEN_EXTREMITIES]
 
         if self.has_conjunctivitis():
             num_of_symptoms += 1
-            self.reasons_for_kawasaki.append(self.REASON_CONJUNCTIVITIS)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_CONJUNCTIVITIS]
         else:
-            self.missing_for_kawasaki.append(self.REASON_CONJUNCTIVITIS)
+            self._missing_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_CONJUNCTIVITIS]
 
         if self.has_lymphadenopathy():
             num_of_symptoms += 1
-            self.reasons_for_kawasaki.append(self.REASON_SWOLLEN_LYMPHNODES)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_SWOLLEN_LYMPHNODES]
         else:
-            self.missing_for_kawasaki.append(self.REASON_SWOLLEN_LYMPHNODES)
+            self._missing_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_SWOLLEN_LYMPHNODES]
 
         if self.has_enanthem():
             num_of_symptoms += 1
-            self.reasons_for_kawasaki.append(self.REASON_ENANTHEM)
+            self._reasons_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_ENANTHEM]
         else:
-            self.missing_for_kawasaki.append(self.REASON_ENANTHEM)
+            self._missing_for_kawasaki |= self._KAWASAKI_REASON_BITS[self.REASON_ENANTHEM]
 
         return num_of_symptoms
 
@@ -370,15 +505,15 @@ class Patient:
 
         :return: The calculated score as a float
         """
-        self.reasons_for_pims.clear()
-        self.missing_for_pims.clear()
+        self._reasons_for_pims = 0
+        self._missing_for_pims = 0
 
         # Count number of present symptoms and update reason/missing lists
         num_of_symptoms = self._count_pims_symptoms()
 
         # PIMS is already registered as a condition -> Return 100%
         if self.has_pims():
-            self.reasons_for_pims.append(self.REASON_PIMS)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_PIMS]
             self.pims_score = 1.0
 
         elif self.calculate_age() >= 20:
@@ -430,57 +565,57 @@ class Patient:
         num_of_symptoms: int = 0
 
         if self.calculate_age() < 20:
-            self.reasons_for_pims.append(self.REASON_YOUNGER_THAN_TWENTY)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_YOUNGER_THAN_TWENTY]
         else:
-            self.missing_for_pims.append(self.REASON_YOUNGER_THAN_TWENTY)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_YOUNGER_THAN_TWENTY]
 
         if self.has_fever():
-            self.reasons_for_pims.append(self.REASON_FEVER)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_FEVER]
             num_of_symptoms += 1
         else:
-            self.missing_for_pims.append(self.REASON_FEVER)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_FEVER]
 
         if self.has_kawasaki():
-            self.reasons_for_pims.append(self.REASON_KAWASAKI)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_KAWASAKI]
             num_of_symptoms += 1
             # Fever is implied with kawasaki diagnosis
             if not self.has_fever():
                 num_of_symptoms += 1
         elif self.has_exanthem() or self.has_enanthem() or self.has_conjunctivitis() or self.has_swollen_extremities():
-            self.reasons_for_pims.append(self.REASON_KAWASAKI_SYMPTOMS)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_KAWASAKI_SYMPTOMS]
             num_of_symptoms += 1
         else:
-            self.missing_for_pims.append(self.REASON_KAWASAKI_SYMPTOMS)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_KAWASAKI_SYMPTOMS]
 
         if self.has_cardiac_condition():
-            self.reasons_for_pims.append(self.REASON_CARDIAL_CONDITION)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_CARDIAL_CONDITION]
             num_of_symptoms += 1
         else:
-            self.missing_for_pims.append(self.REASON_CARDIAL_CONDITION)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_CARDIAL_CONDITION]
 
         if self.has_coagulopathy():
-            self.reasons_for_pims.append(self.REASON_COAGULOPATHY)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_COAGULOPATHY]
             num_of_symptoms += 1
         else:
-            self.missing_for_pims.append(self.REASON_COAGULOPATHY)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_COAGULOPATHY]
 
         if self.has_gastro_intestinal_condition():
-            self.reasons_for_pims.append(self.REASON_GASTRO_INTESTINAL_CONDITION)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_GASTRO_INTESTINAL_CONDITION]
             num_of_symptoms += 1
         else:
-            self.missing_for_pims.append(self.REASON_GASTRO_INTESTINAL_CONDITION)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_GASTRO_INTESTINAL_CONDITION]
 
         if self.has_covid():
-            self.reasons_for_pims.append(self.REASON_COVID)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_COVID]
             num_of_symptoms += 1
         else:
-            self.missing_for_pims.append(self.REASON_COVID)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_COVID]
 
         if self.has_inflammation_lab():
-            self.reasons_for_pims.append(self.REASON_INFLAMMATION_LAB)
+            self._reasons_for_pims |= self._PIMS_REASON_BITS[self.REASON_INFLAMMATION_LAB]
             num_of_symptoms += 1
         else:
-            self.missing_for_pims.append(self.REASON_INFLAMMATION_LAB)
+            self._missing_for_pims |= self._PIMS_REASON_BITS[self.REASON_INFLAMMATION_LAB]
 
         return num_of_symptoms
 
@@ -488,26 +623,61 @@ class Patient:
         """
         Returns True if the patient has pericardial effusions as a condition.
         """
-        return 4108814 in self.conditions
+        return _contains_sorted(self.conditions, SnomedConcepts.PERICARDIAL_EFFUSION.value)
 
     def has_pericarditis(self):
         """
         Returns True if the patient has pericarditis as a condition.
         """
-        return 315293 in self.conditions
+        return _contains_sorted(self.conditions, SnomedConcepts.PERICARDITIS.value)
 
     def has_myocarditis(self):
         """
         Returns True if the patient has myocarditis as a condition.
         """
-        return 4331309 in self.conditions
+        return _contains_sorted(self.conditions, SnomedConcepts.MYOCARDITIS.value)
 
     def has_coagulopathy(self):
         """
         Returns True if the patient has markers for coagulopathy in his/her blood.
         """
-        ids = [SnomedConcepts.PTT_BLOOD.value,
-               SnomedConcepts.PTT_PLASMA.value,
-               SnomedConcepts.D_DIMER.value,
-               SnomedConcepts.PT.value]
-        return any(x in ids for x in self.high_measurements)
+        return self._has_symptom(SymptomGroup.COAGULOPATHY)
+
+
+def _decode_reasons(bitmask: int, reasons: Tuple[str, ...]) -> List[str]:
+    """
+    Returns the reasons whose bits are set in the given bitmask.
+
+    :param bitmask: bitmask over the given reasons
+    :param reasons: possible reasons, ordered by their bit
+    :return: list of reasons in the order of the given reasons
+    """
+    return [reason for bit, reason in enumerate(reasons) if bitmask >> bit & 1]
+
+
+def _insert_sorted(ids: array, value: int) -> bool:
+    """
+    Inserts the value into the sorted array of ids, if it is not already present. Finding the position is a binary
+    search, so adding all ids of a patient doesn't scan the array for every id.
+
+    :param ids: sorted array of distinct ids
+    :param value: id to be added
+    :return: True if the value was inserted
+    """
+    position: int = bisect_left(ids, value)
+    if position < len(ids) and ids[position] == value:
+        return False
+    ids.insert(position, value)
+    return True
+
+
+def _contains_sorted(ids: array, value: int) -> bool:
+    """
+    Checks if the sorted array of ids contains the value.
+
+    :param ids: sorted array of distinct ids
+    :param value: id to be searched
+    :return: True if the array contains the value
+    """
+    position: int = bisect_left(ids, value)
+    return position < len(ids) and ids[position] == value
@@ -0,0 +1,65 @@
+import datetime
+import gc
+import random
+import tracemalloc
+from typing import List
+
+from Backend.analysis.patient import Patient
+from Backend.common.omop_enums import SnomedConcepts
+
+# Ids the sample patients get their conditions and measurements from
+SAMPLE_CONDITIONS: List[int] = [SnomedConcepts.FEVER.value, SnomedConcepts.ERUPTION.value,
+                                SnomedConcepts.SWELLING.value, SnomedConcepts.OTHER_CONJUNCTIVITIS.value,
+                                SnomedConcepts.LYMPHADENOPATHY.value, SnomedConcepts.MYOCARDITIS.value,
+                                SnomedConcepts.NAUSEA_AND_VOMITING.value, SnomedConcepts.COVID_19.value,
+                                4182562, 196523, 4217075, 320116]
+SAMPLE_MEASUREMENTS: List[int] = [SnomedConcepts.CRP.value, SnomedConcepts.D_DIMER.value, 3013707, 3000905]
+
+
+def create_sample_patients(count: int, seed: int = 0) -> List[Patient]:
+    """
+    Creates evaluated patients with random conditions and measurements, similar to the ones of the etl job.
+
+    :param count: number of patients
+    :param seed: seed of the random generator
+    :return: list of patients
+    """
+    rng = random.Random(seed)
+    case_date = datetime.date(2021, 6, 1)
+    patients: List[Patient] = list()
+    for patient_id in range(count):
+        birthdate = case_date - datetime.timedelta(days=rng.randint(0, 20 * 365))
+        patient = Patient(patient_id=patient_id, name=f"Patient {patient_id}", birthdate=birthdate,
+                          case_date=case_date)
+        for condition in rng.sample(SAMPLE_CONDITIONS, rng.randint(1, 6)):
+            patient.add_condition(condition)
+        for measurement in rng.sample(SAMPLE_MEASUREMENTS, rng.randint(0, 2)):
+            patient.add_high_measurement(measurement)
+        patient.calculate_kawasaki_score()
+        patient.calculate_pims_score()
+        patients.append(patient)
+    return patients
+
+
+def measure_bytes_per_patient(count: int = 10000) -> float:
+    """
+    Measures the memory that is allocated for a single evaluated patient, including its name, dates and ids.
+
+    :param count: number of patients the measurement is averaged over
+    :return: bytes per patient
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        patients = create_sample_patients(count)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # The list holding the patients is not part of a patient
+    return (after - before - patients.__sizeof__()) / count
+
+
+if __name__ == "__main__":
+    print(f"{measure_bytes_per_patient():.0f} bytes per patient")
@@ -0,0 +1,115 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from Backend.analysis.patient import Patient, SymptomGroup
+
+
+def build_feature_matrix(patients: List[Patient]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds a boolean feature matrix (patients x symptom groups) and an age vector for the given patients.
+    The matrix is unpacked from the symptom bitmasks of the patients.
+
+    :param patients: list of patients
+    :return: the feature matrix with one row per patient and one column per SymptomGroup, and the ages in years
+    """
+    symptoms: np.ndarray = np.fromiter((patient.symptoms for patient in patients), dtype=np.int64,
+                                       count=len(patients))
+    features: np.ndarray = ((symptoms[:, np.newaxis] >> np.arange(len(SymptomGroup))) & 1).astype(bool)
+    ages: np.ndarray = np.fromiter((patient.calculate_age() for patient in patients), dtype=np.int64,
+                                   count=len(patients))
+    return features, ages
+
+
+def calculate_kawasaki_scores(features: np.ndarray, ages: np.ndarray) -> np.ndarray:
+    """
+    Calculates the kawasaki score for every row of the feature matrix at once.
+    Gives the same results as Patient.calculate_kawasaki_score, see there for the rules.
+
+    :param features: boolean feature matrix (patients x symptom groups)
+    :param ages: age of every patient in years
+    :return: the scores as a float array
+    """
+    fever: np.ndarray = features[:, SymptomGroup.FEVER]
+    # Fever is counted as a symptom as well
+    num_of_symptoms: np.ndarray = features[:, [SymptomGroup.FEVER,
+                                               SymptomGroup.EXANTHEM,
+                                               SymptomGroup.SWOLLEN_EXTREMITIES,
+                                               SymptomGroup.CONJUNCTIVITIS,
+                                               SymptomGroup.LYMPHADENOPATHY,
+                                               SymptomGroup.ENANTHEM]].sum(axis=1)
+
+    conditions = [
+        # Kawasaki is already registered as a condition
+        features[:, SymptomGroup.KAWASAKI],
+        # Too old
+        ages >= 8,
+        # Fever and at least four other symptoms for complete kawasaki
+        fever & (num_of_symptoms >= 5),
+        # Fever and at least on more symptom for incomplete kawasaki
+        fever & (num_of_symptoms >= 2),
+        # Fever only, might be kawasaki with missing data
+        fever,
+        # No Fever, but at least one kawasaki symptom
+        num_of_symptoms > 0]
+    choices = [1.0, 0.0, 1.0, 0.75, 0.5, 0.5]
+    return np.select(conditions, choices, default=0.0)
+
+
+def calculate_pims_scores(features: np.ndarray, ages: np.ndarray) -> np.ndarray:
+    """
+    Calculates the pims score for every row of the feature matrix at once.
+    Gives the same results as Patient.calculate_pims_score, see there for the rules.
+
+    :param features: boolean feature matrix (patients x symptom groups)
+    :param ages: age of every patient in years
+    :return: the scores as a float array
+    """
+    fever: np.ndarray = features[:, SymptomGroup.FEVER]
+    kawasaki: np.ndarray = features[:, SymptomGroup.KAWASAKI]
+    kawasaki_symptoms: np.ndarray = features[:, [SymptomGroup.EXANTHEM,
+                                                 SymptomGroup.ENANTHEM,
+                                                 SymptomGroup.CONJUNCTIVITIS,
+                                                 SymptomGroup.SWOLLEN_EXTREMITIES]].any(axis=1)
+    other_symptoms: np.ndarray = features[:, [SymptomGroup.CARDIAC_CONDITION,
+                                              SymptomGroup.COAGULOPATHY,
+                                              SymptomGroup.GASTRO_INTESTINAL_CONDITION]].sum(axis=1)
+
+    # Number of symptoms like in Patient._count_pims_symptoms. Fever is implied with a kawasaki diagnosis
+    num_of_symptoms: np.ndarray = fever.astype(np.int64) \
+        + np.where(kawasaki, 1 + ~fever, kawasaki_symptoms) \
+        + other_symptoms \
+        + features[:, SymptomGroup.COVID] \
+        + features[:, SymptomGroup.INFLAMMATION_LAB]
+    # Kawasaki or kawasaki symptoms, cardiac condition, gastro-intestinal condition and coagulopathy
+    num_of_side_symptoms: np.ndarray = (kawasaki | kawasaki_symptoms) + other_symptoms
+    # PIMS needs age < 20, fever (can be implied by kawasaki), inflammation markers, covid-19
+    possible_pims: np.ndarray = (fever | kawasaki) & features[:, SymptomGroup.COVID] \
+        & features[:, SymptomGroup.INFLAMMATION_LAB]
+
+    conditions = [
+        # PIMS is already registered as a condition
+        features[:, SymptomGroup.PIMS],
+        # Too old
+        ages >= 20,
+        # "Complete" PIMS
+        possible_pims & (num_of_side_symptoms >= 2),
+        # Not enough symptoms for PIMS
+        possible_pims,
+        # many conditions, but not the right combination
+        num_of_symptoms >= 3,
+        # some conditions
+        num_of_symptoms >= 1]
+    choices = [1.0, 0.0, 1.0, 0.75, 0.75, 0.5]
+    return np.select(conditions, choices, default=0.0)
+
+
+def score_patients(patients: List[Patient]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the kawasaki and pims scores for all given patients at once. The patients are not modified.
+
+    :param patients: list of patients
+    :return: the kawasaki scores and the pims scores in the order of the given patients
+    """
+    features, ages = build_feature_matrix(patients)
+    return calculate_kawasaki_scores(features, ages), calculate_pims_scores(features, ages)
@@ -1,33 +1,235 @@
 import datetime
 import logging
 import os
+import threading
 from datetime import date
 from typing import Dict, Optional, List
 
 from Backend.analysis.analysis import evaluate_patient, evaluate_all_in_database
+from Backend.analysis.analysis_snapshot import AnalysisSnapshot, DEFAULT_ANALYSIS_SNAPSHOT_PATH, \
+    get_database_fingerprint, remove_snapshot, try_load_snapshot
 from Backend.analysis.patient import Patient
 from Backend.common.config import generate_config
 from Backend.common.database import DBManager
 from Backend.common.omop_enums import OmopTableEnum, SnomedConcepts
+from Backend.etl.checkpoint import EtlCheckpoint
 from Backend.etl.etl import run_etl_job_for_csvs, run_etl_job_for_patient, update_patient
-from Backend.interface import PatientId, Disease, DecisionReasons, PatientData, AnalysisData, Interface
+from Backend.etl.etl_job import EtlJob, EtlJobData, EtlJobRunner
+from Backend.interface import PatientId, Disease, DecisionReasons, PatientData, AnalysisData, AnalysisState, \
+    Interface
 
 
 class BackendManager(Interface):
     """
     Interface for Backend-functionality, like accessing the database.
+
+    There is only one BackendManager per process (see Singleton), that is shared by all blueprints. Creating it is
+    cheap: The patients in the database are analyzed by a background worker, that is started by start_analysis or on
+    the first access of the patient index. Until the analysis has finished, the results of the last complete analysis
+    are served (see analysis_state).
+
+    The results of every analysis are persisted in an analysis snapshot. On the first analysis the snapshot is used
+    instead, if the database hasn't changed since. If it has changed, the outdated results are served until the new
+    analysis has finished.
+
+    Patients added or updated via the frontend while an analysis is running are kept when the analysis replaces the
+    patient index, and the results of that analysis aren't persisted, because they might miss the edits.
     """
 
+    # File the evaluated patients are persisted in
+    analysis_snapshot_path: str = DEFAULT_ANALYSIS_SNAPSHOT_PATH
+    # Number of rows that are read from a csv file at once by the etl job, None reads the whole file
+    etl_chunk_size: Optional[int] = None
+    # Number of processes the transformations of the etl job run on, None transforms in the current process
+    etl_workers: Optional[int] = None
+    # True to load only the changes of the csv files instead of reloading all omop tables
+    etl_incremental: bool = False
+    # True to merge the rows into the omop tables, so a failed etl job can be completed by running it again
+    etl_upsert: bool = False
+    # Optional directory the etl job saves checkpoints of its stages in, so a crashed job continues where it stopped
+    # (e.g. checkpoint.DEFAULT_CHECKPOINT_DIR), None disables checkpoints
+    etl_checkpoint_dir: Optional[str] = None
+
     def __init__(self):
         """
         Creates a new BackendManager.
-        Maintains a list of patient-objects that hold evaluation results.
+        Maintains an index of patient-objects that hold evaluation results. The index is keyed by the patient id and
+        keeps the order in which the patients were evaluated.
         """
+        self._patients: Dict[PatientId, Patient] = dict()
+        self._patients_analyzed: bool = False
+        self._analysis_state: AnalysisState = AnalysisState.IDLE
+        # Makes sure concurrent requests don't analyze the database more than once
+        self._analysis_lock = threading.RLock()
+        # Makes sure only one background worker is started at a time
+        self._worker_lock = threading.Lock()
+        # Guards the patient index against edits of the frontend while an analysis replaces it
+        self._patients_lock = threading.Lock()
+        # Incremented on every edit of the patient index, so an analysis detects edits made while it was running
+        self._patients_generation: int = 0
+        # Patients added or updated via the frontend since the start of the running analysis
+        self._edited_patients: Dict[PatientId, Patient] = dict()
+        self.etl_jobs: EtlJobRunner = EtlJobRunner()
         self.db_config = None
         self.dbManager = None
         self.reset_config()
-        self.patients: List[Patient] = list()
-        self.analyze_all_in_database()
+
+    @property
+    def patients(self) -> Dict[PatientId, Patient]:
+        """
+        Index of the evaluated patients. Starts the analysis of all patients in the database on the first access,
+        without waiting for it to finish.
+
+        :return: A dictionary with PatientIds as keys and the evaluated patients as values
+        """
+        if self._analysis_state == AnalysisState.IDLE:
+            self.start_analysis()
+        return self._patients
+
+    @property
+    def analysis_state(self) -> AnalysisState:
+        """
+        State of the analysis of all patients in the database.
+
+        :return: the current state
+        """
+        return self._analysis_state
+
+    @property
+    def is_analysis_ready(self) -> bool:
+        """
+        Returns whether the results of a complete analysis are available. This is the case as soon as the analysis
+        snapshot is loaded or the first analysis has finished, even if a newer analysis is running.
+
+        :return: True if the patient index holds the results of a complete analysis
+        """
+        return self._patients_analyzed
+
+    def start_analysis(self) -> bool:
+        """
+        Starts the analysis of all patients in the database in a background worker. On the first analysis the
+        analysis snapshot is loaded instead, if the database hasn't changed since.
+
+        :return: True if the analysis was started, False if an analysis is already running
+        """
+        with self._worker_lock:
+            if self._analysis_state == AnalysisState.RUNNING:
+                return False
+            self._analysis_state = AnalysisState.RUNNING
+        threading.Thread(target=self._analyze, name="analysis-worker", daemon=True).start()
+        return True
+
+    def _analyze(self) -> bool:
+        """
+        Loads or refreshes the patient index and keeps the analysis state up to date.
+
+        :return: True if the patient index holds the results of a complete analysis afterwards
+        """
+        with self._analysis_lock:
+            self._analysis_state = AnalysisState.RUNNING
+            if not self.dbManager:
+                logging.error("Could not analyze the patients, because there is no database connection.")
+                self._analysis_state = AnalysisState.FAILED
+                return False
+            try:
+                if self._patients_analyzed:
+                    self.analyze_all_in_database()
+                else:
+                    self._load_patients()
+            except Exception as error:
+                logging.error("Error during the analysis of the patients in the database.")
+                logging.error(error)
+                self._analysis_state = AnalysisState.FAILED
+                return False
+            self._analysis_state = AnalysisState.READY
+            return True
+
+    def _load_patients(self):
+        """
+        Loads the patient index from the analysis snapshot. Analyzes all patients in the database if there is no
+        snapshot. If the snapshot is outdated, it is served until the analysis has finished.
+        """
+        generation: int = self._begin_analysis()
+        fingerprint: Optional[dict] = self._get_database_fingerprint()
+        snapshot: Optional[AnalysisSnapshot] = try_load_snapshot(self.analysis_snapshot_path) if fingerprint else None
+        if snapshot is None:
+            self.analyze_all_in_database()
+            return
+
+        with self._patients_lock:
+            self._replace_patients(snapshot.patients)
+            edited: bool = self._patients_generation != generation
+        if edited or not snapshot.matches(fingerprint):
+            logging.info("The database has changed since the analysis snapshot was created. Analyzing all patients.")
+            self.analyze_all_in_database()
+
+    def _get_database_fingerprint(self) -> Optional[dict]:
+        """
+        Gets the fingerprint of the analyzed tables, see analysis_snapshot.get_database_fingerprint.
+
+        :return: the fingerprint or None if the database operation failed
+        """
+        if not self.dbManager:
+            return None
+        try:
+            return get_database_fingerprint(self.dbManager)
+        except AttributeError:
+            logging.warning("Could not get the fingerprint of the database.")
+            return None
+
+    def _begin_analysis(self) -> int:
+        """
+        Starts recording the patients that are edited via the frontend during an analysis.
+
+        :return: the generation of the patient index at the start of the analysis
+        """
+        with self._patients_lock:
+            self._edited_patients.clear()
+            return self._patients_generation
+
+    def _replace_patients(self, patients: List[Patient]):
+        """
+        Replaces the patient index with the given evaluated patients. Patients edited since the start of the analysis
+        are kept, because the analysis might have read their rows before the edit. The patients lock has to be held.
+
+        :param patients: evaluated patients
+        """
+        index: Dict[PatientId, Patient] = {PatientId(patient.id): patient for patient in patients}
+        index.update(self._edited_patients)
+        self._patients = index
+        self._patients_analyzed = True
+
+    def _record_edit(self, patient: Patient, only_if_indexed: bool = False):
+        """
+        Saves the given patient in the patient index after it was added or updated via the frontend. The patients lock
+        has to be held.
+
+        :param patient: the evaluated patient
+        :param only_if_indexed: True to only replace a patient that is already in the patient index
+        """
+        patient_id: PatientId = PatientId(patient.id)
+        if not only_if_indexed or patient_id in self._patients:
+            self._patients[patient_id] = patient
+        self._edited_patients[patient_id] = patient
+        self._patients_generation += 1
+
+    def _save_analysis_snapshot(self, patients: List[Patient], fingerprint: dict):
+        """
+        Saves the given patients as analysis snapshot. The snapshot is only saved if every person of the fingerprint
+        was evaluated, so an incomplete analysis is never persisted.
+
+        :param patients: evaluated patients
+        :param fingerprint: fingerprint of the database before the analysis
+        """
+        person_count, _ = fingerprint['tables'][OmopTableEnum.PERSON.value]
+        if len(patients) != person_count:
+            logging.warning("Not saving the analysis snapshot, because not every patient was evaluated.")
+            return
+        try:
+            AnalysisSnapshot(patients, fingerprint).save(self.analysis_snapshot_path)
+        except OSError as error:
+            logging.warning("Could not save the analysis snapshot.")
+            logging.warning(error)
 
     def reset_config(self):
         """
@@ -46,13 +248,28 @@ class BackendManager(Interface):
             logging.error(error)
             self.db_config = None
             self.dbManager = None
+        # Retry a failed first analysis with the new configuration on the next access
+        if self._analysis_state == AnalysisState.FAILED and not self._patients_analyzed:
+            self._analysis_state = AnalysisState.IDLE
 
     def analyze_all_in_database(self):
         """
         Analyzes all patients currently saved in the database.
         """
-        if self.dbManager:
-            self.patients = evaluate_all_in_database(self.dbManager)
+        with self._analysis_lock:
+            if self.dbManager:
+                generation: int = self._begin_analysis()
+                # Fingerprint before the analysis, so changes during the analysis are detected later on
+                fingerprint: Optional[dict] = self._get_database_fingerprint()
+                patients: List[Patient] = evaluate_all_in_database(self.dbManager)
+                with self._patients_lock:
+                    self._replace_patients(patients)
+                    if self._patients_generation != generation:
+                        logging.info("Not saving the analysis snapshot, because patients were edited during the "
+                                     "analysis.")
+                    elif fingerprint:
+                        # Saved while holding the lock, so an update can't remove the snapshot before it is written
+                        self._save_analysis_snapshot(patients, fingerprint)
 
     def is_db_empty(self) -> bool:
         """
@@ -73,7 +290,15 @@ class BackendManager(Interface):
 
         :return: True if the database was successfully reset.
         """
-        self.patients.clear()
+        with self._analysis_lock, self._patients_lock:
+            self._patients.clear()
+            self._edited_patients.clear()
+            self._patients_generation += 1
+            # No need to analyze the (empty) database anymore
+            self._patients_analyzed = True
+            self._analysis_state = AnalysisState.READY
+        # Tables loaded by a previous etl job are cleared, so its checkpoints can't be continued anymore
+        EtlCheckpoint(self.etl_checkpoint_dir).clear()
         try:
             return self.dbManager.clear_omop_tables()
         except AttributeError:
@@ -104,7 +329,8 @@ class BackendManager(Interface):
         if not evaluated_patient:
             return None
 
-        self.patients.append(evaluated_patient)
+        with self._patients_lock:
+            self._record_edit(evaluated_patient)
         return PatientId(patient.id)
 
     def _create_patient_from_data(self, patient_data: PatientData) -> Optional[Patient]:
@@ -133,35 +359,35 @@ class BackendManager(Interface):
         try:
             # Get snomed ids from patient_data and add as conditions
             if patient_data['hasCovid']:
-                patient.conditions.append(SnomedConcepts.COVID_19.value)
+                patient.add_condition(SnomedConcepts.COVID_19.value)
             if patient_data['hasFever']:
-                patient.conditions.append(SnomedConcepts.FEVER.value)
+                patient.add_condition(SnomedConcepts.FEVER.value)
             if patient_data['hasExanthem']:
-                patient.conditions.append(SnomedConcepts.ERUPTION.value)
+                patient.add_condition(SnomedConcepts.ERUPTION.value)
             if patient_data['hasEnanthem']:
-                patient.conditions.append(SnomedConcepts.DISORDER_OF_ORAL_SOFT_TISSUE.value)
+                patient.add_condition(SnomedConcepts.DISORDER_OF_ORAL_SOFT_TISSUE.value)
             if patient_data['hasSwollenExtremeties']:
-                patient.conditions.append(SnomedConcepts.SWELLING.value)
+                patient.add_condition(SnomedConcepts.SWELLING.value)
             if patient_data['hasConjunctivitis']:
-                patient.conditions.append(SnomedConcepts.OTHER_CONJUNCTIVITIS.value)
+                patient.add_condition(SnomedConcepts.OTHER_CONJUNCTIVITIS.value)
             if patient_data['hasSwollenLymphnodes']:
-                patient.conditions.append(SnomedConcepts.LYMPHADENOPATHY.value)
+                patient.add_condition(SnomedConcepts.LYMPHADENOPATHY.value)
             if patient_data['hasGastroIntestinalCondition']:
-                patient.conditions.append(SnomedConcepts.NAUSEA_AND_VOMITING.value)
+                patient.add_condition(SnomedConcepts.NAUSEA_AND_VOMITING.value)
             if patient_data['hasPericardialEffusions']:
-                patient.conditions.append(SnomedConcepts.PERICARDIAL_EFFUSION.value)
+                patient.add_condition(SnomedConcepts.PERICARDIAL_EFFUSION.value)
             if patient_data['hasPericarditis']:
-                patient.conditions.append(SnomedConcepts.PERICARDITIS.value)
+                patient.add_condition(SnomedConcepts.PERICARDITIS.value)
             if patient_data['hasMyocarditis']:
-                patient.conditions.append(SnomedConcepts.MYOCARDITIS.value)
+                patient.add_condition(SnomedConcepts.MYOCARDITIS.value)
             if patient_data['hasInflammationLab']:
-                patient.high_measurements.append(SnomedConcepts.CRP.value)
+                patient.add_high_measurement(SnomedConcepts.CRP.value)
             if patient_data['hasKawasaki']:
-                patient.conditions.append(SnomedConcepts.KAWASAKI.value)
+                patient.add_condition(SnomedConcepts.KAWASAKI.value)
             if patient_data['hasPims']:
-                patient.conditions.append(SnomedConcepts.PIMS.value)
+                patient.add_condition(SnomedConcepts.PIMS.value)
             if patient_data['hasCoagulopathy']:
-                patient.high_measurements.append(SnomedConcepts.D_DIMER.value)
+                patient.add_high_measurement(SnomedConcepts.D_DIMER.value)
         except (KeyError, ValueError, AttributeError) as error:
             logging.error("Error during patient creation from patient_data.")
             logging.error(error)
@@ -200,11 +426,11 @@ class BackendManager(Interface):
             logging.error("Error during evaluation of the new patient.")
             return False
 
-        # Update evaluation list
-        for patient in self.patients:
-            if patient.id == new_patient.id:
-                self.patients.remove(patient)
-                self.patients.append(evaluated_patient)
+        # Update evaluation index
+        with self._patients_lock:
+            self._record_edit(evaluated_patient, only_if_indexed=True)
+            # Updated rows don't change the fingerprint of the database, so the snapshot has to be removed
+            remove_snapshot(self.analysis_snapshot_path)
 
         return True
 
@@ -213,25 +439,46 @@ class BackendManager(Interface):
         Runs the etl job for the csv file on the given path.
         """
         try:
-            run_etl_job_for_csvs(csv_dir, self.db_config)
+            run_etl_job_for_csvs(csv_dir, self.db_config, chunk_size=self.etl_chunk_size,
+                                 workers=self.etl_workers, incremental=self.etl_incremental,
+                                 upsert=self.etl_upsert, checkpoint_dir=self.etl_checkpoint_dir)
         except Exception as e:
             print(e)
             return False
         return True
 
+    def start_etl(self, csv_dir: os.path) -> Optional[str]:
+        """
+        Starts the etl job for the csv files on the given path in the background.
+
+        :return: id of the job to poll the progress with or None if the job could not be started
+        """
+        if not self.db_config:
+            logging.error("Could not start the etl job, because there is no valid configuration.")
+            return None
+        job: Optional[EtlJob] = self.etl_jobs.start(csv_dir, self.db_config, chunk_size=self.etl_chunk_size,
+                                                    workers=self.etl_workers, incremental=self.etl_incremental,
+                                                    upsert=self.etl_upsert,
+                                                    checkpoint_dir=self.etl_checkpoint_dir)
+        return job.job_id if job else None
+
+    def get_etl_job(self, job_id: str) -> Optional[EtlJobData]:
+        """
+        Gets the progress of the etl job with the given id.
+
+        :return: EtlJobData of the job or None if there is no job with the given id
+        """
+        job: Optional[EtlJob] = self.etl_jobs.get(job_id)
+        return job.to_data() if job else None
+
     def run_analysis(self) -> bool:
         """
-        Runs the analysis for all patients currently in the database.
+        Runs the analysis for all patients currently in the database and waits for it to finish. The results of the
+        last complete analysis are served meanwhile.
         """
-        try:
-            if not self.is_db_empty():
-                self.analyze_all_in_database()
-            else:
-                return False
-        except Exception as e:
-            print(e)
+        if self.is_db_empty():
             return False
-        return True
+        return self._analyze()
 
     @property
     def analysis_data(self) -> Dict[PatientId, AnalysisData]:
@@ -241,7 +488,7 @@ class BackendManager(Interface):
         :return: A dictionary with PatientIds as keys and AnalysisData as values
         """
         data_dict = dict()
-        for patient in self.patients:
+        for patient in self.patients.values():
             analysis_data: AnalysisData = {
                 'name': patient.name,
                 'probability_pims': patient.pims_score,
@@ -257,30 +504,30 @@ class BackendManager(Interface):
         :param patient_id: id of the patient
         :return: corresponding PatientData
         """
-        for patient in self.patients:
-            if PatientId(patient.id) == patient_id:
-                # Found corresponding patient
-                patient_data: PatientData = {
-                    'name': patient.name,
-                    'birthdate': patient.birthdate,
-                    'hasCovid': patient.has_covid(),
-                    'hasFever': patient.has_fever(),
-                    'hasExanthem': patient.has_exanthem(),
-                    'hasEnanthem': patient.has_enanthem(),
-                    'hasSwollenExtremeties': patient.has_swollen_extremities(),
-                    'hasConjunctivitis': patient.has_conjunctivitis(),
-                    'hasSwollenLymphnodes': patient.has_lymphadenopathy(),
-                    'hasGastroIntestinalCondition': patient.has_gastro_intestinal_condition(),
-                    'hasPericardialEffusions': patient.has_pericardial_effusions(),
-                    'hasPericarditis': patient.has_pericarditis(),
-                    'hasMyocarditis': patient.has_myocarditis(),
-                    'hasInflammationLab': patient.has_inflammation_lab(),
-                    'hasKawasaki': patient.has_kawasaki(),
-                    'hasPims': patient.has_pims(),
-                    'hasCoagulopathy': patient.has_coagulopathy()
-                }
-                return patient_data
-        return PatientData()
+        patient: Optional[Patient] = self.patients.get(patient_id)
+        if patient is None:
+            return PatientData()
+
+        patient_data: PatientData = {
+            'name': patient.name,
+            'birthdate': patient.birthdate,
+            'hasCovid': patient.has_covid(),
+            'hasFever': patient.has_fever(),
+            'hasExanthem': patient.has_exanthem(),
+            'hasEnanthem': patient.has_enanthem(),
+            'hasSwollenExtremeties': patient.has_swollen_extremities(),
+            'hasConjunctivitis': patient.has_conjunctivitis(),
+            'hasSwollenLymphnodes': patient.has_lymphadenopathy(),
+            'hasGastroIntestinalCondition': patient.has_gastro_intestinal_condition(),
+            'hasPericardialEffusions': patient.has_pericardial_effusions(),
+            'hasPericarditis': patient.has_pericarditis(),
+            'hasMyocarditis': patient.has_myocarditis(),
+            'hasInflammationLab': patient.has_inflammation_lab(),
+            'hasKawasaki': patient.has_kawasaki(),
+            'hasPims': patient.has_pims(),
+            'hasCoagulopathy': patient.has_coagulopathy()
+        }
+        return patient_data
 
     def get_decision_reason(self, patient_id: PatientId, disease: Disease) -> DecisionReasons:
         """
@@ -290,22 +537,23 @@ class BackendManager(Interface):
         :param disease: disease
         :return: DecisionReasons for the patient and disease
         """
-        for patient in self.patients:
-            if PatientId(patient.id) == patient_id:
-                # Found corresponding patient
-                decision_reasons: DecisionReasons = DecisionReasons()
-                if disease == Disease.KAWASAKI:
-                    decision_reasons = {
-                        'disease': Disease.KAWASAKI,
-                        'probability': patient.kawasaki_score,
-                        'pro': patient.reasons_for_kawasaki,
-                        'missing': patient.missing_for_kawasaki
-                    }
-                elif disease == Disease.PIMS:
-                    decision_reasons = {
-                        'disease': Disease.PIMS,
-                        'probability': patient.pims_score,
-                        'pro': patient.reasons_for_pims,
-                        'missing': patient.missing_for_pims
-                    }
-                return decision_reasons
+        patient: Optional[Patient] = self.patients.get(patient_id)
+        if patient is None:
+            return DecisionReasons()
+
+        decision_reasons: DecisionReasons = DecisionReasons()
+        if disease == Disease.KAWASAKI:
+            decision_reasons = {
+                'disease': Disease.KAWASAKI,
+                'probability': patient.kawasaki_score,
+                'pro': patient.reasons_for_kawasaki,
+                'missing': patient.missing_for_kawasaki
+            }
+        elif disease == Disease.PIMS:
+            decision_reasons = {
+                'disease': Disease.PIMS,
+                'probability': patient.pims_score,
+                'pro': patient.reasons_for_pims,
+                'missing': patient.missing_for_pims
+            }
+        return decision_reasons
@@ -0,0 +1,163 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, TypedDict
+
+# Key of a cache entry: (vocabulary_id, normalized code)
+ConceptKey = Tuple[str, str]
+
+
+class CacheStats(TypedDict):
+    """
+    Counters of a ConceptMappingCache.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+class ConceptMappingCache:
+    """
+    Thread-safe LRU cache for the mapping of non-standard codes (ICD10GM, OPS, LOINC, ...) to SNOMED-Ids.
+    Negative results ('0' for 'No matching concept') are cached as well, so unmapped codes are not queried again.
+    """
+
+    # Default number of cached mappings
+    DEFAULT_MAX_SIZE: int = 100000
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Creates a new, empty cache.
+
+        :param max_size: maximum number of cached mappings, the least recently used entry is evicted if it is exceeded
+        """
+        if max_size < 1:
+            raise ValueError("The size of the concept mapping cache has to be at least 1.")
+        self._max_size: int = max_size
+        self._entries: "OrderedDict[ConceptKey, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._evictions: int = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    def get(self, vocabulary_id: str, code: str) -> Optional[int]:
+        """
+        Looks up the SNOMED-Id for the given code and marks the entry as recently used.
+
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :param code: the normalized non-standard code
+        :return: the cached SNOMED-Id (0 if there is no mapping) or None if the code is not cached
+        """
+        key: ConceptKey = (vocabulary_id, code)
+        with self._lock:
+            snomed_id = self._entries.get(key)
+            if snomed_id is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+            return snomed_id
+
+    def get_many(self, vocabulary_id: str, codes) -> Dict[str, int]:
+        """
+        Looks up the SNOMED-Ids for all given codes.
+
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :param codes: the normalized non-standard codes
+        :return: a dict with the cached mappings, codes that are not cached are missing
+        """
+        result: Dict[str, int] = dict()
+        with self._lock:
+            for code in codes:
+                key: ConceptKey = (vocabulary_id, code)
+                snomed_id = self._entries.get(key)
+                if snomed_id is None:
+                    self._misses += 1
+                else:
+                    self._hits += 1
+                    self._entries.move_to_end(key)
+                    result[code] = snomed_id
+        return result
+
+    def put(self, vocabulary_id: str, code: str, snomed_id: int):
+        """
+        Adds or refreshes a mapping. Evicts the least recently used entries if the cache is full.
+
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :param code: the normalized non-standard code
+        :param snomed_id: the corresponding SNOMED-Id or 0 if there is no mapping
+        """
+        key: ConceptKey = (vocabulary_id, code)
+        with self._lock:
+            self._entries[key] = snomed_id
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def put_many(self, vocabulary_id: str, snomed_ids: Dict[str, int]):
+        """
+        Adds or refreshes all given mappings.
+
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :param snomed_ids: dict mapping normalized codes to SNOMED-Ids
+        """
+        with self._lock:
+            for code, snomed_id in snomed_ids.items():
+                key: ConceptKey = (vocabulary_id, code)
+                self._entries[key] = snomed_id
+                self._entries.move_to_end(key)
+            self._evict()
+
+    def resize(self, max_size: int):
+        """
+        Changes the maximum number of cached mappings. Evicts entries if the cache is too large afterwards.
+
+        :param max_size: new maximum number of cached mappings
+        """
+        if max_size < 1:
+            raise ValueError("The size of the concept mapping cache has to be at least 1.")
+        with self._lock:
+            self._max_size = max_size
+            self._evict()
+
+    def clear(self):
+        """
+        Removes all cached mappings. The counters are kept.
+        """
+        with self._lock:
+            self._entries.clear()
+        logging.debug("Cleared concept mapping cache.")
+
+    def reset_stats(self):
+        """
+        Sets all counters to zero.
+        """
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Returns the current counters of the cache.
+
+        :return: hits, misses, evictions and the current and maximum size
+        """
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, evictions=self._evictions,
+                              size=len(self._entries), max_size=self._max_size)
+
+    def _evict(self):
+        # Has to be called while holding the lock
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
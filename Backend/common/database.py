@@ -1,16 +1,61 @@
+import copy
+import io
 import pandas as pd
 import logging
 import psycopg2
+import psycopg2.extras
 import numpy as np
-from random import randrange
-from typing import Tuple, Optional, List
+from typing import Tuple, Optional, List, Dict, Iterable
 from psycopg2.extensions import register_adapter, AsIs
+from Backend.common.concept_cache import ConceptMappingCache
 from Backend.common.config import generate_config, DbConfig
+from Backend.common.id_allocator import IdAllocator
+from Backend.common.vocabulary_snapshot import VocabularySnapshot, SNAPSHOT_VOCABULARIES
 from Backend.common.omop_enums import OmopTableEnum, OmopConditionOccurrenceFieldsEnum, OmopPersonFieldsEnum, \
     SnomedConcepts, OmopObservationPeriodFieldsEnum, OmopMeasurementEnum
 
 psycopg2.extensions.register_adapter(np.int64, AsIs)
 
+# Snomed mappings for ICD10GM codes that are currently not in the omop database
+MISSING_SNOMED_MAPPINGS: Dict[str, int] = {
+    # (post) Covid (in personal history)
+    'U09': SnomedConcepts.COVID_19.value,
+    'U09.9': SnomedConcepts.COVID_19.value,
+    'U08': SnomedConcepts.COVID_19.value,
+    'U08.9': SnomedConcepts.COVID_19.value,
+    'U07.1': SnomedConcepts.COVID_19.value,
+    # Covid (suspected)
+    'U07.2': SnomedConcepts.COVID_19_VIRUS_NOT_IDENTIFIED.value,
+    # Alternative code for PIMS, because the database is not up to date
+    'U10.9': SnomedConcepts.PIMS.value
+}
+
+
+# Marker for NULL values in the csv data that is streamed to the database with COPY
+COPY_NULL: str = "\\N"
+
+
+def to_copy_buffer(df: pd.DataFrame) -> io.StringIO:
+    """
+    Writes the given dataframe into an in-memory csv buffer that can be loaded with 'COPY ... FROM STDIN'.
+    Missing values (None, NaN, NaT) are written as COPY_NULL. Float columns that only hold whole numbers (e.g. ids
+    that became floats because of missing values) are written as integers, because COPY does not cast '1.0' to an
+    integer column like an INSERT does. Dates and datetimes are written in ISO format, with fractional seconds.
+
+    :param df: dataframe with omop data
+    :return: buffer positioned at its start
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if pd.api.types.is_float_dtype(df[col]):
+            values = df[col].dropna()
+            if (values == values.round()).all():
+                df[col] = df[col].astype('Int64')
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep=COPY_NULL, date_format='%Y-%m-%d %H:%M:%S.%f')
+    buffer.seek(0)
+    return buffer
+
 
 class DBManager:
     """
@@ -20,16 +65,30 @@ class DBManager:
     # Provider-Id that is used for tables generated using the frontend
     PROVIDER_ID: int = 999999
 
-    def __init__(self, db_config: DbConfig, clear_tables: bool = False):
+    # Frames with less rows are saved with executemany instead of COPY
+    COPY_MIN_ROWS: int = 50
+
+    # Process-wide cache for concept mappings, shared by all instances. Can be resized with concept_cache.resize(n)
+    concept_cache: ConceptMappingCache = ConceptMappingCache()
+
+    # Process-wide allocator for new ids, shared by all instances. Generated ids start at 10000
+    id_allocator: IdAllocator = IdAllocator(min_id=10000)
+
+    def __init__(self, db_config: DbConfig, clear_tables: bool = False, vocabulary_snapshot: Optional[str] = None):
         """
         Creates a new DatabaseManager. Establishes a new database connection with the parameters specified in the given
         DbConfig.
 
         :param db_config: The configuration (Url, username, password, ...) for the database
         :param clear_tables: If set to True: clears all target omop-tables
+        :param vocabulary_snapshot: Optional path to a vocabulary snapshot file. If set, concept mappings are resolved
+        from the snapshot instead of the vocabulary tables of the database
         """
         self.DB_SCHEMA = db_config["db_schema"]
         self.conn = self._connect(db_config)
+        self.vocabulary_snapshot: Optional[VocabularySnapshot] = None
+        if vocabulary_snapshot:
+            self.use_vocabulary_snapshot(vocabulary_snapshot)
         if clear_tables:
             self.clear_omop_tables()
 
@@ -55,6 +114,54 @@ class DBManager:
         finally:
             return conn
 
+    def close(self):
+        """
+        Closes the database connection. The DBManager can't access the database afterwards.
+        """
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except psycopg2.Error as error:
+                logging.error("An error occurred while closing the database connection.")
+                logging.error(error)
+            self.conn = None
+
+    def use_vocabulary_snapshot(self, path: str) -> bool:
+        """
+        Loads the vocabulary snapshot at the given path. Afterwards get_snomed_id and get_snomed_ids resolve codes from
+        the snapshot without accessing the vocabulary tables of the database.
+        If the snapshot can't be loaded, the mappings are still queried from the database.
+
+        :param path: path to a snapshot file created by vocabulary_snapshot.export_snapshot
+        :return: True if the snapshot was loaded successfully
+        """
+        try:
+            self.vocabulary_snapshot = VocabularySnapshot.load(path)
+            return True
+        except (OSError, ValueError, KeyError) as error:
+            logging.error(f"Could not load the vocabulary snapshot {path}. Using the database instead.")
+            logging.error(error)
+            self.vocabulary_snapshot = None
+            return False
+
+    def create_vocabulary_loader(self) -> "DBManager":
+        """
+        Creates a copy of this DBManager without a database connection, that resolves concept mappings from a
+        vocabulary snapshot only. Unlike a connected DBManager the copy can be pickled, e.g. to pass it to the
+        transformations in other processes.
+        If no snapshot is loaded, the 'Maps to' relationships of the etl vocabularies are read into a new snapshot that
+        is kept in memory.
+
+        :return: a DBManager without a connection, that can only be used to resolve concept mappings
+        :raises AttributeError: If the snapshot has to be created and the operation fails
+        """
+        loader: DBManager = copy.copy(self)
+        loader.conn = None
+        if loader.vocabulary_snapshot is None:
+            loader.vocabulary_snapshot = VocabularySnapshot(
+                {vocabulary_id: self.get_vocabulary_mappings(vocabulary_id) for vocabulary_id in SNAPSHOT_VOCABULARIES})
+        return loader
+
     def check_if_table_is_empty(self, table_name: str) -> bool:
         """
         Checks if the given table is empty. If there is no active connection this will raise an AttributeError
@@ -101,6 +208,8 @@ class DBManager:
                 self.conn.commit()
             logging.info("Successfully cleared omop database.")
             cursor.close()
+            self.concept_cache.clear()
+            self.id_allocator.invalidate()
             return True
 
         except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
@@ -168,6 +277,254 @@ class DBManager:
             logging.error(error)
             raise AttributeError("Error during database operation. Check if there is an active connection.")
 
+    def bulk_save(self, table: OmopTableEnum, df: pd.DataFrame) -> bool:
+        """
+        Saves the DataFrame in the given OMOP table by streaming it to the database with 'COPY ... FROM STDIN'.
+        This is much faster than save() for large tables. Frames with less than COPY_MIN_ROWS rows are saved with
+        save() instead, because the overhead of building the csv buffer is not worth it.
+
+        :param table: the df should be stored
+        :param df: with OMOP data
+        :return: True if the data was successfully saved
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        # Rows are saved with their own ids, counters for new ids have to be initialized again
+        self.id_allocator.invalidate(table.value)
+
+        if len(df.index) < self.COPY_MIN_ROWS:
+            return self.save(table, df)
+
+        logging.info(f"Saving Table {table.value} with COPY ({len(df.index)} rows).")
+        cols = ','.join(list(df.columns))
+        query = f"COPY {table.value}({cols}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+        cursor = None
+        try:
+            buffer: io.StringIO = to_copy_buffer(df)
+            cursor = self.conn.cursor()
+            # Select database schema and stream the data into the table
+            cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+            cursor.copy_expert(query, buffer)
+            self.conn.commit()
+            logging.info("Successfully performed copy.")
+            cursor.close()
+            return True
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
+    def bulk_upsert(self, table: OmopTableEnum, df: pd.DataFrame, id_column: str) -> bool:
+        """
+        Saves the DataFrame in the given OMOP table like bulk_save, but rows whose id is already used overwrite the
+        existing row instead of failing. The rows are streamed into a temporary table with 'COPY ... FROM STDIN' and
+        merged with a single 'INSERT ... ON CONFLICT DO UPDATE', if the id column has a primary key or unique
+        constraint. Otherwise the existing rows are updated from the temporary table and the remaining rows are
+        inserted, in the same transaction. Saving the same rows again leaves the table unchanged, so a partially loaded
+        table can be loaded again.
+
+        :param table: the df should be stored
+        :param df: with OMOP data, every id may only occur once
+        :param id_column: column that holds the ids of the table
+        :return: True if the data was successfully saved
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        # Rows are saved with their own ids, counters for new ids have to be initialized again
+        self.id_allocator.invalidate(table.value)
+
+        logging.info(f"Upserting Table {table.value} ({len(df.index)} rows).")
+        staged: str = f"{table.value}_staged"
+        cols = ','.join(list(df.columns))
+        query: str = ""
+        cursor = None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+            query = f"CREATE TEMPORARY TABLE {staged} (LIKE {table.value}) ON COMMIT DROP"
+            cursor.execute(query)
+            query = f"COPY {staged}({cols}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+            cursor.copy_expert(query, to_copy_buffer(df))
+            query = f"Merging {staged} into {table.value}"
+            self._merge_rows(cursor, table, staged, list(df.columns), id_column)
+            self.conn.commit()
+            logging.info("Successfully performed upsert.")
+            cursor.close()
+            return True
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
+    def _merge_rows(self, cursor, table: OmopTableEnum, source: str, columns: List[str], id_column: str):
+        """
+        Merges the rows of the source table into the given OMOP table by their ids, see bulk_upsert. Runs in the
+        current transaction of the cursor, without committing it.
+
+        :param cursor: cursor of this connection, with the search path set to the schema of the database
+        :param table: the table the rows are merged into
+        :param source: table holding the rows, every id may only occur once
+        :param columns: columns of the source table that are merged
+        :param id_column: column that holds the ids of the table
+        :raises psycopg2.DatabaseError: If a query fails
+        """
+        cols = ','.join(columns)
+        value_columns: List[str] = [column for column in columns if column != id_column]
+        # ON CONFLICT needs a unique index on the id column as arbiter, that the omop schema doesn't require
+        query = "SELECT EXISTS (SELECT 1 FROM pg_index i JOIN pg_attribute a " \
+                "ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0] " \
+                "WHERE i.indrelid = %s::regclass AND i.indisunique AND i.indimmediate AND i.indnatts = 1 " \
+                "AND i.indpred IS NULL AND a.attname = %s)"
+        cursor.execute(query, (f"{self.DB_SCHEMA}.{table.value}", id_column))
+        if cursor.fetchone()[0]:
+            assignments: str = ", ".join(f"{column} = EXCLUDED.{column}" for column in value_columns)
+            # Tables that only consist of the id have nothing to update
+            conflict_action: str = f"DO UPDATE SET {assignments}" if assignments else "DO NOTHING"
+            cursor.execute(f"INSERT INTO {table.value}({cols}) SELECT {cols} FROM {source} "
+                           f"ON CONFLICT ({id_column}) {conflict_action}")
+        else:
+            if value_columns:
+                assignments: str = ", ".join(f"{column} = {source}.{column}" for column in value_columns)
+                cursor.execute(f"UPDATE {table.value} SET {assignments} FROM {source} "
+                               f"WHERE {table.value}.{id_column} = {source}.{id_column}")
+            cursor.execute(f"INSERT INTO {table.value}({cols}) SELECT {cols} FROM {source} WHERE NOT EXISTS "
+                           f"(SELECT 1 FROM {table.value} WHERE {table.value}.{id_column} = {source}.{id_column})")
+
+    def stage_table(self, table: OmopTableEnum, df: pd.DataFrame, staged: str) -> bool:
+        """
+        Streams the DataFrame with 'COPY ... FROM STDIN' into a new unlogged table, that has the columns of the given
+        OMOP table but no constraints. The staged table is committed, so other connections can move its rows into the
+        OMOP table with publish_staged_tables.
+
+        :param table: the OMOP table the rows belong to
+        :param df: with OMOP data
+        :param staged: name of the new table, it mustn't exist yet
+        :return: True if the data was successfully staged
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        logging.info(f"Staging Table {table.value} in {staged} ({len(df.index)} rows).")
+        query: str = ""
+        cursor = None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+            query = f"CREATE UNLOGGED TABLE {staged} (LIKE {table.value})"
+            cursor.execute(query)
+            query = f"COPY {staged}({','.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+            cursor.copy_expert(query, to_copy_buffer(df))
+            self.conn.commit()
+            logging.info("Successfully staged the table.")
+            cursor.close()
+            return True
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
+    def publish_staged_tables(self, staged_tables: List[Tuple[OmopTableEnum, str, List[str], str]],
+                              replace: bool = False, upsert: bool = False) -> bool:
+        """
+        Moves the rows of tables staged with stage_table into their OMOP tables and drops the staged tables, in a single
+        transaction. Either all tables are published or none of them. Other connections don't see the rows before the
+        transaction is committed.
+
+        :param staged_tables: (OMOP table, staged table, columns, id column) in the order of the foreign keys
+        :param replace: True to remove all rows of the OMOP tables in the same transaction first, readers of the tables
+        wait until the transaction is committed
+        :param upsert: True to merge the rows into the tables by their ids like bulk_upsert instead of inserting them
+        :return: True if the transaction was successfully committed
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        query: str = ""
+        cursor = None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+            if replace:
+                query = f"TRUNCATE {', '.join(table.value for table in OmopTableEnum)} CASCADE"
+                cursor.execute(query)
+            for table, staged, columns, id_column in staged_tables:
+                if upsert:
+                    query = f"Merging {staged} into {table.value}"
+                    self._merge_rows(cursor, table, staged, columns, id_column)
+                else:
+                    query = f"INSERT INTO {table.value}({','.join(columns)}) SELECT {','.join(columns)} FROM {staged}"
+                    cursor.execute(query)
+            for _, staged, _, _ in staged_tables:
+                query = f"DROP TABLE {staged}"
+                cursor.execute(query)
+            self.conn.commit()
+            logging.info("Successfully published the staged tables.")
+            cursor.close()
+            # Rows are saved with their own ids, counters for new ids have to be initialized again
+            if replace:
+                self.concept_cache.clear()
+                self.id_allocator.invalidate()
+            for table, _, _, _ in staged_tables:
+                self.id_allocator.invalidate(table.value)
+            return True
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
+    def drop_staged_tables(self, staged: List[str]) -> bool:
+        """
+        Drops tables created with stage_table, that were not published. Tables that don't exist are skipped.
+
+        :param staged: names of the staged tables
+        :return: True if the tables were dropped
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        query: str = ""
+        cursor = None
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+            for name in staged:
+                query = f"DROP TABLE IF EXISTS {name}"
+                cursor.execute(query)
+            self.conn.commit()
+            cursor.close()
+            return True
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
     def get_snomed_id(self, code: str, vocabulary_id: str) -> int:
         """
         Gets the Id of a SNOMED-Concept which represents the given non-standard code. The code can be for example an
@@ -180,15 +537,17 @@ class DBManager:
         code = code.rstrip("!+")
 
         # Snomed mappings that are currently not in the omop database
-        if code == 'U09' or code == 'U09.9' or code == 'U08' or code == 'U08.9' or code == 'U07.1':
-            # (post) Covid (in personal history)
-            return SnomedConcepts.COVID_19.value
-        elif code == 'U07.2':
-            # Covid (suspected)
-            return SnomedConcepts.COVID_19_VIRUS_NOT_IDENTIFIED.value
-        elif code == 'U10.9':
-            # Alternative code for PIMS, because the database is not up to date
-            return SnomedConcepts.PIMS.value
+        if code in MISSING_SNOMED_MAPPINGS:
+            return MISSING_SNOMED_MAPPINGS[code]
+
+        # Resolve from the local snapshot without any database access
+        if self.vocabulary_snapshot is not None:
+            return self.vocabulary_snapshot.get_snomed_id(code, vocabulary_id)
+
+        # Previously resolved codes (including codes without a mapping) are not queried again
+        cached_id: Optional[int] = self.concept_cache.get(vocabulary_id, code)
+        if cached_id is not None:
+            return cached_id
 
         cursor = None
 
@@ -206,10 +565,12 @@ class DBManager:
                 f"AND concept_id_1 = '{concept_id_original}';")
             concept_id_snomed = int(cursor.fetchone()[0])
             cursor.close()
+            self.concept_cache.put(vocabulary_id, code, concept_id_snomed)
 
         except TypeError:
             # Set to 0 if no mapping was found, means 'No matching concept' in omop vocabulary
             concept_id_snomed = 0
+            self.concept_cache.put(vocabulary_id, code, concept_id_snomed)
             logging.debug(f"Could not find a mapping for {code} in {vocabulary_id}.")
 
         except (Exception, psycopg2.DatabaseError, AttributeError, ValueError) as error:
@@ -224,6 +585,113 @@ class DBManager:
 
         return concept_id_snomed
 
+    def get_snomed_ids(self, codes: Iterable[str], vocabulary_id: str) -> Dict[str, int]:
+        """
+        Bulk version of get_snomed_id. Resolves all distinct codes with a single joined query on concept and
+        concept_relationship instead of two queries per code.
+        Values that are not strings (e.g. NaN for empty cells) are ignored and therefore not part of the result.
+
+        :param codes: the given non-standard codes, may contain duplicates
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :return: a dict mapping every given code to its SNOMED-Id or 0 if there is no mapping for the code
+        """
+        # Map the original codes to their normalized form, trailing !/+ characters are not included in OMOP concepts
+        normalized_codes: Dict[str, str] = {code: code.rstrip("!+") for code in set(codes) if isinstance(code, str)}
+        # Snomed mappings that are currently not in the omop database don't have to be queried
+        lookup_codes: List[str] = sorted({code for code in normalized_codes.values()
+                                          if code not in MISSING_SNOMED_MAPPINGS})
+        if self.vocabulary_snapshot is not None:
+            # Resolve from the local snapshot without any database access
+            snomed_ids: Dict[str, int] = self.vocabulary_snapshot.get_snomed_ids(lookup_codes, vocabulary_id)
+            lookup_codes = list()
+        else:
+            # Neither do previously resolved codes
+            snomed_ids: Dict[str, int] = self.concept_cache.get_many(vocabulary_id, lookup_codes)
+            lookup_codes = [code for code in lookup_codes if code not in snomed_ids]
+
+        cursor = None
+
+        try:
+            if lookup_codes:
+                cursor = self.conn.cursor()
+                cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+                cursor.execute(
+                    "SELECT c.concept_code, cr.concept_id_2 FROM concept c "
+                    "JOIN concept_relationship cr ON cr.concept_id_1 = c.concept_id "
+                    "WHERE cr.relationship_id = 'Maps to' AND c.vocabulary_id = %s AND c.concept_code = ANY(%s);",
+                    (vocabulary_id, lookup_codes))
+                queried_ids: Dict[str, int] = dict()
+                for concept_code, concept_id_snomed in cursor.fetchall():
+                    # Keep the first mapping, like get_snomed_id does
+                    queried_ids.setdefault(concept_code, int(concept_id_snomed))
+                cursor.close()
+                # Codes without a mapping are cached as 0 as well
+                queried_ids = {code: queried_ids.get(code, 0) for code in lookup_codes}
+                self.concept_cache.put_many(vocabulary_id, queried_ids)
+                snomed_ids.update(queried_ids)
+
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
+        result: Dict[str, int] = dict()
+        for code, normalized_code in normalized_codes.items():
+            if normalized_code in MISSING_SNOMED_MAPPINGS:
+                result[code] = MISSING_SNOMED_MAPPINGS[normalized_code]
+            else:
+                # Set to 0 if no mapping was found, means 'No matching concept' in omop vocabulary
+                result[code] = snomed_ids.get(normalized_code, 0)
+                if result[code] == 0:
+                    logging.debug(f"Could not find a mapping for {code} in {vocabulary_id}.")
+        return result
+
+    def reload_vocabulary(self):
+        """
+        Has to be called after the vocabulary tables (concept, concept_relationship) of the database or the vocabulary
+        snapshot file have been changed.
+        Invalidates all cached concept mappings, so they are queried again on the next access. A loaded vocabulary
+        snapshot is read again from its file.
+        """
+        logging.info("Reloading vocabulary. Invalidating cached concept mappings.")
+        self.concept_cache.clear()
+        if self.vocabulary_snapshot is not None and self.vocabulary_snapshot.path:
+            self.use_vocabulary_snapshot(self.vocabulary_snapshot.path)
+
+    def get_vocabulary_mappings(self, vocabulary_id: str) -> pd.DataFrame:
+        """
+        Gets all 'Maps to' relationships of the codes of the given vocabulary.
+
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :return: a dataframe with the columns 'concept_code' and 'snomed_id'
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        query: str = f"SELECT c.concept_code, cr.concept_id_2 AS snomed_id " \
+                     f"FROM {self.DB_SCHEMA}.concept c " \
+                     f"JOIN {self.DB_SCHEMA}.concept_relationship cr ON cr.concept_id_1 = c.concept_id " \
+                     f"WHERE cr.relationship_id = 'Maps to' AND c.vocabulary_id = '{vocabulary_id}';"
+        return self.send_query(query)
+
+    def get_vocabulary_versions(self, vocabulary_ids: List[str]) -> Dict[str, str]:
+        """
+        Gets the versions of the given vocabularies from the vocabulary table.
+
+        :param vocabulary_ids: Unique names of the vocabularies, e.g. 'ICD10GM' or 'OPS'
+        :return: a dict mapping every vocabulary_id to its version
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        ids: str = ",".join(f"'{vocabulary_id}'" for vocabulary_id in vocabulary_ids)
+        query: str = f"SELECT vocabulary_id, vocabulary_version FROM {self.DB_SCHEMA}.vocabulary " \
+                     f"WHERE vocabulary_id IN ({ids});"
+        df: pd.DataFrame = self.send_query(query)
+        return {row['vocabulary_id']: str(row['vocabulary_version']) for _, row in df.iterrows()}
+
     def send_query(self, query: str) -> pd.DataFrame:
         """
         Sends the given query to the database and returns a dataframe of the results.
@@ -252,19 +720,27 @@ class DBManager:
                 logging.error(error2)
             raise AttributeError("Error during database operation. Check if there is an active connection.")
 
+    def generate_ids(self, table: str, field: str, count: int) -> List[int]:
+        """
+        Generates the given number of unique identifiers that are not already taken by an entry in the given table.
+        Only the first call for a table queries the database, see IdAllocator.
+
+        :param table: name of the table in the database
+        :param field: column name that holds the ids for the table
+        :param count: number of ids
+        :return: a list of integers that are currently not used by the table as ids
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        return self.id_allocator.allocate(table, field, count, lambda: self.get_max_id(table, field))
+
     def generate_condition_occurrence_id(self) -> int:
         """
         Generates a unique identifier that is not already taken by an entry in the condition_occurrence table.
 
         :return: an integer that is currently not used by the condition-occurrence table as an id
         """
-        # Generates a random number until no match is found in the condition occurrence table
-        new_id = randrange(10000, 9999999)
-        while self.id_is_taken(OmopTableEnum.CONDITION_OCCURRENCE.value,
-                               OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value,
-                               new_id):
-            new_id = randrange(10000, 9999999)
-        return new_id
+        return self.generate_ids(OmopTableEnum.CONDITION_OCCURRENCE.value,
+                                 OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value, 1)[0]
 
     def generate_patient_id(self) -> int:
         """
@@ -272,10 +748,7 @@ class DBManager:
 
         :return: an integer that is currently not used by the person table as an id
         """
-        new_id = randrange(10000, 9999999)
-        while self.id_is_taken(OmopTableEnum.PERSON.value, OmopPersonFieldsEnum.PERSON_ID.value, new_id):
-            new_id = randrange(10000, 9999999)
-        return new_id
+        return self.generate_ids(OmopTableEnum.PERSON.value, OmopPersonFieldsEnum.PERSON_ID.value, 1)[0]
 
     def generate_case_id(self) -> int:
         """
@@ -283,11 +756,7 @@ class DBManager:
 
         :return: an integer that is currently not used by the case table as an id
         """
-        new_id = randrange(10000, 9999999)
-        while self.id_is_taken(OmopTableEnum.OBSERVATION_PERIOD.value,
-                               OmopObservationPeriodFieldsEnum.ID.value, new_id):
-            new_id = randrange(10000, 9999999)
-        return new_id
+        return self.generate_ids(OmopTableEnum.OBSERVATION_PERIOD.value, OmopObservationPeriodFieldsEnum.ID.value, 1)[0]
 
     def generate_measurement_id(self):
         """
@@ -295,11 +764,82 @@ class DBManager:
 
         :return: an integer that is currently not used by the measurement table as an id
         """
-        new_id = randrange(10000, 9999999)
-        while self.id_is_taken(OmopTableEnum.MEASUREMENT.value,
-                               OmopMeasurementEnum.ID.value, new_id):
-            new_id = randrange(10000, 9999999)
-        return new_id
+        return self.generate_ids(OmopTableEnum.MEASUREMENT.value, OmopMeasurementEnum.ID.value, 1)[0]
+
+    def get_max_id(self, table: str, field: str) -> int:
+        """
+        Gets the highest id used by the given table.
+
+        :param table: name of the table in the database
+        :param field: column name that holds the ids for the table
+        :return: the highest id or 0 if the table is empty
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        query: str = f"SELECT COALESCE(MAX({field}), 0) AS max_id FROM {self.DB_SCHEMA}.{table}"
+        result_df: pd.DataFrame = self.send_query(query)
+        return int(result_df.iloc[0]['max_id'])
+
+    def get_table_fingerprint(self, tables: Dict[str, str]) -> Dict[str, List[int]]:
+        """
+        Gets the number of rows and the highest id of the given tables with a single query. Can be used to detect
+        whether the content of the tables has changed.
+
+        :param tables: dict mapping table names to the column that holds the ids for the table
+        :return: dict mapping every table name to a list [row count, highest id or 0 if the table is empty]
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        query: str = " UNION ALL ".join(f"SELECT '{table}' AS table_name, COUNT(*) AS row_count, "
+                                        f"COALESCE(MAX({field}), 0) AS max_id FROM {self.DB_SCHEMA}.{table}"
+                                        for table, field in tables.items())
+        result_df: pd.DataFrame = self.send_query(query)
+        return {table: [int(row_count), int(max_id)]
+                for table, row_count, max_id in result_df.itertuples(index=False, name=None)}
+
+    def get_column_types(self, table: OmopTableEnum) -> Dict[str, str]:
+        """
+        Gets the data types of the columns of the given table.
+
+        :param table: the omop table
+        :return: dict mapping every column name to its data type, as named by information_schema.columns
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        query: str = f"SELECT column_name, data_type FROM information_schema.columns " \
+                     f"WHERE table_schema = '{self.DB_SCHEMA}' AND table_name = '{table.value}'"
+        result_df: pd.DataFrame = self.send_query(query)
+        return dict(result_df.itertuples(index=False, name=None))
+
+    def read_table(self, table: OmopTableEnum, columns: List[str]) -> pd.DataFrame:
+        """
+        Reads the given columns of all rows of the given table by streaming them from the database with
+        'COPY ... TO STDOUT'. All values are read as text, like they are written by COPY, missing values are NaN.
+
+        :param table: the omop table
+        :param columns: names of the columns that are read
+        :return: a dataframe with the given columns as strings
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        query = f"COPY (SELECT {','.join(columns)} FROM {self.DB_SCHEMA}.{table.value}) " \
+                f"TO STDOUT WITH (FORMAT csv, NULL '{COPY_NULL}')"
+        cursor = None
+        try:
+            buffer = io.StringIO()
+            cursor = self.conn.cursor()
+            cursor.copy_expert(query, buffer)
+            cursor.close()
+            buffer.seek(0)
+            return pd.read_csv(buffer, header=None, names=columns, dtype=str, keep_default_na=False,
+                               na_values=[COPY_NULL])
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown. There might be data loss.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
 
     def id_is_taken(self, table: str, field: str, new_id: int) -> bool:
         """
@@ -384,6 +924,127 @@ class DBManager:
                 logging.error(error2)
             raise AttributeError("Error during database operation. Check if there is an active connection.")
 
+    def update_patient_rows(self, person_id: int, person_fields: Dict[str, object], deleted_conditions: List[int],
+                            deleted_measurements: List[int], inserts: List[Tuple[OmopTableEnum, pd.DataFrame]]) -> bool:
+        """
+        Applies all changes of a patient in a single transaction: One UPDATE of the person row, one DELETE per table
+        for the removed condition and measurement concepts and one INSERT per table for the new rows.
+        Either all changes are saved or none of them.
+
+        :param person_id: id of the person that will be updated
+        :param person_fields: new values of the person row by field name
+        :param deleted_conditions: condition_concept_ids that are removed from the person
+        :param deleted_measurements: measurement_concept_ids that are removed from the person
+        :param inserts: new rows as (table, dataframe with omop data), empty dataframes are skipped
+        :return: True if the transaction was successfully committed
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        cursor = None
+        query: str = ""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+            if person_fields:
+                assignments: str = ", ".join(f"{field} = %s" for field in person_fields)
+                query = f"UPDATE {OmopTableEnum.PERSON.value} SET {assignments} " \
+                        f"WHERE {OmopPersonFieldsEnum.PERSON_ID.value} = %s;"
+                cursor.execute(query, list(person_fields.values()) + [person_id])
+            if deleted_conditions:
+                query = f"DELETE FROM {OmopTableEnum.CONDITION_OCCURRENCE.value} " \
+                        f"WHERE {OmopConditionOccurrenceFieldsEnum.PERSON_ID.value} = %s " \
+                        f"AND {OmopConditionOccurrenceFieldsEnum.CONDITION_CONCEPT_ID.value} = ANY(%s);"
+                cursor.execute(query, (person_id, list(deleted_conditions)))
+            if deleted_measurements:
+                query = f"DELETE FROM {OmopTableEnum.MEASUREMENT.value} " \
+                        f"WHERE {OmopMeasurementEnum.PERSON_ID.value} = %s " \
+                        f"AND {OmopMeasurementEnum.CONCEPT_ID.value} = ANY(%s);"
+                cursor.execute(query, (person_id, list(deleted_measurements)))
+            for table, df in inserts:
+                if df.empty:
+                    continue
+                query = f"INSERT INTO {table.value}({','.join(df.columns)}) VALUES %s"
+                psycopg2.extras.execute_values(cursor, query, [tuple(x) for x in df.to_numpy()])
+            self.conn.commit()
+            logging.info("Successfully updated the patient.")
+            cursor.close()
+            return True
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
+    def apply_table_changes(self, inserts: List[Tuple[OmopTableEnum, pd.DataFrame]],
+                            updates: List[Tuple[OmopTableEnum, str, pd.DataFrame]],
+                            deletes: List[Tuple[OmopTableEnum, str, List[int]]]) -> bool:
+        """
+        Applies changes to several omop tables in a single transaction. Either all changes are saved or none of them.
+        First the inserts and updates are applied in the given order, then the deletes in the given order. Tables
+        have to be given in the order of their foreign keys for inserts and updates and in reverse order for deletes.
+
+        New rows are streamed with 'COPY ... FROM STDIN'. Changed rows are streamed into a temporary table, that is
+        joined with the table in one UPDATE.
+
+        :param inserts: new rows as (table, dataframe with omop data), empty dataframes are skipped
+        :param updates: changed rows as (table, id column, dataframe with omop data). Every row overwrites the row with
+        the same id, empty dataframes are skipped
+        :param deletes: removed rows as (table, id column, ids of the removed rows), empty lists are skipped
+        :return: True if the transaction was successfully committed
+        :raises AttributeError: If the operation fails, e.g. if there is no active database connection
+        """
+        cursor = None
+        query: str = ""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SET search_path TO {self.DB_SCHEMA}")
+            for table, df in inserts:
+                if df.empty:
+                    continue
+                query = f"COPY {table.value}({','.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+                cursor.copy_expert(query, to_copy_buffer(df))
+            for table, id_column, df in updates:
+                if df.empty:
+                    continue
+                changes: str = f"{table.value}_changes"
+                query = f"CREATE TEMPORARY TABLE {changes} (LIKE {table.value}) ON COMMIT DROP"
+                cursor.execute(query)
+                query = f"COPY {changes}({','.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+                cursor.copy_expert(query, to_copy_buffer(df))
+                assignments: str = ", ".join(f"{column} = {changes}.{column}"
+                                             for column in df.columns if column != id_column)
+                query = f"UPDATE {table.value} SET {assignments} FROM {changes} " \
+                        f"WHERE {table.value}.{id_column} = {changes}.{id_column}"
+                cursor.execute(query)
+            for table, id_column, ids in deletes:
+                if not ids:
+                    continue
+                query = f"DELETE FROM {table.value} WHERE {id_column} = ANY(%s)"
+                cursor.execute(query, ([int(row_id) for row_id in ids],))
+            self.conn.commit()
+            logging.info("Successfully applied the changes.")
+            cursor.close()
+            # Rows are saved with their own ids, counters for new ids have to be initialized again
+            for table, _ in inserts:
+                self.id_allocator.invalidate(table.value)
+            return True
+        except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error:
+            logging.error(f"Failed to perform query: \n Query: {query}")
+            logging.error("An error occurred during the database operation:")
+            logging.error(error)
+            try:
+                self.conn.rollback()
+                cursor.close()
+            except (Exception, psycopg2.DatabaseError, AttributeError, TypeError, ValueError) as error2:
+                logging.error("Another error occurred during shutdown/rollback. There might be data corruption.")
+                logging.error(error2)
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+
     def update_person_field(self, person_id: int, field: str, value):
         """
         Updates the entry of the person with the given id. The value of the field with the given field-name will be
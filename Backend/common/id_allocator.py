@@ -0,0 +1,62 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Key of a counter: (table name, id field name)
+IdKey = Tuple[str, str]
+
+
+class IdAllocator:
+    """
+    Thread-safe allocator for unique ids of the omop tables.
+    The highest id of a table is queried only once. Afterwards ids are handed out from a local counter, so allocating
+    any number of ids costs no further database round-trips.
+
+    The counters have to be invalidated whenever rows are written to a table without using ids of this allocator
+    (e.g. by the etl job) or the tables are cleared. The next allocation then queries the highest id again.
+    """
+
+    def __init__(self, min_id: int = 1):
+        """
+        Creates a new allocator.
+
+        :param min_id: the smallest id that is handed out
+        """
+        self._min_id: int = min_id
+        self._counters: Dict[IdKey, int] = dict()
+        self._lock = threading.Lock()
+
+    def allocate(self, table: str, field: str, count: int, fetch_max_id: Callable[[], int]) -> List[int]:
+        """
+        Reserves the given number of consecutive ids for the given table.
+
+        :param table: name of the table in the database
+        :param field: column name that holds the ids for the table
+        :param count: number of ids
+        :param fetch_max_id: function that returns the highest id currently used by the table, only called if there
+        is no counter for the table yet
+        :return: list of unused ids
+        """
+        if count <= 0:
+            return list()
+        key: IdKey = (table, field)
+        with self._lock:
+            if key not in self._counters:
+                self._counters[key] = max(fetch_max_id(), self._min_id - 1)
+                logging.debug(f"Initialized id counter for {table}.{field} at {self._counters[key]}.")
+            first_id: int = self._counters[key] + 1
+            self._counters[key] += count
+        return list(range(first_id, first_id + count))
+
+    def invalidate(self, table: Optional[str] = None):
+        """
+        Removes the counters of the given table or of all tables.
+
+        :param table: name of the table in the database or None for all tables
+        """
+        with self._lock:
+            if table is None:
+                self._counters.clear()
+            else:
+                for key in [key for key in self._counters if key[0] == table]:
+                    del self._counters[key]
@@ -0,0 +1,172 @@
+import datetime
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.definitions import ROOT_DIR
+
+# Default location of the snapshot file
+DEFAULT_SNAPSHOT_PATH: str = os.path.join(ROOT_DIR, "data", "vocabulary", "vocabulary_snapshot.npz")
+# Vocabularies used by the etl job
+SNAPSHOT_VOCABULARIES: List[str] = ['ICD10GM', 'OPS', 'LOINC']
+
+
+class VocabularySnapshot:
+    """
+    Local, read-only copy of the 'Maps to' relationships of some vocabularies of the omop database.
+    For every vocabulary the codes are stored as a sorted array next to an array with the corresponding SNOMED-Ids, so
+    a code is resolved with a binary search without any database access.
+
+    The snapshot is saved as a (compressed) numpy .npz file. The file contains a format version, that is checked while
+    loading, and metadata like the creation date and the vocabulary versions of the source database.
+    """
+
+    # Has to be increased whenever the layout of the file changes
+    FORMAT_VERSION: int = 1
+
+    def __init__(self, mappings: Dict[str, pd.DataFrame], metadata: dict = None):
+        """
+        Creates a new snapshot from the given mappings.
+
+        :param mappings: for every vocabulary_id a dataframe with the columns 'concept_code' and 'snomed_id'
+        :param metadata: additional information that is stored in the snapshot file
+        """
+        self.metadata: dict = dict(metadata) if metadata else dict()
+        # File the snapshot was loaded from or saved to
+        self.path: Optional[str] = None
+        self._codes: Dict[str, np.ndarray] = dict()
+        self._snomed_ids: Dict[str, np.ndarray] = dict()
+        for vocabulary_id, mapping_df in mappings.items():
+            # Keep the first mapping of every code, like DBManager.get_snomed_id does
+            mapping_df = mapping_df.drop_duplicates(subset=['concept_code'], keep='first')
+            mapping_df = mapping_df.sort_values('concept_code', kind='stable')
+            self._codes[vocabulary_id] = mapping_df['concept_code'].to_numpy(dtype=str)
+            self._snomed_ids[vocabulary_id] = mapping_df['snomed_id'].to_numpy(dtype=np.int64)
+
+    def __len__(self) -> int:
+        return sum(len(codes) for codes in self._codes.values())
+
+    @property
+    def vocabulary_ids(self) -> List[str]:
+        return list(self._codes.keys())
+
+    def get_snomed_id(self, code: str, vocabulary_id: str) -> int:
+        """
+        Gets the SNOMED-Id for the given (normalized) code.
+
+        :param code: the given non-standard code
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :return: the corresponding SNOMED-Id or 0 if there is no mapping for the given code
+        """
+        return self.get_snomed_ids([code], vocabulary_id).get(code, 0)
+
+    def get_snomed_ids(self, codes: Iterable[str], vocabulary_id: str) -> Dict[str, int]:
+        """
+        Gets the SNOMED-Ids for all given (normalized) codes.
+
+        :param codes: the given non-standard codes
+        :param vocabulary_id: Unique name of the vocabulary, e.g. 'ICD10GM' or 'OPS'
+        :return: a dict mapping every given code to its SNOMED-Id or 0 if there is no mapping for the code
+        """
+        codes = list(codes)
+        if vocabulary_id not in self._codes:
+            logging.warning(f"The vocabulary {vocabulary_id} is not part of the vocabulary snapshot.")
+            return {code: 0 for code in codes}
+        known_codes: np.ndarray = self._codes[vocabulary_id]
+        if not codes or len(known_codes) == 0:
+            return {code: 0 for code in codes}
+
+        # Binary search for all codes at once
+        query: np.ndarray = np.asarray(codes, dtype=str)
+        positions: np.ndarray = np.searchsorted(known_codes, query)
+        # Positions behind the last element can't be a match
+        positions = np.minimum(positions, len(known_codes) - 1)
+        found: np.ndarray = known_codes[positions] == query
+        snomed_ids: np.ndarray = np.where(found, self._snomed_ids[vocabulary_id][positions], 0)
+        return dict(zip(codes, snomed_ids.tolist()))
+
+    def save(self, path: str = DEFAULT_SNAPSHOT_PATH):
+        """
+        Saves the snapshot to the given path.
+
+        :param path: path of the .npz file
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        metadata = dict(self.metadata)
+        metadata['format_version'] = self.FORMAT_VERSION
+        metadata['vocabulary_ids'] = self.vocabulary_ids
+        arrays: Dict[str, np.ndarray] = {'metadata': np.array(json.dumps(metadata))}
+        for vocabulary_id in self.vocabulary_ids:
+            arrays[f"codes_{vocabulary_id}"] = self._codes[vocabulary_id]
+            arrays[f"snomed_ids_{vocabulary_id}"] = self._snomed_ids[vocabulary_id]
+        # Write to a temporary file first, so an existing snapshot is never left half written
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        self.path = path
+        logging.info(f"Saved vocabulary snapshot with {len(self)} mappings to {path}.")
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_SNAPSHOT_PATH) -> "VocabularySnapshot":
+        """
+        Loads a snapshot from the given path.
+
+        :param path: path of the .npz file
+        :return: the loaded snapshot
+        :raises ValueError: If the file is not a valid snapshot or has an unsupported format version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            try:
+                metadata: dict = json.loads(str(data['metadata']))
+            except KeyError:
+                raise ValueError(f"{path} is not a vocabulary snapshot.")
+            if metadata.get('format_version') != cls.FORMAT_VERSION:
+                raise ValueError(f"Unsupported format version {metadata.get('format_version')} of the vocabulary "
+                                 f"snapshot {path}. Expected version {cls.FORMAT_VERSION}.")
+            snapshot = cls(dict(), metadata)
+            for vocabulary_id in metadata['vocabulary_ids']:
+                # Arrays are already sorted and free of duplicates
+                snapshot._codes[vocabulary_id] = data[f"codes_{vocabulary_id}"]
+                snapshot._snomed_ids[vocabulary_id] = data[f"snomed_ids_{vocabulary_id}"]
+        snapshot.path = path
+        logging.info(f"Loaded vocabulary snapshot with {len(snapshot)} mappings from {path}.")
+        return snapshot
+
+
+def export_snapshot(db_manager, path: str = DEFAULT_SNAPSHOT_PATH,
+                    vocabulary_ids: List[str] = None) -> VocabularySnapshot:
+    """
+    Exports the 'Maps to' relationships of the given vocabularies from the database into a snapshot file.
+
+    :param db_manager: DBManager with an active connection to the database
+    :param path: path of the .npz file
+    :param vocabulary_ids: the exported vocabularies, by default ICD10GM, OPS and LOINC
+    :return: the exported snapshot
+    :raises AttributeError: If the database operation fails
+    """
+    vocabulary_ids = vocabulary_ids if vocabulary_ids is not None else SNAPSHOT_VOCABULARIES
+    mappings: Dict[str, pd.DataFrame] = dict()
+    for vocabulary_id in vocabulary_ids:
+        mappings[vocabulary_id] = db_manager.get_vocabulary_mappings(vocabulary_id)
+
+    metadata = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'db_schema': db_manager.DB_SCHEMA,
+        'vocabulary_versions': db_manager.get_vocabulary_versions(vocabulary_ids)
+    }
+    snapshot = VocabularySnapshot(mappings, metadata)
+    snapshot.save(path)
+    return snapshot
+
+
+if __name__ == "__main__":
+    # Export the vocabulary snapshot using the default configuration (and command line arguments)
+    from Backend.common.config import generate_config
+    from Backend.common.database import DBManager
+
+    _, db_config = generate_config()
+    export_snapshot(DBManager(db_config, clear_tables=False))
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+from Backend.etl import staging
+from Backend.etl.csv_schemas import CsvSchema
+from config.definitions import ROOT_DIR
+
+# Default directory of the checkpoints
+DEFAULT_CHECKPOINT_DIR: str = os.path.join(ROOT_DIR, "data", "checkpoints")
+# Has to be increased whenever the persisted frames change without a change of their inputs
+CHECKPOINT_FORMAT_VERSION: int = 1
+# Name of the manifest file in the checkpoint directory
+MANIFEST_FILE: str = "manifest.json"
+
+
+def hash_inputs(*inputs: str) -> str:
+    """
+    Combines the given hashes or values into a single hash, e.g. the hashes of the files a stage reads.
+
+    :param inputs: the hashes or values in a fixed order
+    :return: sha256 hex digest
+    """
+    return hashlib.sha256("\n".join(inputs).encode()).hexdigest()
+
+
+class EtlCheckpoint:
+    """
+    Checkpoints of the stages of an etl job (see ETL_STAGES), so a restarted job can continue after the last finished
+    stage instead of starting again.
+
+    Every finished stage is recorded in a manifest with the hash of its input. Extract and transform stages also
+    persist their resulting frame. A stage is skipped by a later run, if it was finished with the same input hash.
+    Changed csv files therefore run their stages again, as do all stages that depend on them.
+
+    The checkpoints are meant to be removed after a successful run, see clear. Without a directory checkpoints are
+    disabled and nothing is skipped.
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_CHECKPOINT_DIR):
+        """
+        Creates a new checkpoint and reads the manifest of a previous run from the directory.
+
+        :param directory: directory of the manifest and the persisted frames or None to disable checkpoints
+        """
+        self.directory: Optional[str] = directory
+        # Entries of the finished stages by '{step}/{name}'
+        self._stages: Dict[str, dict] = dict()
+        self._lock = threading.Lock()
+        if directory is not None:
+            self._read_manifest()
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def hash_csv(self, csv_path: str, schema: Optional[CsvSchema] = None) -> str:
+        """
+        Hashes the input of the extract stage of the given csv file, see staging.hash_csv.
+
+        :return: the hash or an empty string if checkpoints are disabled, so the file isn't read for nothing
+        """
+        return staging.hash_csv(csv_path, schema) if self.enabled else ""
+
+    def hash_file(self, path: str) -> str:
+        """
+        Hashes the content of the given file, e.g. of a vocabulary snapshot, see staging.hash_file.
+
+        :return: the hash or an empty string if checkpoints are disabled
+        """
+        return staging.hash_file(path) if self.enabled else ""
+
+    def is_done(self, step: str, name: str, input_hash: str) -> bool:
+        """
+        Checks if the given stage was finished with the given input.
+
+        :param step: step of the stage, e.g. 'load'
+        :param name: name of the stage, e.g. the name of the table
+        :param input_hash: hash of the current input of the stage
+        :return: True if the stage can be skipped
+        """
+        with self._lock:
+            entry: Optional[dict] = self._stages.get(f"{step}/{name}")
+        return entry is not None and entry['input_hash'] == input_hash
+
+    def get(self, step: str, name: str, input_hash: str) -> Optional[pd.DataFrame]:
+        """
+        Gets the persisted frame of the given stage, if it was finished with the given input.
+
+        :param step: step of the stage, e.g. 'transform'
+        :param name: name of the stage, e.g. the name of the transformation
+        :param input_hash: hash of the current input of the stage
+        :return: the frame or None if the stage has to run again
+        """
+        if not self.is_done(step, name, input_hash):
+            return None
+        path: str = self._get_frame_path(step, name)
+        try:
+            df: pd.DataFrame = pd.read_pickle(path)
+            logging.info(f"Skipping the finished stage {step} {name}.")
+            return df
+        except (OSError, ValueError, EOFError) as error:
+            logging.warning(f"Could not read the checkpoint {path}. Running the stage {step} {name} again.")
+            logging.warning(error)
+            return None
+
+    def save(self, step: str, name: str, input_hash: str, df: Optional[pd.DataFrame] = None):
+        """
+        Records the given stage as finished. Errors are only logged, because the etl job doesn't depend on the
+        checkpoints.
+
+        :param step: step of the stage
+        :param name: name of the stage
+        :param input_hash: hash of the input of the stage
+        :param df: Optional resulting frame of the stage, that is persisted
+        """
+        if not self.enabled:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if df is not None:
+                path: str = self._get_frame_path(step, name)
+                # Write to a temporary file first, so a checkpoint is never read half written
+                tmp_path: str = f"{path}.{os.getpid()}.tmp"
+                df.to_pickle(tmp_path)
+                os.replace(tmp_path, path)
+            with self._lock:
+                self._stages[f"{step}/{name}"] = {'input_hash': input_hash}
+                self._write_manifest()
+        except (OSError, ValueError) as error:
+            logging.warning(f"Could not save the checkpoint of the stage {step} {name}.")
+            logging.warning(error)
+
+    def discard(self, step: str):
+        """
+        Removes the entries of all stages of the given step, so they run again. E.g. if loaded tables were cleared.
+
+        :param step: step of the stages
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stages = {key: entry for key, entry in self._stages.items() if not key.startswith(f"{step}/")}
+            try:
+                self._write_manifest()
+            except OSError as error:
+                logging.warning(f"Could not discard the checkpoints of the step {step}.")
+                logging.warning(error)
+
+    def clear(self):
+        """
+        Removes all checkpoints, e.g. after a successful run.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stages.clear()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _get_frame_path(self, step: str, name: str) -> str:
+        return os.path.join(self.directory, f"{step}-{name}.pkl")
+
+    def _read_manifest(self):
+        path: str = os.path.join(self.directory, MANIFEST_FILE)
+        if not os.path.isfile(path):
+            return
+        try:
+            with open(path, "r") as file:
+                manifest: dict = json.load(file)
+            if manifest.get('version') == CHECKPOINT_FORMAT_VERSION:
+                self._stages = manifest['stages']
+                logging.info(f"Found checkpoints of {len(self._stages)} stages in {self.directory}.")
+        except (OSError, ValueError, KeyError) as error:
+            logging.warning(f"Could not read the checkpoint manifest {path}.")
+            logging.warning(error)
+
+    def _write_manifest(self):
+        """
+        Writes the manifest, the lock has to be held.
+        """
+        path: str = os.path.join(self.directory, MANIFEST_FILE)
+        tmp_path: str = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({'version': CHECKPOINT_FORMAT_VERSION, 'stages': self._stages}, file, indent=2)
+        os.replace(tmp_path, path)
@@ -31,7 +31,7 @@ class DiagnosisColumnsEnum(Enum):
     PATIENT_ID = "PATIENT_ID"
     ADMISSION_NUMBER = "ADMISSION_NUMBER"
     ADMISSION_DATE = "ADMISSION_DATE"
-    ICD_PRIMARY_CODE = "ICD_PRIMARY_CODE",
+    ICD_PRIMARY_CODE = "ICD_PRIMARY_CODE"
     ICD_SECONDARY_CODE = "ICD_SECONDARY_CODE"
     DIAGNOSIS_TYPE = "DIAGNOSIS_TYPE"
 
@@ -42,6 +42,8 @@ class LabColumnsEnum(Enum):
     """
     ID = "IDENTIFIER"
     STATUS = "STATUS"
+    CATEGORY = "CATEGORY"
+    NAME = "PARAMETER_NAME"
     LOINC = "PARAMETER_LOINC"
     PATIENT_ID = "PATIENT_ID"
     PATIENT_ID_ALT = "Patientidentifikator"
@@ -51,7 +53,7 @@ class LabColumnsEnum(Enum):
     UNIT = "UNIT"
     NORMAL_VALUES = "NORMAL_VALUES"
     IS_NORMAL = "IS_NORMAL"
-    DEVIATION = "COMMENT"
+    DEVIATION = "DEVIATION"
     COMMENT = "COMMENT"
     UCUM_UNIT = "UCUM_UNIT"
 
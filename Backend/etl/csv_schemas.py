@@ -0,0 +1,84 @@
+from typing import Dict, List
+
+from Backend.etl.csv_enums import CsvFilesEnum, CaseColumnsEnum, DiagnosisColumnsEnum, LabColumnsEnum, \
+    PersonColumnsEnum, ProcedureColumnsEnum
+
+# Formats of the date columns of the csv files
+DATE_FORMAT: str = "%Y-%m-%d"
+DATETIME_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+
+
+class CsvSchema:
+    """
+    Columns of a csv file that are used by the etl job. Columns that are not part of the schema are not read at all.
+    """
+
+    def __init__(self, dtypes: Dict[str, str], dates: Dict[str, str] = None):
+        """
+        Creates a new schema.
+
+        :param dtypes: dtype ('int64', 'float64' or 'str') of every used column that is not a date. Id columns that
+        may be empty have to be 'float64', because 'int64' columns can't hold missing values
+        :param dates: format of every used date column, the columns are parsed into datetime64 columns
+        """
+        self.dtypes: Dict[str, str] = dtypes
+        self.dates: Dict[str, str] = dates if dates else dict()
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.dtypes.keys()) + list(self.dates.keys())
+
+
+# Schemas of the provided csv files
+CSV_SCHEMAS: Dict[CsvFilesEnum, CsvSchema] = {
+    CsvFilesEnum.PERSON: CsvSchema(
+        dtypes={
+            PersonColumnsEnum.PROVIDER_ID.value: 'int64',
+            PersonColumnsEnum.ID.value: 'int64',
+            PersonColumnsEnum.NAME.value: 'str',
+            PersonColumnsEnum.FORENAME.value: 'str',
+            PersonColumnsEnum.GENDER.value: 'str',
+            PersonColumnsEnum.CITY.value: 'str',
+            # Zip codes may start with 0
+            PersonColumnsEnum.ZIP.value: 'str'
+        },
+        dates={PersonColumnsEnum.BIRTHDATE.value: DATE_FORMAT}),
+    CsvFilesEnum.CASE: CsvSchema(
+        dtypes={
+            CaseColumnsEnum.ID.value: 'int64',
+            CaseColumnsEnum.PROVIDER_ID.value: 'int64',
+            CaseColumnsEnum.PATIENT_ID.value: 'int64'
+        },
+        dates={CaseColumnsEnum.START.value: DATETIME_FORMAT,
+               CaseColumnsEnum.END.value: DATETIME_FORMAT}),
+    CsvFilesEnum.DIAGNOSIS: CsvSchema(
+        dtypes={
+            DiagnosisColumnsEnum.PROVIDER_ID.value: 'int64',
+            DiagnosisColumnsEnum.PATIENT_ID.value: 'int64',
+            DiagnosisColumnsEnum.ICD_PRIMARY_CODE.value: 'str',
+            DiagnosisColumnsEnum.ICD_SECONDARY_CODE.value: 'str',
+            DiagnosisColumnsEnum.DIAGNOSIS_TYPE.value: 'str'
+        },
+        dates={DiagnosisColumnsEnum.ADMISSION_DATE.value: DATE_FORMAT}),
+    CsvFilesEnum.LAB: CsvSchema(
+        dtypes={
+            LabColumnsEnum.ID.value: 'float64',
+            LabColumnsEnum.NAME.value: 'str',
+            LabColumnsEnum.LOINC.value: 'str',
+            # Only one of the patient id columns is part of a lab file
+            LabColumnsEnum.PATIENT_ID.value: 'int64',
+            LabColumnsEnum.PATIENT_ID_ALT.value: 'str',
+            LabColumnsEnum.NUMERIC_VALUE.value: 'float64',
+            LabColumnsEnum.UCUM_UNIT.value: 'str',
+            LabColumnsEnum.IS_NORMAL.value: 'float64',
+            LabColumnsEnum.DEVIATION.value: 'str'
+        },
+        dates={LabColumnsEnum.DATE.value: DATETIME_FORMAT}),
+    CsvFilesEnum.PROCEDURE: CsvSchema(
+        dtypes={
+            ProcedureColumnsEnum.ID.value: 'float64',
+            ProcedureColumnsEnum.OPS_CODE.value: 'str',
+            ProcedureColumnsEnum.PATIENT_ID.value: 'int64'
+        },
+        dates={ProcedureColumnsEnum.DATE.value: DATETIME_FORMAT})
+}
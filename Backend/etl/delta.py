@@ -0,0 +1,208 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from Backend.common.database import DBManager
+from Backend.common.omop_enums import OmopTableEnum
+from Backend.etl.load import get_id_column, load_order
+from Backend.etl.progress import EtlProgress
+
+# Natural keys of the rows of the omop tables. A row of a new extract that has the same key as a loaded row replaces
+# that row. The keys are derived from the keys of the source tables: tables with ids of the csv files are keyed by
+# them, the ids of the other tables are generated by the transformation and can't be used to match rows.
+TABLE_KEYS: Dict[OmopTableEnum, List[str]] = {
+    OmopTableEnum.PROVIDER: ['provider_id'],
+    # PERSON.csv: PATIENT_ID
+    OmopTableEnum.LOCATION: ['location_id'],
+    OmopTableEnum.PERSON: ['person_id'],
+    # CASE.csv: one period per patient
+    OmopTableEnum.OBSERVATION_PERIOD: ['person_id'],
+    # CASE.csv: case ids are duplicated, cases are matched by patient, provider and dates
+    OmopTableEnum.VISIT_OCCURRENCE: ['person_id', 'provider_id', 'visit_start_date', 'visit_end_date'],
+    # PROCEDURE.csv: ID
+    OmopTableEnum.PROCEDURE_OCCURRENCE: ['procedure_occurrence_id'],
+    # LAB.csv: IDENTIFIER
+    OmopTableEnum.MEASUREMENT: ['measurement_id'],
+    # DIAGNOSIS.csv: one condition per patient, provider, admission date, icd code and diagnosis type
+    OmopTableEnum.CONDITION_OCCURRENCE: ['person_id', 'provider_id', 'condition_start_date', 'condition_source_value',
+                                         'condition_type_concept_id']
+}
+
+# Column of the rows of an omop table that holds the id of their person. Loaded rows are only deleted if their person
+# is part of the new extract, so persons that are missing from a partial extract or were added via the frontend are
+# kept. Rows of tables without such a column are never deleted.
+PERSON_COLUMNS: Dict[OmopTableEnum, Optional[str]] = {
+    OmopTableEnum.PROVIDER: None,
+    # The location of a person has the id of the person
+    OmopTableEnum.LOCATION: 'location_id',
+    OmopTableEnum.PERSON: 'person_id',
+    OmopTableEnum.OBSERVATION_PERIOD: 'person_id',
+    OmopTableEnum.VISIT_OCCURRENCE: 'person_id',
+    OmopTableEnum.PROCEDURE_OCCURRENCE: 'person_id',
+    OmopTableEnum.MEASUREMENT: 'person_id',
+    OmopTableEnum.CONDITION_OCCURRENCE: 'person_id'
+}
+
+# Column that counts rows with the same key, so duplicated rows are matched one by one
+_OCCURRENCE: str = '_occurrence'
+# Column holding the position of a row of the new table during the diff
+_POSITION: str = '_position'
+
+# Text formats of the date types of the database
+_DATE_FORMATS: Dict[str, str] = {
+    'date': '%Y-%m-%d',
+    'timestamp without time zone': '%Y-%m-%d %H:%M:%S.%f'
+}
+# Numeric types of the database
+_NUMERIC_TYPES: List[str] = ['smallint', 'integer', 'bigint', 'numeric', 'real', 'double precision']
+
+
+class TableDelta:
+    """
+    Changes between the loaded rows of an omop table and the rows of a new extract.
+    """
+
+    def __init__(self, table: OmopTableEnum, inserts: pd.DataFrame, updates: pd.DataFrame, deleted_ids: List[int]):
+        """
+        Creates a new delta.
+
+        :param table: the omop table
+        :param inserts: rows of the new extract without a loaded row
+        :param updates: rows of the new extract whose loaded row has different values, with the id of the loaded row
+        :param deleted_ids: ids of the loaded rows of persons of the new extract without a row in the new extract
+        """
+        self.table: OmopTableEnum = table
+        self.inserts: pd.DataFrame = inserts
+        self.updates: pd.DataFrame = updates
+        self.deleted_ids: List[int] = deleted_ids
+
+    @property
+    def size(self) -> int:
+        """
+        Number of changed rows.
+        """
+        return len(self.inserts.index) + len(self.updates.index) + len(self.deleted_ids)
+
+
+def normalize(df: pd.DataFrame, column_types: Dict[str, str]) -> pd.DataFrame:
+    """
+    Converts the columns of the given frame to the values the database stores for them, so rows of a transformed
+    table can be compared to rows that were read from the database: Numbers become floats, dates and timestamps
+    become strings in the format of their type (a datetime saved to a date column loses its time, timestamps keep
+    their fractional seconds) and all other values become strings. Missing values stay missing.
+
+    :param df: rows of an omop table, either transformed or read with DBManager.read_table
+    :param column_types: data types of the columns of the table, see DBManager.get_column_types
+    :return: a new frame with the normalized columns
+    """
+    normalized: pd.DataFrame = pd.DataFrame(index=df.index)
+    for column in df.columns:
+        column_type: str = column_types.get(column, 'text')
+        if column_type in _NUMERIC_TYPES:
+            normalized[column] = pd.to_numeric(df[column]).astype('float64')
+        elif column_type in _DATE_FORMATS:
+            normalized[column] = pd.to_datetime(df[column]).dt.strftime(_DATE_FORMATS[column_type])
+        else:
+            normalized[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    return normalized
+
+
+def diff_table(table: OmopTableEnum, loaded_df: pd.DataFrame, new_df: pd.DataFrame,
+               column_types: Dict[str, str], person_ids: Optional[np.ndarray] = None) -> TableDelta:
+    """
+    Compares the loaded rows of an omop table to the rows of a new extract by the natural keys of the table (see
+    TABLE_KEYS). Rows with the same key are matched in the order of their ids. Loaded rows without a new row are only
+    deleted if they belong to one of the given persons (see PERSON_COLUMNS).
+
+    :param table: the omop table
+    :param loaded_df: the loaded rows, with the id column and all columns of the new rows
+    :param new_df: the transformed rows of the new extract
+    :param column_types: data types of the columns of the table, see DBManager.get_column_types
+    :param person_ids: Optional ids of the persons of the new extract, by default the persons of the new rows
+    :return: the changes, inserted and updated rows are taken from the new rows
+    """
+    keys: List[str] = TABLE_KEYS[table] + [_OCCURRENCE]
+    id_column: str = get_id_column(table)
+    value_columns: List[str] = [column for column in new_df.columns if column not in keys and column != id_column]
+
+    loaded: pd.DataFrame = normalize(loaded_df, column_types).sort_values(id_column, kind='stable')
+    new: pd.DataFrame = normalize(new_df, column_types)
+    new[_POSITION] = np.arange(len(new.index))
+    for df in (loaded, new):
+        df[_OCCURRENCE] = df.groupby(TABLE_KEYS[table], sort=False, dropna=False).cumcount()
+
+    loaded_columns: List[str] = keys + value_columns + ([] if id_column in keys else [id_column])
+    merged: pd.DataFrame = new[keys + value_columns + [_POSITION]].merge(
+        loaded[loaded_columns], on=keys, how='outer', suffixes=('', '_loaded'), indicator=True)
+    inserted: pd.DataFrame = merged[merged['_merge'] == 'left_only']
+    deleted: pd.DataFrame = merged[merged['_merge'] == 'right_only']
+    person_column: Optional[str] = PERSON_COLUMNS[table]
+    if person_column is None:
+        deleted = deleted.iloc[0:0]
+    else:
+        if person_ids is None:
+            person_ids = new[person_column].to_numpy()
+        loaded_persons: pd.Series = deleted[person_column if person_column in keys else f"{person_column}_loaded"]
+        deleted = deleted[np.isin(loaded_persons.to_numpy(dtype='float64'), np.asarray(person_ids, dtype='float64'))]
+    matched: pd.DataFrame = merged[merged['_merge'] == 'both']
+    changed: np.ndarray = np.zeros(len(matched.index), dtype=bool)
+    for column in value_columns:
+        new_values: pd.Series = matched[column]
+        loaded_values: pd.Series = matched[f"{column}_loaded"]
+        changed |= ~((new_values == loaded_values) | (new_values.isna() & loaded_values.isna())).to_numpy()
+    updated: pd.DataFrame = matched[changed]
+
+    inserts: pd.DataFrame = new_df.iloc[inserted[_POSITION].astype(int).to_numpy()]
+    updates: pd.DataFrame = new_df.iloc[updated[_POSITION].astype(int).to_numpy()].copy()
+    # Updated rows keep the id of the loaded row
+    updates[id_column] = updated[id_column].astype(np.int64).to_numpy()
+    deleted_ids: List[int] = deleted[id_column].astype(np.int64).tolist()
+    return TableDelta(table, inserts, updates, deleted_ids)
+
+
+def load_changes(omop_tables: Dict[OmopTableEnum, pd.DataFrame], db_manager: DBManager,
+                 progress: EtlProgress) -> bool:
+    """
+    Loads the given omop tables incrementally: Every table is compared to the rows that are already loaded (see
+    diff_table) and only the inserted, updated and deleted rows are written, in a single transaction. Inserted rows
+    of tables without ids of the csv files get new ids. Only rows of persons that are part of the new extract are
+    deleted, so an extract can hold a subset of the persons.
+
+    :param omop_tables: the omop tables of the new extract by their target table
+    :param db_manager: DBManager used to read the loaded rows and to write the changes
+    :param progress: progress the load stages (see ETL_STAGES) are reported to, the rows of a stage are the number of
+    changed rows
+    :return: True if the changes were saved
+    :raises AttributeError: If a database operation fails
+    """
+    tables: List[OmopTableEnum] = [table for level in load_order(list(omop_tables.keys())) for table in level]
+    # Persons of the new extract, all other persons are kept as they are
+    person_ids: np.ndarray = np.unique(np.concatenate(
+        [pd.to_numeric(df[PERSON_COLUMNS[table]]).to_numpy(dtype='float64') for table, df in omop_tables.items()
+         if PERSON_COLUMNS[table] is not None and PERSON_COLUMNS[table] in df.columns] or [np.zeros(0)]))
+    with progress.stages_running([('load', table.value) for table in tables]) as stages:
+        deltas: List[TableDelta] = list()
+        for table in tables:
+            id_column: str = get_id_column(table)
+            new_df: pd.DataFrame = omop_tables[table]
+            columns: List[str] = list(new_df.columns) if id_column in new_df.columns \
+                else list(new_df.columns) + [id_column]
+            delta: TableDelta = diff_table(table, db_manager.read_table(table, columns), new_df,
+                                           db_manager.get_column_types(table), person_ids)
+            if id_column not in TABLE_KEYS[table] and not delta.inserts.empty:
+                # Generated ids of the new extract may be used by loaded rows
+                delta.inserts = delta.inserts.copy()
+                delta.inserts[id_column] = db_manager.generate_ids(table.value, id_column, len(delta.inserts.index))
+            logging.info(f"Changes of {table.value}: {len(delta.inserts.index)} inserted, "
+                         f"{len(delta.updates.index)} updated, {len(delta.deleted_ids)} deleted.")
+            deltas.append(delta)
+
+        db_manager.apply_table_changes(
+            inserts=[(delta.table, delta.inserts) for delta in deltas],
+            updates=[(delta.table, get_id_column(delta.table), delta.updates) for delta in deltas],
+            deletes=[(delta.table, get_id_column(delta.table), delta.deleted_ids) for delta in reversed(deltas)])
+        for delta in deltas:
+            stages[('load', delta.table.value)].rows = delta.size
+    return True
@@ -1,5 +1,5 @@
 import datetime
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 import os
@@ -11,75 +11,361 @@ from Backend.common.database import DBManager
 from Backend.common.omop_enums import OmopTableEnum, OmopPersonFieldsEnum, OmopLocationFieldsEnum, \
     OmopProviderFieldsEnum, OmopConditionOccurrenceFieldsEnum, SnomedConcepts, OmopObservationPeriodFieldsEnum, \
     OmopMeasurementEnum
-from Backend.etl import extract, transform
+from Backend.etl import delta, extract, load, parallel, transform
 from Backend.etl.csv_enums import CsvFilesEnum
-
-
-def run_etl_job_for_csvs(csv_dir: str, db_config: DbConfig) -> bool:
+from Backend.etl.csv_schemas import CSV_SCHEMAS
+from Backend.etl.checkpoint import EtlCheckpoint, hash_inputs
+from Backend.etl.progress import EtlProgress, EtlStage, StageKey
+from Backend.etl.staging import StagingCache
+
+
+# Transformation of every omop table and the csv files it reads, in the order the tables are transformed and loaded
+TRANSFORMS: Dict[OmopTableEnum, Tuple[Callable[..., pd.DataFrame], List[CsvFilesEnum]]] = {
+    OmopTableEnum.PROVIDER: (transform.generate_provider_table, [CsvFilesEnum.PERSON, CsvFilesEnum.CASE]),
+    OmopTableEnum.LOCATION: (transform.generate_location_table, [CsvFilesEnum.PERSON]),
+    OmopTableEnum.PERSON: (transform.generate_person_table, [CsvFilesEnum.PERSON]),
+    OmopTableEnum.OBSERVATION_PERIOD: (transform.generate_observation_period_table, [CsvFilesEnum.CASE]),
+    OmopTableEnum.VISIT_OCCURRENCE: (transform.generate_visit_occurrence_table, [CsvFilesEnum.CASE]),
+    OmopTableEnum.PROCEDURE_OCCURRENCE: (transform.generate_procedure_occurrence_table, [CsvFilesEnum.PROCEDURE]),
+    OmopTableEnum.MEASUREMENT: (transform.generate_measurement_table, [CsvFilesEnum.LAB]),
+    OmopTableEnum.CONDITION_OCCURRENCE: (transform.generate_condition_occurrence_table, [CsvFilesEnum.DIAGNOSIS])
+}
+
+# Stages of run_etl_job_for_csvs in the order they are run, see EtlProgress
+ETL_STAGES: List[StageKey] = \
+    [('extract', csv_file.value) for csv_file in CsvFilesEnum] + \
+    [('transform', transform_function.__name__) for transform_function, _ in TRANSFORMS.values()] + \
+    [('load', table.value) for table in TRANSFORMS]
+
+
+def run_etl_job_for_csvs(csv_dir: str, db_config: DbConfig, vocabulary_snapshot: Optional[str] = None,
+                         progress: Optional[EtlProgress] = None, chunk_size: Optional[int] = None,
+                         workers: Optional[int] = None, staging_dir: Optional[str] = None,
+                         incremental: bool = False, upsert: bool = False,
+                         checkpoint_dir: Optional[str] = None) -> bool:
     """
     Runs the entire ETL-Job for the given csvs files at the specified path.
     First all csv files are transformed into pandas dataframes. Then they are transformed into omop compliant tables.
     Finally they are loaded into the postgres common.
 
+    If a chunk size is given, the files are streamed instead, see run_streaming_etl_job_for_csvs.
+    If more than one worker is given, the transformations run on a pool of processes, see
+    parallel.run_transforms_in_parallel.
+    If a staging directory is given, the extracted csv files are cached there, see staging.StagingCache.
+    In incremental mode the loaded omop tables are kept and only the changes of the new extract are written, see
+    delta.load_changes.
+    Otherwise the omop tables are replaced by the transformed tables as one unit, see load.load_tables. A failed load
+    leaves the omop tables unchanged.
+    In upsert mode the loaded omop tables are kept as well and the rows are merged into them by their ids. Running the
+    job again overwrites the rows unchanged, also with another number of workers, because the ids don't depend on it.
+    If a checkpoint directory is given, every finished stage is recorded there. A job that is started again after a
+    crash skips the stages that were finished with the same input, see checkpoint.EtlCheckpoint. Loaded tables are
+    only skipped if they still hold the transformed rows, otherwise all tables are loaded again. The checkpoints are
+    removed after a successful run.
+
     :param csv_dir: Directory containing PERSON.csv, ..
     :param db_config: dict with keys: [host, port, db_name, username, password, db_schema]
+    :param vocabulary_snapshot: Optional path to a vocabulary snapshot file used to resolve SNOMED-Ids instead of the
+    vocabulary tables of the database
+    :param progress: Optional progress the stages (see ETL_STAGES) are reported to
+    :param chunk_size: Optional number of rows that are read from a csv file at once
+    :param workers: Optional number of processes the transformations run on, ignored if a chunk size is given
+    :param staging_dir: Optional directory the extracted csv files are staged in, ignored if a chunk size is given
+    :param incremental: True to load only the changes instead of reloading all tables, ignored if a chunk size is given
+    :param upsert: True to merge the rows into the loaded tables, ignored in incremental mode or if a chunk size is
+    given
+    :param checkpoint_dir: Optional directory the checkpoints of the stages are saved in, ignored if a chunk size is
+    given
     :return: void
     """
-    # extract original csv files
-    cwd = os.getcwd()
-    os.chdir(csv_dir)
+    if progress is None:
+        progress = EtlProgress(ETL_STAGES)
+    if chunk_size:
+        return run_streaming_etl_job_for_csvs(csv_dir, db_config, chunk_size, vocabulary_snapshot, progress)
 
+    # extract original csv files
     logging.info("Extracting data from the given csv files...")
-    person_df: pd.DataFrame = extract.extract_csv(CsvFilesEnum.PERSON.value)
-    case_df: pd.DataFrame = extract.extract_csv(CsvFilesEnum.CASE.value)
-    lab_df: pd.DataFrame = extract.extract_csv(CsvFilesEnum.LAB.value)
-    diagnosis_df: pd.DataFrame = extract.extract_csv(CsvFilesEnum.DIAGNOSIS.value)
-    procedure_df: pd.DataFrame = extract.extract_csv(CsvFilesEnum.PROCEDURE.value)
+    extract_csv: Callable[..., pd.DataFrame] = StagingCache(staging_dir).extract_csv if staging_dir \
+        else extract.extract_csv
+    checkpoint: EtlCheckpoint = EtlCheckpoint(checkpoint_dir)
+    extracted: Dict[CsvFilesEnum, pd.DataFrame] = dict()
+    # Hashes of the csv files and their schemas, empty if checkpoints are disabled
+    input_hashes: Dict[CsvFilesEnum, str] = dict()
+    for csv_file in CsvFilesEnum:
+        with progress.stage('extract', csv_file.value) as stage:
+            # Paths are joined instead of changing the working directory, so the job can run in a background thread
+            csv_path: str = os.path.join(csv_dir, csv_file.value)
+            input_hashes[csv_file] = checkpoint.hash_csv(csv_path, CSV_SCHEMAS[csv_file])
+            csv_df: Optional[pd.DataFrame] = checkpoint.get('extract', csv_file.value, input_hashes[csv_file])
+            if csv_df is None:
+                csv_df = extract_csv(csv_path, CSV_SCHEMAS[csv_file])
+                checkpoint.save('extract', csv_file.value, input_hashes[csv_file], csv_df)
+            extracted[csv_file] = csv_df
+            stage.rows = len(extracted[csv_file].index)
+    person_df: pd.DataFrame = extracted[CsvFilesEnum.PERSON]
+    case_df: pd.DataFrame = extracted[CsvFilesEnum.CASE]
+    lab_df: pd.DataFrame = extracted[CsvFilesEnum.LAB]
+    diagnosis_df: pd.DataFrame = extracted[CsvFilesEnum.DIAGNOSIS]
     # Remove all rows with missing data
-    procedure_df = procedure_df.dropna()
-
-    os.chdir(cwd)
-
-    # Establish database connection
-    # 'clear_tables' remove all previously added omop-entries from the database
-    db_manager = DBManager(db_config, clear_tables=True)
+    procedure_df: pd.DataFrame = extracted[CsvFilesEnum.PROCEDURE].dropna()
+
+    # The input of a transformation are the csv files it reads and the concept mappings, the input of a load is the
+    # transformed table and the target database
+    vocabulary_hash: str = checkpoint.hash_file(vocabulary_snapshot) if vocabulary_snapshot else "database"
+    transform_hashes: Dict[OmopTableEnum, str] = {
+        table: hash_inputs(*[input_hashes[csv_file] for csv_file in csv_files], vocabulary_hash)
+        for table, (_, csv_files) in TRANSFORMS.items()}
+    target: str = f"{db_config['host']}:{db_config['port']}/{db_config['db_name']}/{db_config['db_schema']}"
+    load_hashes: Dict[OmopTableEnum, str] = {
+        table: hash_inputs(transform_hashes[table], target, "upsert" if upsert else "insert") for table in TRANSFORMS}
+    # Tables that were loaded by a previous run, the changes of an incremental run are always loaded again
+    loaded_tables: List[OmopTableEnum] = [] if incremental else \
+        [table for table in TRANSFORMS if checkpoint.is_done('load', table.value, load_hashes[table])]
+
+    # Establish database connection, the tables are cleared before the load
+    db_manager = DBManager(db_config, vocabulary_snapshot=vocabulary_snapshot)
+
+    def run_transform(table: OmopTableEnum, *args) -> pd.DataFrame:
+        transform_function: Callable[..., pd.DataFrame] = TRANSFORMS[table][0]
+        with progress.stage('transform', transform_function.__name__) as transform_stage:
+            omop_df: Optional[pd.DataFrame] = checkpoint.get('transform', transform_function.__name__,
+                                                             transform_hashes[table])
+            if omop_df is None:
+                omop_df = transform_function(*args)
+                checkpoint.save('transform', transform_function.__name__, transform_hashes[table], omop_df)
+            transform_stage.rows = len(omop_df.index)
+        return omop_df
+
+    def save_transformed(table: OmopTableEnum, omop_df: pd.DataFrame):
+        checkpoint.save('transform', TRANSFORMS[table][0].__name__, transform_hashes[table], omop_df)
 
     # Transform into omop tables
     logging.info("Transforming input files into omop tables...")
-    omop_provider_df: pd.DataFrame = transform.generate_provider_table(person_df, case_df)
-    omop_location_df: pd.DataFrame = transform.generate_location_table(person_df)
-    omop_person_df: pd.DataFrame = transform.generate_person_table(person_df)
-    omop_observation_period_df: pd.DataFrame = transform.generate_observation_period_table(case_df)
-    omop_visit_occurrence_df: pd.DataFrame = transform.generate_visit_occurrence_table(case_df)
     try:
-        omop_procedure_occurrence_df: pd.DataFrame = transform.generate_procedure_occurrence_table(procedure_df,
-                                                                                                   db_manager)
-        omop_measurement_df: pd.DataFrame = transform.generate_measurement_table(lab_df,
-                                                                                 db_manager)
-        omop_condition_occurrence_df: pd.DataFrame = transform.generate_condition_occurrence_table(diagnosis_df,
-                                                                                                   db_manager)
+        if workers and workers > 1:
+            # The workers can't share the database connection, concept mappings are resolved from a snapshot instead
+            completed: Dict[OmopTableEnum, pd.DataFrame] = dict()
+            for table, (transform_function, _) in TRANSFORMS.items():
+                omop_df: Optional[pd.DataFrame] = checkpoint.get('transform', transform_function.__name__,
+                                                                 transform_hashes[table])
+                if omop_df is not None:
+                    completed[table] = omop_df
+            omop_tables: Dict[OmopTableEnum, pd.DataFrame] = parallel.run_transforms_in_parallel(
+                person_df, case_df, procedure_df, lab_df, diagnosis_df, db_manager.create_vocabulary_loader(),
+                workers, progress, completed=completed, on_transformed=save_transformed)
+        else:
+            omop_tables: Dict[OmopTableEnum, pd.DataFrame] = {
+                OmopTableEnum.PROVIDER: run_transform(OmopTableEnum.PROVIDER, person_df, case_df),
+                OmopTableEnum.LOCATION: run_transform(OmopTableEnum.LOCATION, person_df),
+                OmopTableEnum.PERSON: run_transform(OmopTableEnum.PERSON, person_df),
+                OmopTableEnum.OBSERVATION_PERIOD: run_transform(OmopTableEnum.OBSERVATION_PERIOD, case_df),
+                OmopTableEnum.VISIT_OCCURRENCE: run_transform(OmopTableEnum.VISIT_OCCURRENCE, case_df),
+                OmopTableEnum.PROCEDURE_OCCURRENCE: run_transform(OmopTableEnum.PROCEDURE_OCCURRENCE, procedure_df,
+                                                                  db_manager),
+                OmopTableEnum.MEASUREMENT: run_transform(OmopTableEnum.MEASUREMENT, lab_df, db_manager),
+                OmopTableEnum.CONDITION_OCCURRENCE: run_transform(OmopTableEnum.CONDITION_OCCURRENCE, diagnosis_df,
+                                                                  db_manager)
+            }
     except AttributeError:
         logging.error("Error during Transformation.")
         return False
     logging.info("Transformations finished.")
 
-    # Load into postgres database
+    if incremental:
+        # Compare to the loaded tables and write only the changes
+        logging.info("Loading the changes of the omop tables into the database...")
+        try:
+            delta.load_changes(omop_tables, db_manager, progress)
+            logging.info("Done loading the changes of the omop tables into the database.")
+            checkpoint.clear()
+            return True
+        except AttributeError:
+            logging.error("Error while loading the changes of the omop tables.")
+            return False
+
+    try:
+        if loaded_tables and not _are_tables_loaded(db_manager, {table: omop_tables[table] for table in loaded_tables}):
+            # The tables were cleared or changed since the previous run, e.g. by resetting the database
+            logging.info("The tables loaded by a previous run have changed since. Loading all tables again.")
+            checkpoint.discard('load')
+            loaded_tables = list()
+    except AttributeError:
+        logging.error("Error while preparing the omop tables for the load.")
+        return False
+
+    # Load into postgres database, the tables are staged at the same time on their own connections and published in
+    # a single transaction
     logging.info("Loading omop tables into the database...")
+    for table in loaded_tables:
+        logging.info(f"Skipping the table {table.value}, it was loaded by a previous run.")
+        with progress.stage('load', table.value) as stage:
+            stage.rows = len(omop_tables[table].index)
+    remaining_tables: Dict[OmopTableEnum, pd.DataFrame] = {table: omop_df for table, omop_df in omop_tables.items()
+                                                           if table not in loaded_tables}
     try:
-        db_manager.save(OmopTableEnum.PROVIDER, omop_provider_df)
-        db_manager.save(OmopTableEnum.LOCATION, omop_location_df)
-        db_manager.save(OmopTableEnum.PERSON, omop_person_df)
-        db_manager.save(OmopTableEnum.OBSERVATION_PERIOD, omop_observation_period_df)
-        db_manager.save(OmopTableEnum.VISIT_OCCURRENCE, omop_visit_occurrence_df)
-        db_manager.save(OmopTableEnum.PROCEDURE_OCCURRENCE, omop_procedure_occurrence_df)
-        db_manager.save(OmopTableEnum.MEASUREMENT, omop_measurement_df)
-        db_manager.save(OmopTableEnum.CONDITION_OCCURRENCE, omop_condition_occurrence_df)
+        # Previously added omop-entries are removed in the same transaction, they are kept in upsert mode and if a
+        # previous run is continued
+        if not load.load_tables(remaining_tables, lambda: DBManager(db_config), db_manager, progress, upsert=upsert,
+                                replace=not (upsert or loaded_tables),
+                                on_loaded=lambda table: checkpoint.save('load', table.value, load_hashes[table])):
+            return False
         logging.info("Done loading omop tables into the database.")
+        checkpoint.clear()
         return True
     except AttributeError:
         return False
 
 
+def _are_tables_loaded(db_manager: DBManager, omop_tables: Dict[OmopTableEnum, pd.DataFrame]) -> bool:
+    """
+    Checks if the given tables, that were loaded by a previous run according to the checkpoints, still hold at least
+    the rows of the transformed tables.
+
+    :param db_manager: DBManager with an active connection to the database
+    :param omop_tables: the transformed tables by their target table
+    :return: True if every table holds at least as many rows as its transformed table
+    :raises AttributeError: If the database operation fails
+    """
+    row_counts: Dict[str, List[int]] = db_manager.get_table_fingerprint(
+        {table.value: load.get_id_column(table) for table in omop_tables})
+    return all(row_counts[table.value][0] >= len(omop_df.index) for table, omop_df in omop_tables.items())
+
+
+def run_streaming_etl_job_for_csvs(csv_dir: str, db_config: DbConfig, chunk_size: int,
+                                   vocabulary_snapshot: Optional[str] = None,
+                                   progress: Optional[EtlProgress] = None) -> bool:
+    """
+    Runs the entire ETL-Job for the given csv files like run_etl_job_for_csvs, but keeps only one chunk of a csv file
+    in memory at a time. Every chunk is transformed and loaded into the database before the next chunk is read.
+
+    State that spans chunks is kept in small accumulators: the distinct provider ids, the earliest and latest date of
+    every patient for the observation periods and the next condition_occurrence_id. Visit occurrence ids are the same
+    as in run_etl_job_for_csvs, condition occurrence ids are unique but numbered per chunk.
+
+    :param csv_dir: Directory containing PERSON.csv, ..
+    :param db_config: dict with keys: [host, port, db_name, username, password, db_schema]
+    :param chunk_size: number of rows that are read from a csv file at once
+    :param vocabulary_snapshot: Optional path to a vocabulary snapshot file used to resolve SNOMED-Ids instead of the
+    vocabulary tables of the database
+    :param progress: Optional progress the stages (see ETL_STAGES) are reported to
+    :return: True if all files were loaded
+    """
+    if progress is None:
+        progress = EtlProgress(ETL_STAGES)
+
+    def read_chunks(csv_file: CsvFilesEnum, columns: Optional[List[str]] = None):
+        return extract.extract_csv_chunks(os.path.join(csv_dir, csv_file.value), chunk_size, columns,
+                                          CSV_SCHEMAS[csv_file])
+
+    def transform_stage(transform_function: Callable[..., pd.DataFrame]) -> StageKey:
+        return 'transform', transform_function.__name__
+
+    def load_stage(table: OmopTableEnum) -> StageKey:
+        return 'load', table.value
+
+    # Establish database connection
+    # 'clear_tables' remove all previously added omop-entries from the database
+    db_manager = DBManager(db_config, clear_tables=True, vocabulary_snapshot=vocabulary_snapshot)
+
+    def save_chunk(stages: Dict[StageKey, EtlStage], table: OmopTableEnum, omop_df: pd.DataFrame):
+        db_manager.bulk_save(table, omop_df)
+        stages[load_stage(table)].add_rows(len(omop_df.index))
+
+    logging.info(f"Streaming csv files into the database in chunks of {chunk_size} rows...")
+    try:
+        # Providers of persons and cases, they have to be loaded before the persons
+        with progress.stages_running([transform_stage(transform.generate_provider_table),
+                                      load_stage(OmopTableEnum.PROVIDER)]) as stages:
+            omop_provider_df: Optional[pd.DataFrame] = None
+            for csv_file in (CsvFilesEnum.PERSON, CsvFilesEnum.CASE):
+                for chunk in read_chunks(csv_file, ['PROVIDER_ID']):
+                    chunk_provider_df: pd.DataFrame = transform.generate_provider_table(chunk, chunk.iloc[0:0])
+                    omop_provider_df = chunk_provider_df if omop_provider_df is None else \
+                        pd.concat([omop_provider_df, chunk_provider_df]).drop_duplicates()
+            stages[transform_stage(transform.generate_provider_table)].add_rows(len(omop_provider_df.index))
+            save_chunk(stages, OmopTableEnum.PROVIDER, omop_provider_df)
+
+        # Locations and persons
+        with progress.stages_running([('extract', CsvFilesEnum.PERSON.value),
+                                      transform_stage(transform.generate_location_table),
+                                      transform_stage(transform.generate_person_table),
+                                      load_stage(OmopTableEnum.LOCATION),
+                                      load_stage(OmopTableEnum.PERSON)]) as stages:
+            for person_df in read_chunks(CsvFilesEnum.PERSON):
+                stages[('extract', CsvFilesEnum.PERSON.value)].add_rows(len(person_df.index))
+                omop_location_df: pd.DataFrame = transform.generate_location_table(person_df)
+                omop_person_df: pd.DataFrame = transform.generate_person_table(person_df)
+                stages[transform_stage(transform.generate_location_table)].add_rows(len(omop_location_df.index))
+                stages[transform_stage(transform.generate_person_table)].add_rows(len(omop_person_df.index))
+                save_chunk(stages, OmopTableEnum.LOCATION, omop_location_df)
+                save_chunk(stages, OmopTableEnum.PERSON, omop_person_df)
+
+        # Visit occurrences and observation periods, the periods are loaded after the last chunk
+        with progress.stages_running([('extract', CsvFilesEnum.CASE.value),
+                                      transform_stage(transform.generate_visit_occurrence_table),
+                                      transform_stage(transform.generate_observation_period_table),
+                                      load_stage(OmopTableEnum.VISIT_OCCURRENCE),
+                                      load_stage(OmopTableEnum.OBSERVATION_PERIOD)]) as stages:
+            observation_periods = transform.ObservationPeriodAccumulator()
+            for case_df in read_chunks(CsvFilesEnum.CASE):
+                stages[('extract', CsvFilesEnum.CASE.value)].add_rows(len(case_df.index))
+                observation_periods.add(case_df)
+                # Index continues over the chunks, so the visit occurrence ids are unique
+                omop_visit_occurrence_df: pd.DataFrame = transform.generate_visit_occurrence_table(case_df)
+                stages[transform_stage(transform.generate_visit_occurrence_table)] \
+                    .add_rows(len(omop_visit_occurrence_df.index))
+                save_chunk(stages, OmopTableEnum.VISIT_OCCURRENCE, omop_visit_occurrence_df)
+            omop_observation_period_df: pd.DataFrame = observation_periods.generate_observation_period_table()
+            stages[transform_stage(transform.generate_observation_period_table)] \
+                .add_rows(len(omop_observation_period_df.index))
+            save_chunk(stages, OmopTableEnum.OBSERVATION_PERIOD, omop_observation_period_df)
+
+        # Procedure occurrences
+        with progress.stages_running([('extract', CsvFilesEnum.PROCEDURE.value),
+                                      transform_stage(transform.generate_procedure_occurrence_table),
+                                      load_stage(OmopTableEnum.PROCEDURE_OCCURRENCE)]) as stages:
+            for procedure_df in read_chunks(CsvFilesEnum.PROCEDURE):
+                stages[('extract', CsvFilesEnum.PROCEDURE.value)].add_rows(len(procedure_df.index))
+                # Remove all rows with missing data
+                omop_procedure_occurrence_df: pd.DataFrame = transform.generate_procedure_occurrence_table(
+                    procedure_df.dropna(), db_manager)
+                stages[transform_stage(transform.generate_procedure_occurrence_table)] \
+                    .add_rows(len(omop_procedure_occurrence_df.index))
+                save_chunk(stages, OmopTableEnum.PROCEDURE_OCCURRENCE, omop_procedure_occurrence_df)
+
+        # Measurements
+        with progress.stages_running([('extract', CsvFilesEnum.LAB.value),
+                                      transform_stage(transform.generate_measurement_table),
+                                      load_stage(OmopTableEnum.MEASUREMENT)]) as stages:
+            for lab_df in read_chunks(CsvFilesEnum.LAB):
+                stages[('extract', CsvFilesEnum.LAB.value)].add_rows(len(lab_df.index))
+                omop_measurement_df: pd.DataFrame = transform.generate_measurement_table(lab_df, db_manager)
+                stages[transform_stage(transform.generate_measurement_table)] \
+                    .add_rows(len(omop_measurement_df.index))
+                save_chunk(stages, OmopTableEnum.MEASUREMENT, omop_measurement_df)
+
+        # Condition occurrences, the ids of a chunk start after the ids of the previous chunk
+        with progress.stages_running([('extract', CsvFilesEnum.DIAGNOSIS.value),
+                                      transform_stage(transform.generate_condition_occurrence_table),
+                                      load_stage(OmopTableEnum.CONDITION_OCCURRENCE)]) as stages:
+            next_condition_occurrence_id: int = 1
+            for diagnosis_df in read_chunks(CsvFilesEnum.DIAGNOSIS):
+                stages[('extract', CsvFilesEnum.DIAGNOSIS.value)].add_rows(len(diagnosis_df.index))
+                omop_condition_occurrence_df: pd.DataFrame = transform.generate_condition_occurrence_table(
+                    diagnosis_df, db_manager, first_id=next_condition_occurrence_id)
+                if not omop_condition_occurrence_df.empty:
+                    next_condition_occurrence_id = \
+                        int(omop_condition_occurrence_df['condition_occurrence_id'].max()) + 1
+                stages[transform_stage(transform.generate_condition_occurrence_table)] \
+                    .add_rows(len(omop_condition_occurrence_df.index))
+                save_chunk(stages, OmopTableEnum.CONDITION_OCCURRENCE, omop_condition_occurrence_df)
+    except AttributeError:
+        logging.error("Error during the streaming etl-job.")
+        return False
+    logging.info("Done streaming omop tables into the database.")
+    return True
+
+
 def run_etl_job_for_patient(patient: Patient, db_manager: DBManager) -> bool:
     """
     Runs an etl-job for a single given patient on the connection specified by the given database manager.
@@ -125,12 +411,10 @@ def run_etl_job_for_patient(patient: Patient, db_manager: DBManager) -> bool:
 
     # Generate unused ids for all conditions
     try:
-        condition_occurrence_ids: List[int] = list()
-        for _ in patient.conditions:
-            condition_occurrence_id: int = db_manager.generate_condition_occurrence_id()
-            while condition_occurrence_id in condition_occurrence_ids:
-                condition_occurrence_id: int = db_manager.generate_condition_occurrence_id()
-            condition_occurrence_ids.append(condition_occurrence_id)
+        condition_occurrence_ids: List[int] = db_manager.generate_ids(
+            OmopTableEnum.CONDITION_OCCURRENCE.value,
+            OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value,
+            len(patient.conditions))
     except AttributeError:
         logging.error("Error during database access.")
         return False
@@ -142,7 +426,7 @@ def run_etl_job_for_patient(patient: Patient, db_manager: DBManager) -> bool:
     data_condition_occurrence = {
         OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value: condition_occurrence_ids,
         OmopConditionOccurrenceFieldsEnum.PERSON_ID.value: [patient.id] * entries,
-        OmopConditionOccurrenceFieldsEnum.CONDITION_CONCEPT_ID.value: patient.conditions,
+        OmopConditionOccurrenceFieldsEnum.CONDITION_CONCEPT_ID.value: list(patient.conditions),
         OmopConditionOccurrenceFieldsEnum.CONDITION_START_DATE.value: [current_date] * entries,
         OmopConditionOccurrenceFieldsEnum.CONDITION_TYPE_CONCEPT_ID.value: [44786627] * entries
     }
@@ -150,12 +434,9 @@ def run_etl_job_for_patient(patient: Patient, db_manager: DBManager) -> bool:
 
     # Generate unused ids for all measurement
     try:
-        measurement_ids: List[int] = list()
-        for _ in patient.high_measurements:
-            measurement_id: int = db_manager.generate_measurement_id()
-            while measurement_id in measurement_ids:
-                measurement_id: int = db_manager.generate_measurement_id()
-            measurement_ids.append(measurement_id)
+        measurement_ids: List[int] = db_manager.generate_ids(OmopTableEnum.MEASUREMENT.value,
+                                                             OmopMeasurementEnum.ID.value,
+                                                             len(patient.high_measurements))
     except AttributeError:
         logging.error("Error during database access.")
         return False
@@ -165,7 +446,7 @@ def run_etl_job_for_patient(patient: Patient, db_manager: DBManager) -> bool:
     data_measurement = {
         OmopMeasurementEnum.ID.value: measurement_ids,
         OmopMeasurementEnum.PERSON_ID.value: [patient.id] * entries,
-        OmopMeasurementEnum.CONCEPT_ID.value: patient.high_measurements,
+        OmopMeasurementEnum.CONCEPT_ID.value: list(patient.high_measurements),
         OmopMeasurementEnum.DATE.value: [current_date] * entries,
         OmopMeasurementEnum.TYPE_CONCEPT_ID.value: [SnomedConcepts.LAB.value] * entries,
         OmopMeasurementEnum.VALUE_CONCEPT.value: [SnomedConcepts.HIGH.value] * entries
@@ -191,122 +472,78 @@ def run_etl_job_for_patient(patient: Patient, db_manager: DBManager) -> bool:
         return False
 
 
+# Symptoms that can be changed via the PatientData: (test of the patient, concept id that is removed or added)
+UPDATABLE_CONDITIONS: List[Tuple[Callable[[Patient], bool], int]] = [
+    (Patient.has_covid, SnomedConcepts.COVID_19.value),
+    (Patient.has_fever, SnomedConcepts.FEVER.value),
+    (Patient.has_exanthem, SnomedConcepts.ERUPTION.value),
+    (Patient.has_enanthem, SnomedConcepts.DISORDER_OF_ORAL_SOFT_TISSUE.value),
+    (Patient.has_swollen_extremities, SnomedConcepts.SWELLING.value),
+    (Patient.has_conjunctivitis, SnomedConcepts.OTHER_CONJUNCTIVITIS.value),
+    (Patient.has_lymphadenopathy, SnomedConcepts.LYMPHADENOPATHY.value),
+    (Patient.has_gastro_intestinal_condition, SnomedConcepts.NAUSEA_AND_VOMITING.value),
+    (Patient.has_pericardial_effusions, SnomedConcepts.PERICARDIAL_EFFUSION.value),
+    (Patient.has_pericarditis, SnomedConcepts.PERICARDITIS.value),
+    (Patient.has_myocarditis, SnomedConcepts.MYOCARDITIS.value),
+    (Patient.has_kawasaki, SnomedConcepts.KAWASAKI.value),
+    (Patient.has_pims, SnomedConcepts.PIMS.value)
+]
+UPDATABLE_MEASUREMENTS: List[Tuple[Callable[[Patient], bool], int]] = [
+    (Patient.has_inflammation_lab, SnomedConcepts.CRP.value),
+    (Patient.has_coagulopathy, SnomedConcepts.D_DIMER.value)
+]
+
+
+def get_concept_changes(old_patient: Patient, update: Patient,
+                        symptoms: List[Tuple[Callable[[Patient], bool], int]]) -> Tuple[List[int], List[int]]:
+    """
+    Compares the given symptoms of two patients.
+
+    :param old_patient: the patient as saved in the database
+    :param update: the patient with the new values
+    :param symptoms: (test of the patient, concept id) for every symptom, see UPDATABLE_CONDITIONS
+    :return: the concept ids that have to be removed and the concept ids that have to be added
+    """
+    removed: List[int] = list()
+    added: List[int] = list()
+    for has_symptom, concept_id in symptoms:
+        had_symptom: bool = has_symptom(old_patient)
+        if had_symptom and not has_symptom(update):
+            removed.append(concept_id)
+        elif not had_symptom and has_symptom(update):
+            added.append(concept_id)
+    return removed, added
+
+
 def update_patient(old_patient: Patient, update: Patient, db_manager: DBManager) -> bool:
+    """
+    Overwrites the name, birthdate and symptoms of the given patient in the database. Only the symptoms that differ
+    are removed or added. All changes are saved in a single transaction.
+
+    :param old_patient: the patient as saved in the database
+    :param update: the patient with the new values
+    :param db_manager: connection to the database
+    :return: True if the patient was updated
+    """
     logging.info("Updating a patient...")
+    removed_conditions, added_conditions = get_concept_changes(old_patient, update, UPDATABLE_CONDITIONS)
+    removed_measurements, added_measurements = get_concept_changes(old_patient, update, UPDATABLE_MEASUREMENTS)
+    person_fields = {
+        OmopPersonFieldsEnum.PERSON_SOURCE_VALUE.value: update.name,
+        OmopPersonFieldsEnum.DAY_OF_BIRTH.value: update.day,
+        OmopPersonFieldsEnum.MONTH_OF_BIRTH.value: update.month,
+        OmopPersonFieldsEnum.YEAR_OF_BIRTH.value: update.year,
+        OmopPersonFieldsEnum.BIRTH_DATETIME.value: update.birthdate
+    }
     try:
-        db_manager.update_person_field(old_patient.id, OmopPersonFieldsEnum.PERSON_SOURCE_VALUE.value, update.name)
-        db_manager.update_person_field(old_patient.id, OmopPersonFieldsEnum.DAY_OF_BIRTH.value, update.day)
-        db_manager.update_person_field(old_patient.id, OmopPersonFieldsEnum.MONTH_OF_BIRTH.value, update.month)
-        db_manager.update_person_field(old_patient.id, OmopPersonFieldsEnum.YEAR_OF_BIRTH.value, update.year)
-        db_manager.update_person_field(old_patient.id, OmopPersonFieldsEnum.BIRTH_DATETIME.value, update.birthdate)
-
-        if old_patient.has_covid() and not update.has_covid():
-            # Remove covid from conditions
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.COVID_19.value)
-        if not old_patient.has_covid() and update.has_covid():
-            # Add covid as condition
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.COVID_19.value)
-
-        if old_patient.has_fever() and not update.has_fever():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.FEVER.value)
-        if not old_patient.has_fever() and update.has_fever():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.FEVER.value)
-
-        if old_patient.has_exanthem() and not update.has_exanthem():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.ERUPTION.value)
-        if not old_patient.has_exanthem() and update.has_exanthem():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.ERUPTION.value)
-
-        if old_patient.has_enanthem() and not update.has_enanthem():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.DISORDER_OF_ORAL_SOFT_TISSUE.value)
-        if not old_patient.has_enanthem() and update.has_enanthem():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.DISORDER_OF_ORAL_SOFT_TISSUE.value)
-
-        if old_patient.has_swollen_extremities() and not update.has_swollen_extremities():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.SWELLING.value)
-        if not old_patient.has_swollen_extremities() and update.has_swollen_extremities():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.SWELLING.value)
-
-        if old_patient.has_conjunctivitis() and not update.has_conjunctivitis():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.OTHER_CONJUNCTIVITIS.value)
-        if not old_patient.has_conjunctivitis() and update.has_conjunctivitis():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.OTHER_CONJUNCTIVITIS.value)
-
-        if old_patient.has_lymphadenopathy() and not update.has_lymphadenopathy():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.LYMPHADENOPATHY.value)
-        if not old_patient.has_lymphadenopathy() and update.has_lymphadenopathy():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.LYMPHADENOPATHY.value)
-
-        if old_patient.has_gastro_intestinal_condition() and not update.has_gastro_intestinal_condition():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.NAUSEA_AND_VOMITING.value)
-        if not old_patient.has_gastro_intestinal_condition() and update.has_gastro_intestinal_condition():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.NAUSEA_AND_VOMITING.value)
-
-        if old_patient.has_pericardial_effusions() and not update.has_pericardial_effusions():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.PERICARDIAL_EFFUSION.value)
-        if not old_patient.has_pericardial_effusions() and update.has_pericardial_effusions():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.PERICARDIAL_EFFUSION.value)
-
-        if old_patient.has_pericarditis() and not update.has_pericarditis():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.PERICARDITIS.value)
-        if not old_patient.has_pericarditis() and update.has_pericarditis():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.PERICARDITIS.value)
-
-        if old_patient.has_myocarditis() and not update.has_myocarditis():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.MYOCARDITIS.value)
-        if not old_patient.has_myocarditis() and update.has_myocarditis():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.MYOCARDITIS.value)
-
-        if old_patient.has_inflammation_lab() and not update.has_inflammation_lab():
-            db_manager.delete_measurement_for_patient(old_patient.id, SnomedConcepts.CRP.value)
-        if not old_patient.has_inflammation_lab() and update.has_inflammation_lab():
-            _add_measurement_for_patient(db_manager=db_manager,
-                                         patient_id=old_patient.id,
-                                         concept_id=SnomedConcepts.CRP.value)
-
-        if old_patient.has_kawasaki() and not update.has_kawasaki():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.KAWASAKI.value)
-        if not old_patient.has_kawasaki() and update.has_kawasaki():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.KAWASAKI.value)
-
-        if old_patient.has_coagulopathy() and not update.has_coagulopathy():
-            db_manager.delete_measurement_for_patient(old_patient.id, SnomedConcepts.D_DIMER.value)
-        if not old_patient.has_coagulopathy() and update.has_coagulopathy():
-            _add_measurement_for_patient(db_manager=db_manager,
-                                         patient_id=old_patient.id,
-                                         concept_id=SnomedConcepts.D_DIMER.value)
-
-        if old_patient.has_pims() and not update.has_pims():
-            db_manager.delete_condition_for_patient(old_patient.id, SnomedConcepts.PIMS.value)
-        if not old_patient.has_pims() and update.has_pims():
-            _add_condition_for_patient(db_manager=db_manager,
-                                       patient_id=old_patient.id,
-                                       concept_id=SnomedConcepts.PIMS.value)
-
+        inserts: List[Tuple[OmopTableEnum, pd.DataFrame]] = [
+            (OmopTableEnum.CONDITION_OCCURRENCE,
+             _create_condition_occurrence_df(db_manager, old_patient.id, added_conditions)),
+            (OmopTableEnum.MEASUREMENT,
+             _create_measurement_df(db_manager, old_patient.id, added_measurements))
+        ]
+        db_manager.update_patient_rows(old_patient.id, person_fields, removed_conditions, removed_measurements,
+                                       inserts)
         logging.info("Done updating the patient.")
         return True
     except AttributeError:
@@ -314,32 +551,35 @@ def update_patient(old_patient: Patient, update: Patient, db_manager: DBManager)
         return False
 
 
-def _add_condition_for_patient(db_manager: DBManager, patient_id: int, concept_id: int):
+def _create_condition_occurrence_df(db_manager: DBManager, patient_id: int, concept_ids: List[int]) -> pd.DataFrame:
     # Create dataframe for conditions
-    condition_occurrence_id: int = db_manager.generate_condition_occurrence_id()
+    condition_occurrence_ids: List[int] = db_manager.generate_ids(
+        OmopTableEnum.CONDITION_OCCURRENCE.value,
+        OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value,
+        len(concept_ids))
     current_date = datetime.datetime.now()
-    data_condition_occ = {OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value: [condition_occurrence_id],
-                          OmopConditionOccurrenceFieldsEnum.PERSON_ID.value: [patient_id],
-                          OmopConditionOccurrenceFieldsEnum.CONDITION_CONCEPT_ID.value: [concept_id],
-                          OmopConditionOccurrenceFieldsEnum.CONDITION_START_DATE.value: [current_date],
-                          OmopConditionOccurrenceFieldsEnum.CONDITION_TYPE_CONCEPT_ID.value: [44786627]}
-    omop_condition_occurrence_df: pd.DataFrame = pd.DataFrame(data_condition_occ)
-    # Save in database
-    db_manager.save(OmopTableEnum.CONDITION_OCCURRENCE, omop_condition_occurrence_df)
-
-
-def _add_measurement_for_patient(db_manager: DBManager, patient_id: int, concept_id: int):
-    # Create dataframe for conditions
-    measurement_id: int = db_manager.generate_measurement_id()
+    entries = len(concept_ids)
+    data_condition_occ = {OmopConditionOccurrenceFieldsEnum.CONDITION_OCCURRENCE_ID.value: condition_occurrence_ids,
+                          OmopConditionOccurrenceFieldsEnum.PERSON_ID.value: [patient_id] * entries,
+                          OmopConditionOccurrenceFieldsEnum.CONDITION_CONCEPT_ID.value: concept_ids,
+                          OmopConditionOccurrenceFieldsEnum.CONDITION_START_DATE.value: [current_date] * entries,
+                          OmopConditionOccurrenceFieldsEnum.CONDITION_TYPE_CONCEPT_ID.value: [44786627] * entries}
+    return pd.DataFrame(data_condition_occ)
+
+
+def _create_measurement_df(db_manager: DBManager, patient_id: int, concept_ids: List[int]) -> pd.DataFrame:
+    # Create dataframe for measurements
+    measurement_ids: List[int] = db_manager.generate_ids(OmopTableEnum.MEASUREMENT.value,
+                                                         OmopMeasurementEnum.ID.value,
+                                                         len(concept_ids))
     current_date = datetime.datetime.now()
+    entries = len(concept_ids)
     data_measurement = {
-        OmopMeasurementEnum.ID.value: [measurement_id],
-        OmopMeasurementEnum.PERSON_ID.value: [patient_id],
-        OmopMeasurementEnum.CONCEPT_ID.value: [concept_id],
-        OmopMeasurementEnum.DATE.value: [current_date],
-        OmopMeasurementEnum.TYPE_CONCEPT_ID.value: [SnomedConcepts.LAB.value],
-        OmopMeasurementEnum.VALUE_CONCEPT.value: [SnomedConcepts.HIGH.value]
+        OmopMeasurementEnum.ID.value: measurement_ids,
+        OmopMeasurementEnum.PERSON_ID.value: [patient_id] * entries,
+        OmopMeasurementEnum.CONCEPT_ID.value: concept_ids,
+        OmopMeasurementEnum.DATE.value: [current_date] * entries,
+        OmopMeasurementEnum.TYPE_CONCEPT_ID.value: [SnomedConcepts.LAB.value] * entries,
+        OmopMeasurementEnum.VALUE_CONCEPT.value: [SnomedConcepts.HIGH.value] * entries
     }
-    omop_measurement_df: pd.DataFrame = pd.DataFrame(data_measurement)
-    # Save in database
-    db_manager.save(OmopTableEnum.MEASUREMENT, omop_measurement_df)
+    return pd.DataFrame(data_measurement)
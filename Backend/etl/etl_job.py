@@ -0,0 +1,168 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from enum import Enum
+from typing import List, Optional, TypedDict
+
+from Backend.common.config import DbConfig
+from Backend.etl.etl import ETL_STAGES, run_etl_job_for_csvs
+from Backend.etl.progress import EtlProgress, EtlStageData
+
+
+class EtlJobState(Enum):
+    """
+    States of an etl-job that runs in the background.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class EtlJobData(TypedDict):
+    """
+    Progress of an etl-job as reported to the frontend.
+    """
+    job_id: str
+    state: str
+    # Fraction of the finished stages between 0.0 and 1.0
+    progress: float
+    stages: List[EtlStageData]
+    error: Optional[str]
+
+
+class EtlJob:
+    """
+    A run of run_etl_job_for_csvs with its progress.
+    """
+
+    def __init__(self, csv_dir: str, db_config: DbConfig, vocabulary_snapshot: Optional[str] = None,
+                 chunk_size: Optional[int] = None, workers: Optional[int] = None, incremental: bool = False,
+                 upsert: bool = False, checkpoint_dir: Optional[str] = None):
+        """
+        Creates a new pending job.
+
+        :param csv_dir: Directory containing PERSON.csv, ..
+        :param db_config: configuration of the database
+        :param vocabulary_snapshot: Optional path to a vocabulary snapshot file, see run_etl_job_for_csvs
+        :param chunk_size: Optional number of rows that are read at once, see run_etl_job_for_csvs
+        :param workers: Optional number of processes the transformations run on, see run_etl_job_for_csvs
+        :param incremental: True to load only the changes of the csv files, see run_etl_job_for_csvs
+        :param upsert: True to merge the rows into the loaded tables, see run_etl_job_for_csvs
+        :param checkpoint_dir: Optional directory the checkpoints of the stages are saved in, see run_etl_job_for_csvs
+        """
+        self.job_id: str = uuid.uuid4().hex
+        self.state: EtlJobState = EtlJobState.PENDING
+        self.progress: EtlProgress = EtlProgress(ETL_STAGES)
+        self.error: Optional[str] = None
+        self._csv_dir: str = csv_dir
+        self._db_config: DbConfig = db_config
+        self._vocabulary_snapshot: Optional[str] = vocabulary_snapshot
+        self._chunk_size: Optional[int] = chunk_size
+        self._workers: Optional[int] = workers
+        self._incremental: bool = incremental
+        self._upsert: bool = upsert
+        self._checkpoint_dir: Optional[str] = checkpoint_dir
+
+    @property
+    def is_finished(self) -> bool:
+        return self.state in (EtlJobState.SUCCEEDED, EtlJobState.FAILED)
+
+    def run(self) -> bool:
+        """
+        Runs the etl-job in the current thread.
+
+        :return: True if the job succeeded
+        """
+        self.state = EtlJobState.RUNNING
+        try:
+            succeeded: bool = run_etl_job_for_csvs(self._csv_dir, self._db_config,
+                                                   vocabulary_snapshot=self._vocabulary_snapshot,
+                                                   progress=self.progress,
+                                                   chunk_size=self._chunk_size,
+                                                   workers=self._workers,
+                                                   incremental=self._incremental,
+                                                   upsert=self._upsert,
+                                                   checkpoint_dir=self._checkpoint_dir)
+        except Exception as error:
+            logging.error(f"Error during etl-job {self.job_id}.")
+            logging.error(error)
+            self.error = str(error)
+            succeeded = False
+        if not succeeded and self.error is None:
+            self.error = "Error during the etl-job."
+        self.state = EtlJobState.SUCCEEDED if succeeded else EtlJobState.FAILED
+        return succeeded
+
+    def to_data(self) -> EtlJobData:
+        """
+        Returns the current progress of the job.
+
+        :return: EtlJobData of the job
+        """
+        return EtlJobData(job_id=self.job_id,
+                          state=self.state.value,
+                          progress=1.0 if self.state == EtlJobState.SUCCEEDED else self.progress.fraction,
+                          stages=self.progress.stages,
+                          error=self.error)
+
+
+class EtlJobRunner:
+    """
+    Runs etl-jobs in background threads and keeps them, so their progress can be polled.
+    Only one job runs at a time, because every etl-job clears the omop tables first.
+    """
+
+    # Number of finished jobs that are kept
+    MAX_FINISHED_JOBS: int = 10
+
+    def __init__(self):
+        self._jobs: "OrderedDict[str, EtlJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, csv_dir: str, db_config: DbConfig, vocabulary_snapshot: Optional[str] = None,
+              chunk_size: Optional[int] = None, workers: Optional[int] = None,
+              incremental: bool = False, upsert: bool = False,
+              checkpoint_dir: Optional[str] = None) -> Optional[EtlJob]:
+        """
+        Starts a new etl-job in a background thread.
+
+        :param csv_dir: Directory containing PERSON.csv, ..
+        :param db_config: configuration of the database
+        :param vocabulary_snapshot: Optional path to a vocabulary snapshot file, see run_etl_job_for_csvs
+        :param chunk_size: Optional number of rows that are read at once, see run_etl_job_for_csvs
+        :param workers: Optional number of processes the transformations run on, see run_etl_job_for_csvs
+        :param incremental: True to load only the changes of the csv files, see run_etl_job_for_csvs
+        :param upsert: True to merge the rows into the loaded tables, see run_etl_job_for_csvs
+        :param checkpoint_dir: Optional directory the checkpoints of the stages are saved in, see run_etl_job_for_csvs
+        :return: the started job or None if another job is still running
+        """
+        with self._lock:
+            if any(not job.is_finished for job in self._jobs.values()):
+                logging.warning("Not starting an etl-job, because another etl-job is still running.")
+                return None
+            job: EtlJob = EtlJob(csv_dir, db_config, vocabulary_snapshot, chunk_size, workers, incremental, upsert,
+                                 checkpoint_dir)
+            self._jobs[job.job_id] = job
+            self._remove_finished_jobs()
+        threading.Thread(target=job.run, name=f"etl-job-{job.job_id}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[EtlJob]:
+        """
+        Gets the job with the given id.
+
+        :param job_id: id of the job
+        :return: the job or None if there is no job with the given id
+        """
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _remove_finished_jobs(self):
+        """
+        Removes the oldest finished jobs, if more than MAX_FINISHED_JOBS are kept.
+        """
+        finished: List[str] = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
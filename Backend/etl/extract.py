@@ -1,13 +1,105 @@
+import logging
+from typing import Dict, Iterator, List, Optional
+
 import pandas as pd
 
+from Backend.etl.csv_schemas import CsvSchema
+
+try:
+    import pyarrow
+    import pyarrow.csv
+
+    # pyarrow types of the dtypes of a CsvSchema
+    _PYARROW_TYPES = {'int64': pyarrow.int64(), 'float64': pyarrow.float64(), 'str': pyarrow.string()}
+except ImportError:
+    # Optional, the csv files are read with the parser of pandas instead
+    pyarrow = None
+
+# Separator of the provided csv files
+CSV_SEPARATOR: str = ';'
 
-def extract_csv(path: str) -> pd.DataFrame:
+
+def extract_csv(path: str, schema: Optional[CsvSchema] = None) -> pd.DataFrame:
     """
     Generates a pandas data frame out of a csv file, which is located under the given path.
 
+    If a schema is given, only the columns of the schema are read with their types and the date columns are parsed.
+    The file is then read with the multithreaded parser of pyarrow, if it is installed.
+
     :param path: Path to the csv file
+    :param schema: Optional schema of the csv file, see csv_schemas.CSV_SCHEMAS
     :return: a pandas dataframe of the csv file
     """
-    import os
-    os.listdir()
-    return pd.read_csv(path,  sep=';')
+    if schema is None:
+        return pd.read_csv(path, sep=CSV_SEPARATOR)
+
+    columns: List[str] = _get_schema_columns(path, schema)
+    dtypes: Dict[str, str] = _get_read_dtypes(schema, columns)
+    if pyarrow is not None:
+        table = pyarrow.csv.read_csv(
+            path,
+            parse_options=pyarrow.csv.ParseOptions(delimiter=CSV_SEPARATOR),
+            convert_options=pyarrow.csv.ConvertOptions(
+                include_columns=columns,
+                column_types={column: _PYARROW_TYPES[dtype] for column, dtype in dtypes.items()},
+                # Empty cells are missing values, like in pd.read_csv
+                strings_can_be_null=True))
+        df: pd.DataFrame = table.to_pandas()
+    else:
+        df: pd.DataFrame = pd.read_csv(path, sep=CSV_SEPARATOR, usecols=columns, dtype=dtypes)
+    return _parse_dates(df, schema)
+
+
+def extract_csv_chunks(path: str, chunk_size: int, columns: Optional[List[str]] = None,
+                       schema: Optional[CsvSchema] = None) -> Iterator[pd.DataFrame]:
+    """
+    Reads the csv file, which is located under the given path, in chunks of the given number of rows. Only one chunk
+    is kept in memory at a time. The index continues over the chunks, like the index of extract_csv.
+
+    :param path: Path to the csv file
+    :param chunk_size: maximum number of rows of a chunk
+    :param columns: Optional names of the columns that are read, all columns of the schema or file if None
+    :param schema: Optional schema of the csv file, see extract_csv
+    :return: iterator over the chunks as pandas dataframes
+    """
+    dtypes: Optional[Dict[str, str]] = None
+    if schema is not None:
+        columns = [column for column in _get_schema_columns(path, schema) if columns is None or column in columns]
+        dtypes = _get_read_dtypes(schema, columns)
+    with pd.read_csv(path, sep=CSV_SEPARATOR, chunksize=chunk_size, usecols=columns, dtype=dtypes) as reader:
+        for chunk in reader:
+            yield _parse_dates(chunk, schema) if schema is not None else chunk
+
+
+def _get_schema_columns(path: str, schema: CsvSchema) -> List[str]:
+    """
+    Gets the columns of the schema that are part of the csv file, in the order of the file.
+
+    :param path: Path to the csv file
+    :param schema: schema of the csv file
+    :return: names of the columns
+    """
+    header: List[str] = list(pd.read_csv(path, sep=CSV_SEPARATOR, nrows=0).columns)
+    missing: List[str] = [column for column in schema.columns if column not in header]
+    if missing:
+        logging.debug(f"The columns {missing} are not part of {path}.")
+    return [column for column in header if column in schema.columns]
+
+
+def _get_read_dtypes(schema: CsvSchema, columns: List[str]) -> Dict[str, str]:
+    """
+    Gets the dtypes the given columns are read with. Date columns are read as strings and parsed afterwards.
+    """
+    return {column: schema.dtypes.get(column, 'str') for column in columns}
+
+
+def _parse_dates(df: pd.DataFrame, schema: CsvSchema) -> pd.DataFrame:
+    """
+    Parses the date columns of the schema with their formats.
+
+    :raises ValueError: If a date doesn't match the format of its column
+    """
+    for column, date_format in schema.dates.items():
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], format=date_format)
+    return df
@@ -0,0 +1,130 @@
+import logging
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Set
+
+import pandas as pd
+
+from Backend.common.database import DBManager
+from Backend.common.omop_enums import OmopTableEnum
+from Backend.etl.progress import EtlProgress
+
+# Tables that have to be loaded before a table, because of the foreign keys of the omop cdm
+TABLE_DEPENDENCIES: Dict[OmopTableEnum, List[OmopTableEnum]] = {
+    OmopTableEnum.PROVIDER: [],
+    OmopTableEnum.LOCATION: [],
+    OmopTableEnum.PERSON: [OmopTableEnum.PROVIDER, OmopTableEnum.LOCATION],
+    OmopTableEnum.OBSERVATION_PERIOD: [OmopTableEnum.PERSON],
+    OmopTableEnum.VISIT_OCCURRENCE: [OmopTableEnum.PERSON, OmopTableEnum.PROVIDER],
+    OmopTableEnum.PROCEDURE_OCCURRENCE: [OmopTableEnum.PERSON],
+    OmopTableEnum.MEASUREMENT: [OmopTableEnum.PERSON],
+    OmopTableEnum.CONDITION_OCCURRENCE: [OmopTableEnum.PERSON, OmopTableEnum.PROVIDER]
+}
+
+# Number of tables that are staged at the same time, every table uses its own connection
+DEFAULT_LOAD_WORKERS: int = 4
+
+
+def get_id_column(table: OmopTableEnum) -> str:
+    """
+    Gets the name of the column that holds the ids of the given omop table.
+    """
+    return f"{table.value}_id"
+
+
+def load_order(tables: List[OmopTableEnum]) -> List[List[OmopTableEnum]]:
+    """
+    Groups the given tables into levels. The tables of a level only depend on tables of previous levels, so they can be
+    loaded at the same time. Dependencies on tables that are not given are ignored.
+
+    :param tables: the tables that are loaded
+    :return: the levels in the order they have to be loaded, the tables of a level in the given order
+    :raises ValueError: If the dependencies of the tables contain a cycle
+    """
+    remaining: List[OmopTableEnum] = list(tables)
+    loaded: Set[OmopTableEnum] = set()
+    levels: List[List[OmopTableEnum]] = list()
+    while remaining:
+        level: List[OmopTableEnum] = [table for table in remaining
+                                      if all(dependency in loaded or dependency not in tables
+                                             for dependency in TABLE_DEPENDENCIES.get(table, list()))]
+        if not level:
+            raise ValueError(f"Cyclic dependencies between the tables {[table.value for table in remaining]}.")
+        levels.append(level)
+        loaded.update(level)
+        remaining = [table for table in remaining if table not in loaded]
+    return levels
+
+
+def load_tables(omop_tables: Dict[OmopTableEnum, pd.DataFrame], connect: Callable[[], DBManager],
+                db_manager: DBManager, progress: EtlProgress, workers: int = DEFAULT_LOAD_WORKERS,
+                upsert: bool = False, replace: bool = False,
+                on_loaded: Optional[Callable[[OmopTableEnum], None]] = None) -> bool:
+    """
+    Loads the given omop tables into the database as one unit. First every table is streamed into a staging table of
+    this run (see DBManager.stage_table), several tables at the same time on separate connections. The staging tables
+    have no foreign keys, so they can be filled in any order. Then all staging tables are moved into the omop tables on
+    the connection of the given DBManager in a single transaction, in the order of the foreign keys (see
+    TABLE_DEPENDENCIES and DBManager.publish_staged_tables). Other connections either see all tables of the run or none
+    of them.
+
+    If a table fails, the remaining tables are not staged, the omop tables are left unchanged and the staging tables
+    are dropped again.
+
+    In upsert mode the rows are merged into the tables by their ids (see DBManager.bulk_upsert). Loading the same
+    tables again leaves the tables unchanged.
+
+    :param omop_tables: the omop tables by their target table
+    :param connect: creates a new DBManager with its own connection, called once for every table
+    :param db_manager: DBManager the staging tables are published with
+    :param progress: progress the load stages (see ETL_STAGES) are reported to
+    :param workers: number of tables that are staged at the same time
+    :param upsert: True to merge the rows into the tables instead of inserting them
+    :param replace: True to remove all rows of the omop tables in the same transaction before the tables are published
+    :param on_loaded: Optional function that is called with every table after the transaction is committed, in the
+    order the tables were published
+    :return: True if all tables were loaded
+    """
+    # Staging tables of a crashed run are left behind, the run id keeps them apart from the tables of later runs
+    run_id: str = uuid.uuid4().hex[:8]
+    staged_tables: Dict[OmopTableEnum, str] = {table: f"{table.value}_staged_{run_id}" for table in omop_tables}
+
+    def stage_table(table: OmopTableEnum):
+        table_manager: DBManager = connect()
+        try:
+            table_manager.stage_table(table, omop_tables[table], staged_tables[table])
+        finally:
+            table_manager.close()
+
+    ordered_tables: List[OmopTableEnum] = [table for level in load_order(list(omop_tables.keys())) for table in level]
+    try:
+        with progress.stages_running([('load', table.value) for table in ordered_tables]) as stages:
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="etl-load") as executor:
+                running: Dict[Future, OmopTableEnum] = {executor.submit(stage_table, table): table
+                                                        for table in ordered_tables}
+                for future in as_completed(running.keys()):
+                    table: OmopTableEnum = running[future]
+                    try:
+                        future.result()
+                    except AttributeError:
+                        logging.error(f"Error while staging the table {table.value}.")
+                        for pending in running.keys():
+                            pending.cancel()
+                        raise
+                    stages[('load', table.value)].rows = len(omop_tables[table].index)
+            if ordered_tables or replace:
+                db_manager.publish_staged_tables(
+                    [(table, staged_tables[table], list(omop_tables[table].columns), get_id_column(table))
+                     for table in ordered_tables], replace=replace, upsert=upsert)
+    except AttributeError:
+        logging.error("Loading the omop tables failed, the omop tables were not changed.")
+        try:
+            db_manager.drop_staged_tables(list(staged_tables.values()))
+        except AttributeError:
+            logging.error(f"The staging tables of the run {run_id} could not be dropped.")
+        return False
+
+    if on_loaded is not None:
+        for table in ordered_tables:
+            on_loaded(table)
+    return True
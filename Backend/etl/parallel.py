@@ -0,0 +1,140 @@
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from Backend.common.database import DBManager
+from Backend.common.omop_enums import OmopTableEnum
+from Backend.etl import transform
+from Backend.etl.progress import EtlProgress
+
+# Number of rows of the lab and diagnosis tables that are transformed by one task. The chunks don't depend on the
+# number of workers, so neither do the results
+DEFAULT_TRANSFORM_CHUNK_SIZE: int = 100000
+
+# Start method of the worker processes. Forking a process while other threads (e.g. of the flask server) hold locks
+# can deadlock the child, spawned processes start with a fresh interpreter instead. They import the main module
+# again, so it must only start the application if it runs as __main__
+WORKER_START_METHOD: str = "spawn"
+
+# Loader of the current worker process, see _init_worker
+_worker_loader: Optional[DBManager] = None
+
+
+def _init_worker(loader: DBManager):
+    """
+    Runs once in every worker process. The loader is only pickled once per worker instead of once per task.
+
+    :param loader: DBManager without a connection, see DBManager.create_vocabulary_loader
+    """
+    global _worker_loader
+    _worker_loader = loader
+
+
+def _transform_with_loader(transform_function: Callable[..., pd.DataFrame], df: pd.DataFrame,
+                           **kwargs) -> pd.DataFrame:
+    """
+    Runs a transformation that resolves concept mappings with the loader of the worker process.
+    """
+    return transform_function(df, _worker_loader, **kwargs)
+
+
+def split_rows(df: pd.DataFrame, chunk_size: int) -> List[Tuple[int, pd.DataFrame]]:
+    """
+    Splits a dataframe into chunks of consecutive rows.
+
+    :param df: the dataframe
+    :param chunk_size: maximum number of rows of a chunk
+    :return: (position of the first row, chunk) for every chunk, at least one (empty) chunk
+    """
+    return [(start, df.iloc[start:start + chunk_size]) for start in range(0, len(df.index), chunk_size)] or [(0, df)]
+
+
+def run_transforms_in_parallel(person_df: pd.DataFrame, case_df: pd.DataFrame, procedure_df: pd.DataFrame,
+                               lab_df: pd.DataFrame, diagnosis_df: pd.DataFrame, loader: DBManager, workers: int,
+                               progress: EtlProgress, chunk_size: int = DEFAULT_TRANSFORM_CHUNK_SIZE,
+                               completed: Optional[Dict[OmopTableEnum, pd.DataFrame]] = None,
+                               on_transformed: Optional[Callable[[OmopTableEnum, pd.DataFrame], None]] = None
+                               ) -> Dict[OmopTableEnum, pd.DataFrame]:
+    """
+    Runs the transformations of run_etl_job_for_csvs on a pool of worker processes. All transformations are started
+    at once, the lab and diagnosis tables are additionally split into chunks of rows that are transformed separately.
+    The chunks are merged in the order of the rows, so the result doesn't depend on the number of workers.
+
+    The results are the same as in a sequential run: The ids of measurements are taken from the lab table and the
+    condition occurrence ids of every chunk start after the ids of the conditions of the previous chunks (see
+    transform.get_condition_occurrence_first_ids).
+
+    :param person_df: the original person table
+    :param case_df: the original case table
+    :param procedure_df: the original procedure table without rows with missing data
+    :param lab_df: the original lab table
+    :param diagnosis_df: the original diagnosis table
+    :param loader: DBManager without a connection, see DBManager.create_vocabulary_loader
+    :param workers: number of worker processes
+    :param progress: progress the transform stages (see ETL_STAGES) are reported to
+    :param chunk_size: number of rows of the lab and diagnosis tables that are transformed by one task
+    :param completed: Optional omop tables that were already transformed, e.g. by a previous run. They are not
+    transformed again
+    :param on_transformed: Optional function that is called with every transformed table, in the order of the tables
+    :return: the omop tables in the order they have to be loaded
+    :raises AttributeError: If a transformation fails to resolve concept mappings
+    """
+    logging.info(f"Transforming input files into omop tables with {workers} worker processes...")
+    if completed is None:
+        completed = dict()
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(WORKER_START_METHOD),
+                                   initializer=_init_worker, initargs=(loader,))
+    diagnosis_chunks: List[Tuple[int, pd.DataFrame]] = split_rows(diagnosis_df, chunk_size)
+    condition_first_ids: List[Tuple[int, int]] = transform.get_condition_occurrence_first_ids(
+        diagnosis_df, [start for start, _ in diagnosis_chunks])
+    try:
+        # (transformation, target table, submits the tasks of the transformation in the order of their rows)
+        tasks: List[Tuple[Callable[..., pd.DataFrame], OmopTableEnum, Callable[[], List[Future]]]] = [
+            (transform.generate_provider_table, OmopTableEnum.PROVIDER,
+             lambda: [executor.submit(transform.generate_provider_table, person_df, case_df)]),
+            (transform.generate_location_table, OmopTableEnum.LOCATION,
+             lambda: [executor.submit(transform.generate_location_table, person_df)]),
+            (transform.generate_person_table, OmopTableEnum.PERSON,
+             lambda: [executor.submit(transform.generate_person_table, person_df)]),
+            (transform.generate_observation_period_table, OmopTableEnum.OBSERVATION_PERIOD,
+             lambda: [executor.submit(transform.generate_observation_period_table, case_df)]),
+            (transform.generate_visit_occurrence_table, OmopTableEnum.VISIT_OCCURRENCE,
+             lambda: [executor.submit(transform.generate_visit_occurrence_table, case_df)]),
+            (transform.generate_procedure_occurrence_table, OmopTableEnum.PROCEDURE_OCCURRENCE,
+             lambda: [executor.submit(_transform_with_loader, transform.generate_procedure_occurrence_table,
+                                      procedure_df)]),
+            (transform.generate_measurement_table, OmopTableEnum.MEASUREMENT,
+             lambda: [executor.submit(_transform_with_loader, transform.generate_measurement_table, chunk)
+                      for _, chunk in split_rows(lab_df, chunk_size)]),
+            (transform.generate_condition_occurrence_table, OmopTableEnum.CONDITION_OCCURRENCE,
+             lambda: [executor.submit(_transform_with_loader, transform.generate_condition_occurrence_table, chunk,
+                                      first_id=first_id, first_secondary_id=first_secondary_id)
+                      for (_, chunk), (first_id, first_secondary_id) in zip(diagnosis_chunks, condition_first_ids)])
+        ]
+        # All tasks are started at once
+        futures: Dict[OmopTableEnum, List[Future]] = {table: submit() for _, table, submit in tasks
+                                                      if table not in completed}
+
+        # Collect the results in the order of ETL_STAGES, while the remaining tasks keep running
+        omop_tables: Dict[OmopTableEnum, pd.DataFrame] = dict()
+        for transform_function, table, _ in tasks:
+            with progress.stage('transform', transform_function.__name__) as stage:
+                if table in completed:
+                    omop_tables[table] = completed[table]
+                else:
+                    results: List[pd.DataFrame] = [future.result() for future in futures[table]]
+                    omop_tables[table] = results[0] if len(results) == 1 else pd.concat(results, ignore_index=True)
+                    if table == OmopTableEnum.CONDITION_OCCURRENCE:
+                        # Primary conditions of all chunks come before the secondary ones, as in a sequential run
+                        omop_tables[table] = omop_tables[table].sort_values('condition_occurrence_id', kind='stable',
+                                                                             ignore_index=True)
+                    if on_transformed is not None:
+                        on_transformed(table, omop_tables[table])
+                stage.rows = len(omop_tables[table].index)
+        return omop_tables
+    finally:
+        # Remaining tasks are cancelled if a transformation failed
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
+from enum import Enum
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
+
+# Key of a stage: (step, name), e.g. ('transform', 'generate_person_table')
+StageKey = Tuple[str, str]
+
+
+class EtlStageState(Enum):
+    """
+    States of a single stage of an etl-job.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class EtlStageData(TypedDict):
+    """
+    Progress of a single stage of an etl-job.
+    """
+    step: str
+    name: str
+    state: str
+    # Number of extracted, transformed or loaded rows, None until the stage is done
+    rows: Optional[int]
+
+
+class EtlStage:
+    """
+    A single stage of an etl-job, e.g. the extraction of a csv file or the loading of an omop table.
+    """
+
+    def __init__(self, step: str, name: str):
+        self.step: str = step
+        self.name: str = name
+        self.state: EtlStageState = EtlStageState.PENDING
+        self.rows: Optional[int] = None
+
+    def add_rows(self, rows: int):
+        """
+        Adds the rows of a chunk to a stage that processes a file in chunks.
+
+        :param rows: number of rows of the chunk
+        """
+        self.rows = (self.rows or 0) + rows
+
+
+class EtlProgress:
+    """
+    Thread-safe progress of an etl-job. The planned stages are known in advance, so the fraction of finished stages
+    can be reported while the job is running. Stages that were not planned are added when they are started.
+    """
+
+    def __init__(self, stages: List[StageKey] = None):
+        """
+        Creates a new progress with all planned stages pending.
+
+        :param stages: (step, name) of the planned stages in the order they are run
+        """
+        self._lock = threading.Lock()
+        self._stages: "OrderedDict[StageKey, EtlStage]" = OrderedDict()
+        for step, name in stages or list():
+            self._stages[(step, name)] = EtlStage(step, name)
+
+    @contextmanager
+    def stage(self, step: str, name: str) -> Iterator[EtlStage]:
+        """
+        Marks the given stage as running while the block is executed. The block should set the number of rows of
+        the stage. The stage is done afterwards or failed if the block raises an exception.
+
+        :param step: step of the etl-job: 'extract', 'transform' or 'load'
+        :param name: name of the stage within the step
+        :return: the running stage
+        """
+        with self._lock:
+            stage: EtlStage = self._stages.setdefault((step, name), EtlStage(step, name))
+            stage.state = EtlStageState.RUNNING
+        try:
+            yield stage
+        except BaseException:
+            stage.state = EtlStageState.FAILED
+            raise
+        stage.state = EtlStageState.DONE
+
+    @contextmanager
+    def stages_running(self, keys: List[StageKey]) -> Iterator[Dict[StageKey, EtlStage]]:
+        """
+        Marks several stages as running while the block is executed, see stage. Used if the stages are interleaved,
+        e.g. when a file is extracted, transformed and loaded chunk by chunk.
+
+        :param keys: (step, name) of the stages
+        :return: the running stages by their key
+        """
+        with ExitStack() as stack:
+            yield {key: stack.enter_context(self.stage(*key)) for key in keys}
+
+    @property
+    def fraction(self) -> float:
+        """
+        Fraction of the stages that are done.
+
+        :return: value between 0.0 and 1.0
+        """
+        with self._lock:
+            if not self._stages:
+                return 0.0
+            done: int = sum(1 for stage in self._stages.values() if stage.state == EtlStageState.DONE)
+            return done / len(self._stages)
+
+    @property
+    def stages(self) -> List[EtlStageData]:
+        """
+        Progress of every stage in the order they are run.
+
+        :return: list of stage data
+        """
+        with self._lock:
+            return [EtlStageData(step=stage.step, name=stage.name, state=stage.state.value, rows=stage.rows)
+                    for stage in self._stages.values()]
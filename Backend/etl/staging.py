@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Optional
+
+import pandas as pd
+
+from Backend.etl import extract
+from Backend.etl.csv_schemas import CsvSchema
+from config.definitions import ROOT_DIR
+
+# Default directory of the staged files
+DEFAULT_STAGING_DIR: str = os.path.join(ROOT_DIR, "data", "staging")
+# Has to be increased whenever the staged frames change without a change of the csv files or schemas
+STAGING_FORMAT_VERSION: int = 1
+# Size of the blocks the csv files are hashed in
+HASH_BLOCK_SIZE: int = 1 << 20
+
+
+def hash_file(path: str) -> str:
+    """
+    Hashes the content of the given file.
+
+    :param path: path to the file
+    :return: sha256 hex digest of the content
+    """
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def hash_csv(csv_path: str, schema: Optional[CsvSchema] = None) -> str:
+    """
+    Hashes the content of the given csv file together with the schema it is extracted with.
+
+    :param csv_path: path to the csv file
+    :param schema: Optional schema the csv file is extracted with
+    :return: sha256 hex digest
+    """
+    key = hashlib.sha256(hash_file(csv_path).encode())
+    key.update(json.dumps({'version': STAGING_FORMAT_VERSION,
+                           'dtypes': schema.dtypes if schema else None,
+                           'dates': schema.dates if schema else None}, sort_keys=True).encode())
+    return key.hexdigest()
+
+
+class StagingCache:
+    """
+    Cache of extracted csv files between extraction and transformation. Every extracted frame is written to a columnar
+    Parquet file, that is keyed by the content hash of the csv file and the schema it was extracted with. Later
+    extractions of the same content read the memory-mapped Parquet file instead of parsing the csv file again.
+
+    Staged files are never changed, a changed csv file is staged under a new key. The directory can be deleted at any
+    time. Staging requires pyarrow, without it the csv files are always extracted.
+    """
+
+    def __init__(self, directory: str = DEFAULT_STAGING_DIR):
+        """
+        Creates a new cache, the directory is created on the first write.
+
+        :param directory: directory of the staged files
+        """
+        self.directory: str = directory
+
+    def get_path(self, csv_path: str, schema: Optional[CsvSchema] = None) -> str:
+        """
+        Gets the path the given csv file is staged at.
+
+        :param csv_path: path to the csv file
+        :param schema: Optional schema the csv file is extracted with
+        :return: path of the Parquet file
+        """
+        name: str = os.path.splitext(os.path.basename(csv_path))[0]
+        return os.path.join(self.directory, f"{name}-{hash_csv(csv_path, schema)[:32]}.parquet")
+
+    def extract_csv(self, csv_path: str, schema: Optional[CsvSchema] = None) -> pd.DataFrame:
+        """
+        Extracts the given csv file like extract.extract_csv, but reads the staged file if the same content has been
+        extracted before. Otherwise the extracted frame is staged.
+
+        :param csv_path: path to the csv file
+        :param schema: Optional schema of the csv file, see extract.extract_csv
+        :return: a pandas dataframe of the csv file
+        """
+        if extract.pyarrow is None:
+            logging.warning("Staging the extracted csv files requires pyarrow.")
+            return extract.extract_csv(csv_path, schema)
+
+        staged_path: str = self.get_path(csv_path, schema)
+        if os.path.isfile(staged_path):
+            try:
+                df: pd.DataFrame = pd.read_parquet(staged_path, engine='pyarrow', memory_map=True)
+                logging.info(f"Read {csv_path} from the staged file {staged_path}.")
+                return df
+            except (OSError, ValueError) as error:
+                logging.warning(f"Could not read the staged file {staged_path}. Extracting {csv_path} again.")
+                logging.warning(error)
+
+        df: pd.DataFrame = extract.extract_csv(csv_path, schema)
+        # Write to a temporary file first, so a staged file is never read half written
+        tmp_path: str = f"{staged_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            df.to_parquet(tmp_path, engine='pyarrow')
+            os.replace(tmp_path, staged_path)
+            logging.info(f"Staged {csv_path} at {staged_path}.")
+        except (OSError, ValueError) as error:
+            # The etl job doesn't depend on the cache
+            logging.warning(f"Could not stage {csv_path}.")
+            logging.warning(error)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return df
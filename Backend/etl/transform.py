@@ -1,9 +1,48 @@
+from typing import List, Optional, Tuple
+
 import numpy as np
 import pandas as pd
 
 from Backend.common.database import DBManager
 
 
+def _map_to_snomed_ids(codes: pd.Series, snomed_ids: dict) -> pd.Series:
+    """
+    Maps a column of non-standard codes to SNOMED-Ids using the result of DBManager.get_snomed_ids.
+    Codes without a mapping (e.g. empty cells) are set to 0, means 'No matching concept' in omop vocabulary.
+
+    :param codes: column with the non-standard codes
+    :param snomed_ids: dict mapping codes to SNOMED-Ids
+    :return: column with the corresponding SNOMED-Ids
+    """
+    return codes.map(snomed_ids).fillna(0).astype(int)
+
+
+def _rank(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Replaces every value by its rank among the distinct values, so the order of the values is kept.
+
+    :param values: column with comparable values, e.g. dates as strings
+    :return: the rank of every value (NaN for missing values) and the sorted distinct values
+    """
+    codes, uniques = pd.factorize(values, sort=True)
+    return np.where(codes < 0, np.nan, codes), np.asarray(uniques, dtype=object)
+
+
+def _unrank(ranks: np.ndarray, uniques: np.ndarray) -> np.ndarray:
+    """
+    Reverses _rank.
+
+    :param ranks: ranks or NaN for missing values
+    :param uniques: the sorted distinct values
+    :return: the values, NaN for missing values
+    """
+    values: np.ndarray = np.full(len(ranks), np.nan, dtype=object)
+    present: np.ndarray = ~np.isnan(ranks)
+    values[present] = uniques[ranks[present].astype(int)]
+    return values
+
+
 def generate_provider_table(person_df: pd.DataFrame, case_df: pd.DataFrame) -> pd.DataFrame:
     """
     Generates an omop compliant version of the provider table from a given person and case table.
@@ -44,30 +83,62 @@ def generate_observation_period_table(case_df: pd.DataFrame) -> pd.DataFrame:
     :param case_df: the original version of the case table
     :return: an omop compliant version of a observation_period table
     """
-    # Get unique patient ids
-    unique_patient_ids: np.ndarray = case_df['PATIENT_ID'].unique()
-    # Create a list of observation periods for every patient
-    observation_periods: list = []
+    # The dates are replaced by their rank, because aggregating numbers is much faster than aggregating strings
+    start_ranks, start_dates = _rank(case_df['START_DATE'])
+    end_ranks, end_dates = _rank(case_df['END_DATE'])
+    # Earliest start and latest end date of every patient, in the order the patients first appear in the case table
+    periods: pd.DataFrame = pd.DataFrame({'start': start_ranks, 'end': end_ranks}) \
+        .groupby(case_df['PATIENT_ID'].to_numpy(), sort=False, dropna=False) \
+        .agg({'start': 'min', 'end': 'max'})
     # Generate observation period ids because case ids are duplicated
-    observation_period_id: int = 1
     period_type_concept_id: int = 32817
-    for patient_id in unique_patient_ids:
-        subset: pd.DataFrame = case_df[case_df['PATIENT_ID'] == patient_id]
-        start_date: object = subset['START_DATE'].min()
-        end_date: object = subset['END_DATE'].max()
-        observation_periods.append([observation_period_id, patient_id, start_date, end_date, period_type_concept_id])
-        observation_period_id += 1
-    # Create omop compliant dataframe out of the list
-    omop_observation_period_df: pd.DataFrame = pd.DataFrame(observation_periods, columns=[
-        'observation_period_id',
-        'person_id',
-        'observation_period_start_date',
-        'observation_period_end_date',
-        'period_type_concept_id'])
+    omop_observation_period_df: pd.DataFrame = pd.DataFrame({
+        'observation_period_id': np.arange(1, len(periods.index) + 1),
+        'person_id': periods.index.to_numpy(),
+        'observation_period_start_date': _unrank(periods['start'].to_numpy(), start_dates),
+        'observation_period_end_date': _unrank(periods['end'].to_numpy(), end_dates),
+        'period_type_concept_id': period_type_concept_id})
 
     return omop_observation_period_df
 
 
+class ObservationPeriodAccumulator:
+    """
+    Collects the earliest start and latest end date of every patient over the chunks of a case table, so the
+    observation_period table can be generated without keeping the whole case table in memory. Only one row per
+    patient is kept.
+    """
+
+    def __init__(self):
+        # Condensed case table with the columns PATIENT_ID, START_DATE and END_DATE
+        self._periods: Optional[pd.DataFrame] = None
+
+    def add(self, case_df: pd.DataFrame):
+        """
+        Adds the cases of a chunk of the case table.
+
+        :param case_df: a chunk of the original case table
+        """
+        cases: pd.DataFrame = case_df[['PATIENT_ID', 'START_DATE', 'END_DATE']]
+        if self._periods is not None:
+            cases = pd.concat([self._periods, cases], ignore_index=True)
+        periods: pd.DataFrame = generate_observation_period_table(cases)
+        self._periods = pd.DataFrame({'PATIENT_ID': periods['person_id'],
+                                      'START_DATE': periods['observation_period_start_date'],
+                                      'END_DATE': periods['observation_period_end_date']})
+
+    def generate_observation_period_table(self) -> pd.DataFrame:
+        """
+        Generates the observation_period table of all added cases. The result is the same as the result of
+        generate_observation_period_table for the whole case table.
+
+        :return: an omop compliant version of a observation_period table
+        """
+        if self._periods is None:
+            return generate_observation_period_table(pd.DataFrame(columns=['PATIENT_ID', 'START_DATE', 'END_DATE']))
+        return generate_observation_period_table(self._periods)
+
+
 def generate_person_table(person_df: pd.DataFrame) -> pd.DataFrame:
     """
     Generates an omop compliant version of the person table from a given person table.
@@ -108,8 +179,7 @@ def generate_visit_occurrence_table(case_df: pd.DataFrame) -> pd.DataFrame:
     omop_visit_occurrence_df.columns = ['visit_occurrence_id', 'provider_id', 'person_id', 'visit_start_date',
                                         'visit_end_date']
     # Generate unique visit occurrence ids because case ids are duplicated
-    for index, row in omop_visit_occurrence_df.iterrows():
-        omop_visit_occurrence_df.at[index, 'visit_occurrence_id'] = index + 1
+    omop_visit_occurrence_df['visit_occurrence_id'] = omop_visit_occurrence_df.index + 1
 
     # Add values for visit_concept_id and visit_type_concept_id
     # Concept 38004515 Hospital
@@ -141,8 +211,10 @@ def generate_procedure_occurrence_table(procedure_df: pd.DataFrame, loader: DBMa
     omop_procedure_occurrence_df['procedure_date'] = pd.to_datetime(omop_procedure_occurrence_df['procedure_datetime'],
                                                                     format='%Y-%m-%d').dt.date
 
-    omop_procedure_occurrence_df['procedure_concept_id'] = [loader.get_snomed_id(code, 'OPS') for code in
-                                                            omop_procedure_occurrence_df['procedure_source_value']]
+    # Translate OPS to SNOMED, all distinct codes are resolved at once
+    snomed_ids: dict = loader.get_snomed_ids(omop_procedure_occurrence_df['procedure_source_value'], 'OPS')
+    omop_procedure_occurrence_df['procedure_concept_id'] = _map_to_snomed_ids(
+        omop_procedure_occurrence_df['procedure_source_value'], snomed_ids)
     # Add value for procedure_type_concept_id
     # 32817 EHR
     omop_procedure_occurrence_df['procedure_type_concept_id'] = 32817
@@ -169,11 +241,9 @@ def generate_measurement_table(lab_df: pd.DataFrame, loader: DBManager) -> pd.Da
         omop_measurement_df: pd.DataFrame = lab_df[['IDENTIFIER', 'PARAMETER_NAME', 'PARAMETER_LOINC',
                                                     'Patientidentifikator', 'TEST_DATE', 'NUMERIC_VALUE',
                                                     'UCUM_UNIT', 'IS_NORMAL', 'DEVIATION']].copy(deep=True)
-        # Get Patient-ID from Patientidentifikator
-        for index, row in omop_measurement_df.iterrows():
-            patientidentifikator: str = row['Patientidentifikator']
-            patientidentifikator = patientidentifikator[-4:]
-            omop_measurement_df.at[index, 'Patientidentifikator'] = int(patientidentifikator)
+        # Get Patient-ID from Patientidentifikator, the last four characters are the id
+        omop_measurement_df['Patientidentifikator'] = omop_measurement_df['Patientidentifikator'].str[-4:] \
+            .astype(np.int64)
     elif 'PATIENT_ID' in lab_df.columns:
         omop_measurement_df: pd.DataFrame = lab_df[['IDENTIFIER', 'PARAMETER_NAME', 'PARAMETER_LOINC',
                                                     'PATIENT_ID', 'TEST_DATE', 'NUMERIC_VALUE',
@@ -196,9 +266,9 @@ def generate_measurement_table(lab_df: pd.DataFrame, loader: DBManager) -> pd.Da
     # Refactor measurement_date
     omop_measurement_df['measurement_date'] = pd.to_datetime(omop_measurement_df['measurement_date'],
                                                              format='%Y-%m-%d').dt.date
-    # Translate LOINC to SNOMED
-    omop_measurement_df['measurement_concept_id'] = [loader.get_snomed_id(code, 'LOINC') for code in
-                                                     lab_df['PARAMETER_LOINC']]
+    # Translate LOINC to SNOMED, all distinct codes are resolved at once
+    snomed_ids: dict = loader.get_snomed_ids(lab_df['PARAMETER_LOINC'], 'LOINC')
+    omop_measurement_df['measurement_concept_id'] = _map_to_snomed_ids(lab_df['PARAMETER_LOINC'], snomed_ids)
 
     # Add value for measurement_concept_type_id
     # 32856 Lab
@@ -206,12 +276,18 @@ def generate_measurement_table(lab_df: pd.DataFrame, loader: DBManager) -> pd.Da
     return omop_measurement_df
 
 
-def generate_condition_occurrence_table(diagnosis_df: pd.DataFrame, loader: DBManager) -> pd.DataFrame:
+def generate_condition_occurrence_table(diagnosis_df: pd.DataFrame, loader: DBManager, first_id: int = 1,
+                                        first_secondary_id: Optional[int] = None) -> pd.DataFrame:
     """
     Generates an omop compliant version of the condition_occurrence table from a given diagnosis table.
+    The primary conditions of all rows get consecutive ids, followed by the secondary conditions.
 
     :param diagnosis_df: the original version of the diagnosis table
     :param loader: Loader used to query common for snomed codes
+    :param first_id: the first condition_occurrence_id, later chunks of a diagnosis table have to start after the ids
+    of the previous chunks
+    :param first_secondary_id: Optional first id of the secondary conditions, by default they start after the ids of
+    the primary conditions (see get_condition_occurrence_first_ids)
     :return: an omop compliant version of a condition_occurrence table
     """
     # Remove all columns with no admission date
@@ -245,9 +321,10 @@ def generate_condition_occurrence_table(diagnosis_df: pd.DataFrame, loader: DBMa
     omop_condition_occurrence: pd.DataFrame = pd.concat([primary_condition_df, secondary_condition_df],
                                                         ignore_index=True)
 
-    # Get Snomed Ids for ICD 10 GM codes
-    omop_condition_occurrence['condition_concept_id'] = [loader.get_snomed_id(icd, 'ICD10GM') for icd in
-                                                         omop_condition_occurrence['condition_source_value']]
+    # Get Snomed Ids for ICD 10 GM codes, all distinct codes are resolved at once
+    snomed_ids: dict = loader.get_snomed_ids(omop_condition_occurrence['condition_source_value'], 'ICD10GM')
+    omop_condition_occurrence['condition_concept_id'] = _map_to_snomed_ids(
+        omop_condition_occurrence['condition_source_value'], snomed_ids)
 
     # Refactor condition_start_date
     omop_condition_occurrence['condition_start_date'] = pd.to_datetime(
@@ -255,8 +332,31 @@ def generate_condition_occurrence_table(diagnosis_df: pd.DataFrame, loader: DBMa
         format='%Y-%m-%d')
 
     # Generate condition_occurrence_id
-    for index, row in omop_condition_occurrence.iterrows():
-        omop_condition_occurrence.at[index, 'condition_occurrence_id'] = index + 1
+    if first_secondary_id is None:
+        first_secondary_id = first_id + len(primary_condition_df.index)
+    omop_condition_occurrence['condition_occurrence_id'] = np.concatenate([
+        np.arange(first_id, first_id + len(primary_condition_df.index)),
+        np.arange(first_secondary_id, first_secondary_id + len(secondary_condition_df.index))])
 
     omop_condition_occurrence.dropna(inplace=True)
     return omop_condition_occurrence
+
+
+def get_condition_occurrence_first_ids(diagnosis_df: pd.DataFrame, starts: List[int]) -> List[Tuple[int, int]]:
+    """
+    Gets the first ids of the primary and secondary conditions of chunks of a diagnosis table, so the chunks
+    transformed by generate_condition_occurrence_table get the same ids as the whole table.
+
+    :param diagnosis_df: the original version of the diagnosis table
+    :param starts: position of the first row of every chunk
+    :return: (first_id, first_secondary_id) for every chunk
+    """
+    admitted: np.ndarray = diagnosis_df['ADMISSION_DATE'].notna().to_numpy()
+    secondary_codes: pd.Series = diagnosis_df['ICD_SECONDARY_CODE']
+    has_secondary: np.ndarray = admitted & (secondary_codes.notna() & (secondary_codes != "-")).to_numpy()
+    # Number of primary and secondary conditions before every row
+    primaries_before: np.ndarray = np.concatenate([[0], np.cumsum(admitted)])
+    secondaries_before: np.ndarray = np.concatenate([[0], np.cumsum(has_secondary)])
+    primary_count: int = int(primaries_before[-1])
+    return [(int(primaries_before[start]) + 1, primary_count + int(secondaries_before[start]) + 1)
+            for start in starts]
@@ -3,6 +3,7 @@ from datetime import date
 from typing import Iterator, TypedDict, List, Dict, NewType, Optional
 from enum import Enum
 from Backend.Singleton import Singleton
+from Backend.etl.etl_job import EtlJobData
 import os
 
 PatientId = NewType("PatientId", int)
@@ -14,6 +15,18 @@ class Disease(Enum):
     PIMS = "Pediatric Inflammatory Multisystem Syndrome"
 
 
+class AnalysisState(Enum):
+    """ States of the analysis of all patients in the database """
+    # No analysis has been started yet
+    IDLE = "idle"
+    # An analysis is running, the results of the last complete analysis are served meanwhile
+    RUNNING = "running"
+    # The last analysis has finished
+    READY = "ready"
+    # The last analysis has failed, the results of the last complete analysis are still served
+    FAILED = "failed"
+
+
 class AnalysisData(TypedDict):
     """ Expected format for analysis data """
     name: str
@@ -161,6 +174,26 @@ class Interface(Singleton, ABC):
         """
         pass
 
+    @abstractmethod
+    def start_etl(self, csv_dir: os.path) -> Optional[str]:
+        """
+        executes etl-job in the background
+
+        :param csv_dir: with all needed files
+        :return: id of the started job, None if another job is still running
+        """
+        pass
+
+    @abstractmethod
+    def get_etl_job(self, job_id: str) -> Optional[EtlJobData]:
+        """
+        progress of an etl-job
+
+        :param job_id: of the job
+        :return: progress of the job, None if there is no job with this id
+        """
+        pass
+
     @abstractmethod
     def run_analysis(self) -> bool:
         """
@@ -170,6 +203,35 @@ class Interface(Singleton, ABC):
         """
         pass
 
+    @abstractmethod
+    def start_analysis(self) -> bool:
+        """
+        analyse data in the background
+
+        :return: analysis started, False if an analysis is already running
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def analysis_state(self) -> AnalysisState:
+        """
+        state of the analysis
+
+        :return: current state
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def is_analysis_ready(self) -> bool:
+        """
+        check if the results of a complete analysis are available
+
+        :return: results available
+        """
+        pass
+
     @property
     @abstractmethod
     def analysis_data(self) -> Dict[PatientId, AnalysisData]:
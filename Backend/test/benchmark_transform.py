@@ -0,0 +1,54 @@
+import sys
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from Backend.etl.csv_enums import CaseColumnsEnum
+from Backend.etl.transform import generate_observation_period_table
+
+# Number of case rows of the benchmark runs
+DEFAULT_SIZES: List[int] = [10000, 100000, 1000000, 10000000]
+# Average number of cases per patient, similar to the provided CASE.csv
+CASES_PER_PATIENT: int = 3
+
+
+def create_case_df(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Creates a random case table with the given number of rows. Dates are strings like in the extracted csv files.
+
+    :param rows: number of cases
+    :param seed: seed of the random number generator
+    :return: case table
+    """
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2000-01-01') + rng.integers(0, 8000, rows).astype('timedelta64[D]')
+    end = start + rng.integers(0, 30, rows).astype('timedelta64[D]')
+    return pd.DataFrame({
+        CaseColumnsEnum.ID.value: np.arange(rows),
+        CaseColumnsEnum.PROVIDER_ID.value: 1,
+        CaseColumnsEnum.PATIENT_ID.value: rng.integers(0, max(1, rows // CASES_PER_PATIENT), rows),
+        CaseColumnsEnum.START.value: np.datetime_as_string(start),
+        CaseColumnsEnum.END.value: np.datetime_as_string(end)
+    })
+
+
+def run_benchmark(sizes: List[int]):
+    """
+    Prints the runtime of generate_observation_period_table for case tables of the given sizes.
+
+    :param sizes: numbers of case rows
+    """
+    print(f"{'cases':>10} {'patients':>10} {'seconds':>8} {'cases/s':>12}")
+    for rows in sizes:
+        case_df: pd.DataFrame = create_case_df(rows)
+        start_time: float = time.perf_counter()
+        result: pd.DataFrame = generate_observation_period_table(case_df)
+        seconds: float = time.perf_counter() - start_time
+        print(f"{rows:>10} {len(result.index):>10} {seconds:>8.2f} {rows / seconds:>12.0f}")
+
+
+if __name__ == '__main__':
+    # Usage: python -m Backend.test.benchmark_transform [rows ...]
+    run_benchmark([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
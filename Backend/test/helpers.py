@@ -0,0 +1,30 @@
+import os
+import tempfile
+from typing import Dict
+
+import pandas as pd
+
+from Backend.common.config import DbConfig
+from Backend.common.database import DBManager
+from Backend.common.vocabulary_snapshot import VocabularySnapshot
+
+
+def create_snapshot_loader(mappings: Dict[str, Dict[str, int]]) -> DBManager:
+    """
+    Creates a DBManager without database connection, that resolves codes from a vocabulary snapshot.
+
+    :param mappings: SNOMED-Ids of the codes by vocabulary id, e.g. {'ICD10GM': {'R50.9': 437663}}
+    :return: the DBManager
+    """
+    invalid: str = "invalid"
+    config = DbConfig(db_name=invalid, db_schema=invalid, host="localhost",
+                      password=invalid, username=invalid, port="1234")
+    loader = DBManager(db_config=config, clear_tables=False)
+    snapshot_mappings: Dict[str, pd.DataFrame] = {
+        vocabulary_id: pd.DataFrame({'concept_code': list(codes.keys()), 'snomed_id': list(codes.values())})
+        for vocabulary_id, codes in mappings.items()}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "snapshot.npz")
+        VocabularySnapshot(snapshot_mappings).save(path)
+        loader.use_vocabulary_snapshot(path)
+    return loader
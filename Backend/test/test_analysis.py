@@ -1,6 +1,10 @@
+import datetime
 from unittest import TestCase
 
-from Backend.analysis.analysis import evaluate_patient, evaluate_patients, evaluate_all_in_database
+import pandas as pd
+
+from Backend.analysis.analysis import evaluate_patient, evaluate_patients, evaluate_all_in_database, \
+    evaluate_patients_in_batch
 from Backend.common.config import DbConfig
 from Backend.common.database import DBManager
 
@@ -61,3 +65,54 @@ class TestAnalysis(TestCase):
             # Assert
             self.fail("Should catch all exceptions and not terminate. Should return an empty list.")
 
+    def test_evaluate_patients_in_batch_without_db_connection(self):
+        # Prepare
+        # Create DBManager with invalid config and therefore invalid database connection
+        invalid: str = "invalid"
+        config = DbConfig(db_name=invalid, db_schema=invalid, host="localhost",
+                          password=invalid, username=invalid, port="1234")
+
+        db_manager = DBManager(db_config=config, clear_tables=False)
+
+        # Test / Assert
+        with self.assertRaises(AttributeError, msg="Should raise an AttributeError if the queries can not be performed."):
+            evaluate_patients_in_batch(db_manager=db_manager)
+
+    def test_evaluate_patients_in_batch_without_ids(self):
+        # An empty list of ids should be evaluated without a database connection
+        # Prepare
+        invalid: str = "invalid"
+        config = DbConfig(db_name=invalid, db_schema=invalid, host="localhost",
+                          password=invalid, username=invalid, port="1234")
+
+        db_manager = DBManager(db_config=config, clear_tables=False)
+
+        # Test
+        result: list = evaluate_patients_in_batch(db_manager=db_manager, patient_ids=[])
+
+        # Assert
+        self.assertListEqual(result, list(), "Returned list should be empty.")
+
+    def test_evaluate_patients_in_batch_with_invalid_person(self):
+        # A person without a year of birth should be skipped instead of aborting the whole batch
+        # Prepare
+        class _QueryDBManager(DBManager):
+            def __init__(self):
+                self.conn = None
+                self.DB_SCHEMA = "cds_cdm"
+
+            def send_query(self, query: str) -> pd.DataFrame:
+                if "FROM cds_cdm.person" in query:
+                    return pd.DataFrame({'person_id': [1, 2, 3], 'day_of_birth': [1, 2, 3],
+                                         'month_of_birth': [1, 2, 3], 'year_of_birth': [2015, None, 2017],
+                                         'person_source_value': ["A", "B", "C"]})
+                if "FROM cds_cdm.observation_period" in query:
+                    return pd.DataFrame({'person_id': [1, 2, 3], 'case_date': [datetime.date(2020, 1, 1)] * 3})
+                return pd.DataFrame()
+
+        # Test
+        result: list = evaluate_patients_in_batch(db_manager=_QueryDBManager())
+
+        # Assert
+        self.assertListEqual([patient.id for patient in result], [1, 3])
+        self.assertEqual(result[1].birthdate, datetime.date(2017, 3, 3))
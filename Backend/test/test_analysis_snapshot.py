@@ -0,0 +1,74 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from Backend.analysis.analysis_snapshot import AnalysisSnapshot, try_load_snapshot, remove_snapshot
+from Backend.analysis.patient_memory import create_sample_patients
+
+
+class TestAnalysisSnapshot(TestCase):
+
+    FINGERPRINT: dict = {'db_schema': 'cds_cdm', 'tables': {'person': [3, 3], 'measurement': [10, 12]}}
+
+    def test_save_and_load(self):
+        # Prepare
+        patients = create_sample_patients(50)
+        patients[0].name = None
+        snapshot = AnalysisSnapshot(patients, self.FINGERPRINT)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "snapshot.npz")
+
+            # Test
+            snapshot.save(path)
+            loaded = AnalysisSnapshot.load(path)
+
+        # Assert
+        self.assertTrue(loaded.matches(self.FINGERPRINT))
+        self.assertFalse(loaded.matches({'db_schema': 'cds_cdm', 'tables': {'person': [4, 4]}}))
+        self.assertEqual(len(loaded.patients), len(patients))
+        self.assertEqual(loaded.patients[0].name, "", "Missing names should be stored as empty string.")
+        for expected, patient in zip(patients[1:], loaded.patients[1:]):
+            self.assertEqual(expected.id, patient.id)
+            self.assertEqual(expected.name, patient.name)
+            self.assertEqual(expected.birthdate, patient.birthdate)
+            self.assertEqual(expected.case_date, patient.case_date)
+            self.assertEqual(expected.conditions, patient.conditions)
+            self.assertEqual(expected.high_measurements, patient.high_measurements)
+            self.assertEqual(expected.symptoms, patient.symptoms)
+            self.assertEqual(expected.kawasaki_score, patient.kawasaki_score)
+            self.assertEqual(expected.pims_score, patient.pims_score)
+            self.assertListEqual(expected.reasons_for_kawasaki, patient.reasons_for_kawasaki)
+            self.assertListEqual(expected.missing_for_pims, patient.missing_for_pims)
+
+    def test_save_and_load_empty(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "snapshot.npz")
+
+            # Test
+            AnalysisSnapshot(list(), self.FINGERPRINT).save(path)
+            loaded = AnalysisSnapshot.load(path)
+
+        # Assert
+        self.assertEqual(len(loaded.patients), 0)
+
+    def test_try_load_invalid_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            missing_path = os.path.join(tmp_dir, "missing.npz")
+            invalid_path = os.path.join(tmp_dir, "invalid.npz")
+            np.savez(invalid_path, values=np.arange(3))
+
+            # Test
+            missing = try_load_snapshot(missing_path)
+            invalid = try_load_snapshot(invalid_path)
+            remove_snapshot(invalid_path)
+            removed = not os.path.exists(invalid_path)
+            # Removing a missing snapshot shouldn't fail
+            remove_snapshot(missing_path)
+
+        # Assert
+        self.assertIsNone(missing, "Should return None if there is no snapshot.")
+        self.assertIsNone(invalid, "Should return None if the file is not a snapshot.")
+        self.assertTrue(removed)
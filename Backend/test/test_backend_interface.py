@@ -0,0 +1,85 @@
+import datetime
+import os
+import tempfile
+from typing import Dict, List
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.analysis.patient import Patient
+from Backend.backend_interface import BackendManager
+from Backend.common.database import DBManager
+from Backend.etl.checkpoint import EtlCheckpoint
+from Backend.interface import PatientId
+
+
+class _UnconfiguredBackendManager(BackendManager):
+    """
+    BackendManager that doesn't read the config file.
+    """
+
+    def reset_config(self):
+        self.db_config = None
+        self.dbManager = None
+
+
+class _EditingDBManager(DBManager):
+    """
+    DBManager without a database connection, that serves two persons and lets the frontend edit a patient while the
+    analysis reads the person table.
+    """
+
+    def __init__(self, backend_manager: BackendManager, edited_patient: Patient):
+        self.conn = None
+        self.DB_SCHEMA = "cds_cdm"
+        self._backend_manager: BackendManager = backend_manager
+        self._edited_patient: Patient = edited_patient
+
+    def get_table_fingerprint(self, tables: Dict[str, str]) -> Dict[str, List[int]]:
+        return {table: [2, 2] for table in tables}
+
+    def send_query(self, query: str) -> pd.DataFrame:
+        if "FROM cds_cdm.person" in query:
+            with self._backend_manager._patients_lock:
+                self._backend_manager._record_edit(self._edited_patient)
+            return pd.DataFrame({'person_id': [1, 2], 'day_of_birth': [1, 2], 'month_of_birth': [1, 2],
+                                 'year_of_birth': [2015, 2016], 'person_source_value': ["A", "B"]})
+        if "FROM cds_cdm.observation_period" in query:
+            return pd.DataFrame({'person_id': [1, 2], 'case_date': [datetime.date(2020, 1, 1)] * 2})
+        return pd.DataFrame()
+
+
+class TestBackendManager(TestCase):
+
+    def test_edit_during_analysis(self):
+        # A patient added during the analysis should be kept and the possibly stale results shouldn't be persisted
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            backend_manager = _UnconfiguredBackendManager()
+            backend_manager.analysis_snapshot_path = os.path.join(tmp_dir, "snapshot.npz")
+            added_patient = Patient(patient_id=3, name="C", birthdate=datetime.date(2017, 3, 3),
+                                    case_date=datetime.date(2020, 1, 1))
+            backend_manager.dbManager = _EditingDBManager(backend_manager, added_patient)
+
+            # Test
+            backend_manager.analyze_all_in_database()
+
+            # Assert
+            self.assertListEqual(sorted(backend_manager._patients.keys()), [PatientId(1), PatientId(2), PatientId(3)])
+            self.assertIs(backend_manager._patients[PatientId(3)], added_patient)
+            self.assertFalse(os.path.exists(backend_manager.analysis_snapshot_path),
+                             "The snapshot shouldn't be saved, if patients were edited during the analysis.")
+
+    def test_reset_db_clears_checkpoints(self):
+        # Load checkpoints of cleared tables mustn't be continued
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            backend_manager = _UnconfiguredBackendManager()
+            backend_manager.etl_checkpoint_dir = os.path.join(tmp_dir, "checkpoints")
+            EtlCheckpoint(backend_manager.etl_checkpoint_dir).save('load', 'person', 'hash')
+
+            # Test
+            backend_manager.reset_db()
+
+            # Assert
+            self.assertFalse(EtlCheckpoint(backend_manager.etl_checkpoint_dir).is_done('load', 'person', 'hash'))
@@ -0,0 +1,83 @@
+from unittest import TestCase
+
+from Backend.common.concept_cache import ConceptMappingCache
+
+
+class TestConceptMappingCache(TestCase):
+
+    def test_get_and_put(self):
+        # Prepare
+        cache = ConceptMappingCache(max_size=10)
+
+        # Test
+        missing = cache.get('ICD10GM', 'R50.9')
+        cache.put('ICD10GM', 'R50.9', 437663)
+        found = cache.get('ICD10GM', 'R50.9')
+        other_vocabulary = cache.get('OPS', 'R50.9')
+
+        # Assert
+        self.assertIsNone(missing, "Should return None for codes that are not cached.")
+        self.assertEqual(found, 437663, "Should return the cached mapping.")
+        self.assertIsNone(other_vocabulary, "Mappings of different vocabularies should be separated.")
+        stats = cache.stats
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['size'], 1)
+
+    def test_negative_results_are_cached(self):
+        # Prepare
+        cache = ConceptMappingCache(max_size=10)
+
+        # Test
+        cache.put('LOINC', '0000-0', 0)
+
+        # Assert
+        self.assertEqual(cache.get('LOINC', '0000-0'), 0, "Should cache codes without a mapping as 0.")
+        self.assertEqual(cache.stats['hits'], 1)
+
+    def test_lru_eviction(self):
+        # Prepare
+        cache = ConceptMappingCache(max_size=2)
+        cache.put('ICD10GM', 'A', 1)
+        cache.put('ICD10GM', 'B', 2)
+
+        # Test
+        # Use 'A', so 'B' is the least recently used entry
+        cache.get('ICD10GM', 'A')
+        cache.put('ICD10GM', 'C', 3)
+
+        # Assert
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('ICD10GM', 'A'), 1)
+        self.assertIsNone(cache.get('ICD10GM', 'B'), "Least recently used entry should be evicted.")
+        self.assertEqual(cache.get('ICD10GM', 'C'), 3)
+        self.assertEqual(cache.stats['evictions'], 1)
+
+    def test_get_many_and_put_many(self):
+        # Prepare
+        cache = ConceptMappingCache(max_size=10)
+        cache.put_many('OPS', {'1-100': 11, '1-200': 0})
+
+        # Test
+        result = cache.get_many('OPS', ['1-100', '1-200', '1-300'])
+
+        # Assert
+        self.assertDictEqual(result, {'1-100': 11, '1-200': 0})
+        self.assertEqual(cache.stats['hits'], 2)
+        self.assertEqual(cache.stats['misses'], 1)
+
+    def test_resize_and_clear(self):
+        # Prepare
+        cache = ConceptMappingCache(max_size=3)
+        cache.put_many('ICD10GM', {'A': 1, 'B': 2, 'C': 3})
+
+        # Test
+        cache.resize(1)
+        size_after_resize = len(cache)
+        cache.clear()
+
+        # Assert
+        self.assertEqual(size_after_resize, 1, "Should evict entries that exceed the new size.")
+        self.assertEqual(len(cache), 0, "Should be empty after clearing.")
+        self.assertEqual(cache.stats['evictions'], 2, "Counters should be kept after clearing.")
+        self.assertRaises(ValueError, cache.resize, 0)
@@ -0,0 +1,202 @@
+import datetime
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.common.config import DbConfig
+from Backend.common.database import DBManager, to_copy_buffer, COPY_NULL
+from Backend.common.omop_enums import SnomedConcepts, OmopTableEnum
+from Backend.common.vocabulary_snapshot import VocabularySnapshot
+
+
+class _RecordingConnection:
+    """
+    Connection that records the executed queries instead of sending them to a database.
+    """
+
+    def __init__(self, has_unique_id: bool):
+        self.has_unique_id: bool = has_unique_id
+        self.queries: List[str] = list()
+        self.committed: bool = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, query: str, parameters=None):
+        self.queries.append(query)
+
+    def copy_expert(self, query: str, buffer):
+        self.queries.append(query)
+
+    def fetchone(self):
+        return self.has_unique_id,
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        pass
+
+
+class TestDatabase(TestCase):
+
+    @staticmethod
+    def _create_db_manager_without_connection() -> DBManager:
+        # Create DBManager with invalid config and therefore invalid database connection
+        invalid: str = "invalid"
+        config = DbConfig(db_name=invalid, db_schema=invalid, host="localhost",
+                          password=invalid, username=invalid, port="1234")
+        return DBManager(db_config=config, clear_tables=False)
+
+    def test_get_snomed_ids_missing_mappings(self):
+        # Codes that are not in the omop database should be resolved without a database connection
+        # Prepare
+        db_manager = self._create_db_manager_without_connection()
+        codes = ['U07.1', 'U07.1!', 'U07.2', 'U10.9+', 'U07.1']
+
+        # Test
+        result = db_manager.get_snomed_ids(codes, 'ICD10GM')
+
+        # Assert
+        self.assertEqual(len(result), 4, "Should contain every distinct code exactly once.")
+        self.assertEqual(result['U07.1'], SnomedConcepts.COVID_19.value)
+        self.assertEqual(result['U07.1!'], SnomedConcepts.COVID_19.value)
+        self.assertEqual(result['U07.2'], SnomedConcepts.COVID_19_VIRUS_NOT_IDENTIFIED.value)
+        self.assertEqual(result['U10.9+'], SnomedConcepts.PIMS.value)
+
+    def test_get_snomed_ids_ignores_empty_values(self):
+        # Prepare
+        db_manager = self._create_db_manager_without_connection()
+        codes = [float('nan'), None, 'U07.2']
+
+        # Test
+        result = db_manager.get_snomed_ids(codes, 'ICD10GM')
+
+        # Assert
+        self.assertDictEqual(result, {'U07.2': SnomedConcepts.COVID_19_VIRUS_NOT_IDENTIFIED.value})
+
+    def test_get_snomed_ids_without_db_connection(self):
+        # Prepare
+        db_manager = self._create_db_manager_without_connection()
+
+        # Test / Assert
+        with self.assertRaises(AttributeError, msg="Should raise an AttributeError if the query can not be performed."):
+            db_manager.get_snomed_ids(['R50.9', 'U07.1'], 'ICD10GM')
+
+    def test_get_snomed_ids_with_vocabulary_snapshot(self):
+        # Codes should be resolved from the snapshot without a database connection
+        # Prepare
+        mappings = {'ICD10GM': pd.DataFrame({'concept_code': ['R50.9', 'A00'], 'snomed_id': [437663, 1]})}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "snapshot.npz")
+            VocabularySnapshot(mappings).save(path)
+            db_manager = self._create_db_manager_without_connection()
+
+            # Test
+            loaded = db_manager.use_vocabulary_snapshot(path)
+            result = db_manager.get_snomed_ids(['R50.9', 'R50.9!', 'X99', 'U07.1'], 'ICD10GM')
+            single_result = db_manager.get_snomed_id('A00', 'ICD10GM')
+
+        # Assert
+        self.assertTrue(loaded, "Should return True if the snapshot was loaded.")
+        self.assertDictEqual(result, {'R50.9': 437663, 'R50.9!': 437663, 'X99': 0,
+                                      'U07.1': SnomedConcepts.COVID_19.value})
+        self.assertEqual(single_result, 1)
+
+    def test_use_invalid_vocabulary_snapshot(self):
+        # Prepare
+        db_manager = self._create_db_manager_without_connection()
+
+        # Test
+        loaded = db_manager.use_vocabulary_snapshot("does_not_exist.npz")
+
+        # Assert
+        self.assertFalse(loaded, "Should return False if the snapshot can not be loaded.")
+        self.assertIsNone(db_manager.vocabulary_snapshot)
+
+    def test_to_copy_buffer(self):
+        # Prepare
+        df = pd.DataFrame({
+            'condition_occurrence_id': [1.0, 2.0],
+            'value_as_number': [1.5, None],
+            'condition_source_value': ['R50.9', None],
+            'condition_start_date': pd.to_datetime(['2020-02-02', '2019-01-03 10:30:00.25']),
+            'procedure_date': [datetime.date(2020, 2, 2), None]
+        })
+        expected_lines = ['1,1.5,R50.9,2020-02-02 00:00:00.000000,2020-02-02',
+                          f'2,{COPY_NULL},{COPY_NULL},2019-01-03 10:30:00.250000,{COPY_NULL}']
+
+        # Test
+        result = to_copy_buffer(df).read().splitlines()
+
+        # Assert
+        self.assertListEqual(result, expected_lines, "Whole numbers should be written as integers and missing "
+                                                     "values as NULL marker.")
+
+    def test_bulk_save_without_db_connection(self):
+        # Prepare
+        db_manager = self._create_db_manager_without_connection()
+        df = pd.DataFrame({'provider_id': range(DBManager.COPY_MIN_ROWS)})
+
+        # Test / Assert
+        with self.assertRaises(AttributeError, msg="Should raise an AttributeError if the copy can not be performed."):
+            db_manager.bulk_save(OmopTableEnum.PROVIDER, df)
+
+    def test_get_table_fingerprint_without_db_connection(self):
+        # Prepare
+        db_manager = self._create_db_manager_without_connection()
+
+        # Test / Assert
+        with self.assertRaises(AttributeError, msg="Should raise an AttributeError if the query can not be performed."):
+            db_manager.get_table_fingerprint({OmopTableEnum.PERSON.value: 'person_id'})
+
+    def test_bulk_upsert(self):
+        for has_unique_id in (True, False):
+            with self.subTest(has_unique_id=has_unique_id):
+                # Prepare
+                db_manager = self._create_db_manager_without_connection()
+                db_manager.conn = _RecordingConnection(has_unique_id)
+                df = pd.DataFrame({'person_id': [1, 2], 'year_of_birth': [2015, 2016]})
+
+                # Test
+                succeeded = db_manager.bulk_upsert(OmopTableEnum.PERSON, df, 'person_id')
+
+                # Assert
+                self.assertTrue(succeeded)
+                self.assertTrue(db_manager.conn.committed)
+                merge_queries = [query for query in db_manager.conn.queries
+                                 if query.startswith(("INSERT", "UPDATE"))]
+                if has_unique_id:
+                    self.assertEqual(len(merge_queries), 1)
+                    self.assertIn("ON CONFLICT (person_id) DO UPDATE SET year_of_birth = EXCLUDED.year_of_birth",
+                                  merge_queries[0])
+                else:
+                    # Without a unique constraint ON CONFLICT would fail, rows are updated and inserted separately
+                    self.assertEqual(len(merge_queries), 2)
+                    self.assertTrue(merge_queries[0].startswith("UPDATE person SET year_of_birth"))
+                    self.assertIn("WHERE NOT EXISTS", merge_queries[1])
+                    self.assertNotIn("ON CONFLICT", merge_queries[1])
+
+    def test_publish_staged_tables(self):
+        # Prepare
+        db_manager = self._create_db_manager_without_connection()
+        db_manager.conn = _RecordingConnection(has_unique_id=True)
+        staged_tables = [(OmopTableEnum.PERSON, 'person_staged_run', ['person_id', 'year_of_birth'], 'person_id'),
+                         (OmopTableEnum.MEASUREMENT, 'measurement_staged_run', ['measurement_id'], 'measurement_id')]
+
+        # Test
+        succeeded = db_manager.publish_staged_tables(staged_tables, replace=True)
+
+        # Assert
+        self.assertTrue(succeeded)
+        self.assertTrue(db_manager.conn.committed)
+        queries = [query for query in db_manager.conn.queries if not query.startswith("SET")]
+        self.assertTrue(queries[0].startswith("TRUNCATE"), "The tables should be cleared in the same transaction.")
+        self.assertListEqual(queries[1:], [
+            "INSERT INTO person(person_id,year_of_birth) SELECT person_id,year_of_birth FROM person_staged_run",
+            "INSERT INTO measurement(measurement_id) SELECT measurement_id FROM measurement_staged_run",
+            "DROP TABLE person_staged_run",
+            "DROP TABLE measurement_staged_run"])
@@ -0,0 +1,72 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.etl.checkpoint import EtlCheckpoint, MANIFEST_FILE, hash_inputs
+
+
+class TestEtlCheckpoint(TestCase):
+
+    def test_save_and_get(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            directory: str = os.path.join(tmp_dir, "checkpoints")
+            df = pd.DataFrame({'person_id': [1, 2], 'birth_datetime': pd.to_datetime(['2020-01-01', '2021-02-03'])})
+            EtlCheckpoint(directory).save('transform', 'generate_person_table', 'hash', df)
+
+            # Test
+            checkpoint = EtlCheckpoint(directory)
+            persisted = checkpoint.get('transform', 'generate_person_table', 'hash')
+
+            # Assert
+            pd.testing.assert_frame_equal(persisted, df)
+            self.assertIsNone(checkpoint.get('transform', 'generate_person_table', 'other hash'),
+                              "Stages with a changed input should run again.")
+            self.assertIsNone(checkpoint.get('transform', 'generate_location_table', 'hash'))
+            self.assertListEqual(sorted(os.listdir(directory)),
+                                 sorted([MANIFEST_FILE, "transform-generate_person_table.pkl"]),
+                                 "No temporary files should be left.")
+
+    def test_discard_and_clear(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            directory: str = os.path.join(tmp_dir, "checkpoints")
+            checkpoint = EtlCheckpoint(directory)
+            checkpoint.save('load', 'person', 'hash')
+            checkpoint.save('load', 'measurement', 'hash')
+            checkpoint.save('extract', 'PERSON.csv', 'hash', pd.DataFrame({'PATIENT_ID': [1]}))
+
+            # Test
+            checkpoint.discard('load')
+            restarted = EtlCheckpoint(directory)
+
+            # Assert
+            self.assertFalse(restarted.is_done('load', 'person', 'hash'))
+            self.assertFalse(restarted.is_done('load', 'measurement', 'hash'))
+            self.assertTrue(restarted.is_done('extract', 'PERSON.csv', 'hash'))
+
+            # Test
+            restarted.clear()
+
+            # Assert
+            self.assertFalse(os.path.exists(directory))
+            self.assertFalse(restarted.is_done('extract', 'PERSON.csv', 'hash'))
+
+    def test_disabled(self):
+        # Prepare
+        checkpoint = EtlCheckpoint(None)
+
+        # Test
+        checkpoint.save('extract', 'PERSON.csv', 'hash', pd.DataFrame({'PATIENT_ID': [1]}))
+
+        # Assert
+        self.assertFalse(checkpoint.enabled)
+        self.assertIsNone(checkpoint.get('extract', 'PERSON.csv', 'hash'))
+        self.assertEqual(checkpoint.hash_csv("does not exist.csv"), "")
+
+    def test_hash_inputs(self):
+        self.assertEqual(hash_inputs('a', 'b'), hash_inputs('a', 'b'))
+        self.assertNotEqual(hash_inputs('a', 'b'), hash_inputs('b', 'a'))
+        self.assertNotEqual(hash_inputs('ab'), hash_inputs('a', 'b'))
@@ -0,0 +1,182 @@
+import datetime
+from typing import Dict, List
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.common.database import DBManager
+from Backend.common.omop_enums import OmopTableEnum
+from Backend.etl.delta import diff_table, load_changes
+from Backend.etl.etl import ETL_STAGES
+from Backend.etl.progress import EtlProgress, EtlStageState
+
+VISIT_COLUMN_TYPES: Dict[str, str] = {
+    'visit_occurrence_id': 'integer',
+    'person_id': 'integer',
+    'provider_id': 'integer',
+    'visit_start_date': 'date',
+    'visit_end_date': 'date',
+    'visit_concept_id': 'integer'
+}
+
+MEASUREMENT_COLUMN_TYPES: Dict[str, str] = {
+    'measurement_id': 'integer',
+    'person_id': 'integer',
+    'measurement_date': 'date',
+    'measurement_datetime': 'timestamp without time zone',
+    'value_as_number': 'numeric',
+    'unit_source_value': 'character varying'
+}
+
+
+class _LoadedDBManager(DBManager):
+    """
+    DBManager without a database connection, that serves loaded rows as text and records the applied changes.
+    """
+
+    def __init__(self, loaded: Dict[OmopTableEnum, pd.DataFrame], column_types: Dict[OmopTableEnum, Dict[str, str]]):
+        self.conn = None
+        self.vocabulary_snapshot = None
+        self._loaded: Dict[OmopTableEnum, pd.DataFrame] = loaded
+        self._column_types: Dict[OmopTableEnum, Dict[str, str]] = column_types
+        self.changes: dict = dict()
+
+    def read_table(self, table: OmopTableEnum, columns: List[str]) -> pd.DataFrame:
+        return self._loaded[table][columns].astype(str)
+
+    def get_column_types(self, table: OmopTableEnum) -> Dict[str, str]:
+        return self._column_types[table]
+
+    def generate_ids(self, table: str, field: str, count: int) -> List[int]:
+        return list(range(10000, 10000 + count))
+
+    def apply_table_changes(self, inserts, updates, deletes) -> bool:
+        self.changes = {'inserts': inserts, 'updates': updates, 'deletes': deletes}
+        return True
+
+
+class TestEtlDelta(TestCase):
+
+    @staticmethod
+    def _create_visits(start_dates: List[str], concept_ids: List[int]) -> pd.DataFrame:
+        return pd.DataFrame({
+            'visit_occurrence_id': range(1, len(start_dates) + 1),
+            'person_id': 1,
+            'provider_id': 2,
+            'visit_start_date': pd.to_datetime(start_dates),
+            'visit_end_date': pd.to_datetime(start_dates),
+            'visit_concept_id': concept_ids})
+
+    def test_diff_table_generated_ids(self):
+        # Prepare
+        loaded_df = pd.DataFrame({
+            'visit_occurrence_id': ['5', '6', '7', '8'],
+            'person_id': '1',
+            'provider_id': '2',
+            # Dates of the database have no time
+            'visit_start_date': ['2020-01-01', '2020-01-01', '2020-02-01', '2020-03-01'],
+            'visit_end_date': ['2020-01-01', '2020-01-01', '2020-02-01', '2020-03-01'],
+            'visit_concept_id': ['38004515', '38004515', '38004515', '38004515']})
+        # Duplicated visit, changed concept, removed visit and new visit
+        new_df = self._create_visits(['2020-01-01 10:00:00', '2020-01-01 10:00:00', '2020-02-01 08:30:00',
+                                      '2020-04-01 12:00:00'], [38004515, 38004515, 1, 38004515])
+
+        # Test
+        delta = diff_table(OmopTableEnum.VISIT_OCCURRENCE, loaded_df, new_df, VISIT_COLUMN_TYPES)
+
+        # Assert
+        self.assertListEqual(delta.inserts['visit_start_date'].tolist(), [pd.Timestamp('2020-04-01 12:00:00')])
+        self.assertListEqual(delta.updates['visit_occurrence_id'].tolist(), [7],
+                             "Updated rows should keep the id of the loaded row.")
+        self.assertListEqual(delta.updates['visit_concept_id'].tolist(), [1])
+        self.assertListEqual(delta.deleted_ids, [8])
+        self.assertEqual(delta.size, 3)
+
+    def test_diff_table_source_ids(self):
+        # Prepare
+        loaded_df = pd.DataFrame({
+            'measurement_id': ['1', '2', '3'],
+            'person_id': ['1', '1', '2'],
+            'measurement_date': ['2020-01-01', '2020-01-02', '2020-01-03'],
+            'measurement_datetime': ['2020-01-01 10:00:00', '2020-01-02 10:00:00', '2020-01-03 10:00:00'],
+            'value_as_number': ['5.0', '1.25', float('nan')],
+            'unit_source_value': ['mg/l', 'mg/l', float('nan')]})
+        new_df = pd.DataFrame({
+            'measurement_id': [1, 2, 3, 4],
+            'person_id': [1, 1, 2, 2],
+            'measurement_date': [datetime.date(2020, 1, 1), datetime.date(2020, 1, 2), datetime.date(2020, 1, 3),
+                                 datetime.date(2020, 1, 4)],
+            'measurement_datetime': pd.to_datetime(['2020-01-01 10:00:00', '2020-01-02 10:00:00',
+                                                    '2020-01-03 10:00:00', '2020-01-04 10:00:00']),
+            'value_as_number': [5, 1.5, None, 3],
+            'unit_source_value': ['mg/l', 'mg/l', None, 'g']})
+
+        # Test
+        delta = diff_table(OmopTableEnum.MEASUREMENT, loaded_df, new_df, MEASUREMENT_COLUMN_TYPES)
+
+        # Assert
+        self.assertListEqual(delta.inserts['measurement_id'].tolist(), [4])
+        self.assertListEqual(delta.updates['measurement_id'].tolist(), [2])
+        self.assertListEqual(delta.deleted_ids, [])
+
+    def test_diff_table_unchanged(self):
+        # Prepare
+        new_df = self._create_visits(['2020-01-01', '2020-02-01'], [38004515, 38004515])
+        loaded_df = new_df.astype(str)
+
+        # Test
+        delta = diff_table(OmopTableEnum.VISIT_OCCURRENCE, loaded_df, new_df, VISIT_COLUMN_TYPES)
+
+        # Assert
+        self.assertEqual(delta.size, 0)
+
+    def test_diff_table_fractional_seconds(self):
+        # Prepare
+        loaded_df = pd.DataFrame({
+            'measurement_id': ['1', '2'],
+            'person_id': ['1', '1'],
+            'measurement_datetime': ['2020-01-01 10:00:00.25', '2020-01-02 10:00:00']})
+        new_df = pd.DataFrame({
+            'measurement_id': [1, 2],
+            'person_id': [1, 1],
+            'measurement_datetime': pd.to_datetime(['2020-01-01 10:00:00.5', '2020-01-02 10:00:00'])})
+
+        # Test
+        delta = diff_table(OmopTableEnum.MEASUREMENT, loaded_df, new_df, MEASUREMENT_COLUMN_TYPES)
+
+        # Assert
+        self.assertListEqual(delta.updates['measurement_id'].tolist(), [1],
+                             "Timestamps that only differ in their fractional seconds should be updated.")
+
+    def test_load_changes(self):
+        # Prepare
+        loaded_visits = self._create_visits(['2020-01-01', '2020-02-01', '2020-01-01'], [38004515, 38004515, 38004515])
+        # The person 3 is not part of the new extract, e.g. because it was added via the frontend
+        loaded_visits.loc[2, 'person_id'] = 3
+        new_visits = self._create_visits(['2020-02-01', '2020-03-01'], [38004515, 38004515])
+        loaded_people = pd.DataFrame({'person_id': [1, 3], 'provider_id': [2, 2]})
+        new_people = pd.DataFrame({'person_id': [1], 'provider_id': [2]})
+        db_manager = _LoadedDBManager(
+            loaded={OmopTableEnum.PERSON: loaded_people, OmopTableEnum.VISIT_OCCURRENCE: loaded_visits},
+            column_types={OmopTableEnum.PERSON: {'person_id': 'integer', 'provider_id': 'integer'},
+                          OmopTableEnum.VISIT_OCCURRENCE: VISIT_COLUMN_TYPES})
+        progress = EtlProgress(ETL_STAGES)
+
+        # Test
+        succeeded = load_changes({OmopTableEnum.VISIT_OCCURRENCE: new_visits, OmopTableEnum.PERSON: new_people},
+                                 db_manager, progress)
+
+        # Assert
+        self.assertTrue(succeeded)
+        inserts = db_manager.changes['inserts']
+        self.assertListEqual([table for table, _ in inserts],
+                             [OmopTableEnum.PERSON, OmopTableEnum.VISIT_OCCURRENCE])
+        self.assertListEqual(inserts[1][1]['visit_occurrence_id'].tolist(), [10000],
+                             "Inserted visits should get new ids.")
+        self.assertListEqual([(table, ids) for table, _, ids in db_manager.changes['deletes']],
+                             [(OmopTableEnum.VISIT_OCCURRENCE, [1]), (OmopTableEnum.PERSON, [])],
+                             "Only rows of the persons of the new extract should be deleted.")
+        stages = {stage['name']: stage for stage in progress.stages if stage['step'] == 'load'}
+        for table, rows in ((OmopTableEnum.PERSON, 0), (OmopTableEnum.VISIT_OCCURRENCE, 2)):
+            self.assertEqual(stages[table.value]['state'], EtlStageState.DONE.value)
+            self.assertEqual(stages[table.value]['rows'], rows)
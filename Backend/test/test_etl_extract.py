@@ -0,0 +1,74 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.etl import extract
+from Backend.etl.csv_enums import CsvFilesEnum
+from Backend.etl.csv_schemas import CSV_SCHEMAS, CsvSchema
+
+# Lab file with the alternative patient id column and some unused columns
+LAB_CSV: str = "IDENTIFIER;STATUS;PARAMETER_NAME;PARAMETER_LOINC;Patientidentifikator;TEST_DATE;NUMERIC_VALUE;" \
+               "IS_NORMAL;DEVIATION;COMMENT;UCUM_UNIT\n" \
+               "11125;Vorläufig;CRP;1988-5;P_0001125;2020-04-29 09:38:45;12.5;0;+;0;mg/L\n" \
+               ";Vorläufig;LH;10501-5;P_0000720;2020-05-19 11:58:45;;1;;;\n"
+
+
+class TestEtlExtract(TestCase):
+
+    def _extract(self, content: str, schema: CsvSchema, use_pyarrow: bool) -> pd.DataFrame:
+        pyarrow = extract.pyarrow
+        if not use_pyarrow:
+            extract.pyarrow = None
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path: str = os.path.join(tmp_dir, "LAB.csv")
+                with open(path, "w") as file:
+                    file.write(content)
+                return extract.extract_csv(path, schema)
+        finally:
+            extract.pyarrow = pyarrow
+
+    def test_extract_csv_with_schema(self):
+        for use_pyarrow in ([False, True] if extract.pyarrow is not None else [False]):
+            with self.subTest(use_pyarrow=use_pyarrow):
+                # Test
+                lab_df: pd.DataFrame = self._extract(LAB_CSV, CSV_SCHEMAS[CsvFilesEnum.LAB], use_pyarrow)
+
+                # Assert
+                self.assertListEqual(list(lab_df.columns),
+                                     ['IDENTIFIER', 'PARAMETER_NAME', 'PARAMETER_LOINC', 'Patientidentifikator',
+                                      'TEST_DATE', 'NUMERIC_VALUE', 'IS_NORMAL', 'DEVIATION', 'UCUM_UNIT'],
+                                     "Only used columns should be read, in the order of the file.")
+                self.assertEqual(lab_df['IDENTIFIER'].dtype, 'float64')
+                self.assertTrue(pd.isna(lab_df['IDENTIFIER'][1]))
+                self.assertEqual(lab_df['Patientidentifikator'][0], "P_0001125")
+                self.assertEqual(lab_df['TEST_DATE'].dtype, 'datetime64[ns]')
+                self.assertEqual(lab_df['TEST_DATE'][1], pd.Timestamp(2020, 5, 19, 11, 58, 45))
+                self.assertTrue(pd.isna(lab_df['DEVIATION'][1]), "Empty cells should be missing values.")
+
+    def test_extract_csv_invalid_date(self):
+        for use_pyarrow in ([False, True] if extract.pyarrow is not None else [False]):
+            with self.subTest(use_pyarrow=use_pyarrow):
+                # Test & Assert
+                with self.assertRaises(ValueError):
+                    self._extract(LAB_CSV.replace("2020-04-29", "29.04.2020"), CSV_SCHEMAS[CsvFilesEnum.LAB],
+                                  use_pyarrow)
+
+    def test_extract_csv_chunks_with_schema(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            path: str = os.path.join(tmp_dir, "LAB.csv")
+            with open(path, "w") as file:
+                file.write(LAB_CSV)
+
+            # Test
+            chunks = list(extract.extract_csv_chunks(path, 1, ['IDENTIFIER', 'TEST_DATE', 'COMMENT'],
+                                                     CSV_SCHEMAS[CsvFilesEnum.LAB]))
+
+        # Assert
+        self.assertEqual(len(chunks), 2)
+        self.assertListEqual(list(chunks[0].columns), ['IDENTIFIER', 'TEST_DATE'],
+                             "Columns that are not part of the schema should not be read.")
+        self.assertEqual(chunks[1]['TEST_DATE'].dtype, 'datetime64[ns]')
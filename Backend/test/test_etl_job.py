@@ -0,0 +1,74 @@
+import os
+import tempfile
+import threading
+from unittest import TestCase
+
+from Backend.etl.etl import ETL_STAGES
+from Backend.etl.etl_job import EtlJob, EtlJobRunner, EtlJobState
+from Backend.etl.progress import EtlProgress, EtlStageState
+
+
+class TestEtlProgress(TestCase):
+
+    def test_stage_progress(self):
+        # Prepare
+        progress = EtlProgress([('extract', 'PERSON.csv'), ('load', 'person')])
+
+        # Test
+        with progress.stage('extract', 'PERSON.csv') as stage:
+            stage.rows = 42
+
+        # Assert
+        self.assertEqual(progress.fraction, 0.5)
+        self.assertDictEqual(progress.stages[0], {'step': 'extract', 'name': 'PERSON.csv',
+                                                  'state': EtlStageState.DONE.value, 'rows': 42})
+        self.assertEqual(progress.stages[1]['state'], EtlStageState.PENDING.value)
+
+    def test_stage_failed(self):
+        # Prepare
+        progress = EtlProgress([('load', 'person')])
+
+        # Test
+        with self.assertRaises(AttributeError):
+            with progress.stage('load', 'person'):
+                raise AttributeError("Error during database operation.")
+
+        # Assert
+        self.assertEqual(progress.stages[0]['state'], EtlStageState.FAILED.value)
+        self.assertIsNone(progress.stages[0]['rows'])
+        self.assertEqual(progress.fraction, 0.0)
+
+
+class TestEtlJob(TestCase):
+
+    def test_job_with_missing_files_fails(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            job = EtlJob(os.path.join(tmp_dir, "missing"), db_config=None)
+
+            # Test
+            succeeded = job.run()
+
+        # Assert
+        self.assertFalse(succeeded)
+        data = job.to_data()
+        self.assertEqual(data['state'], EtlJobState.FAILED.value)
+        self.assertIsNotNone(data['error'])
+        self.assertEqual(len(data['stages']), len(ETL_STAGES))
+        self.assertEqual(data['stages'][0]['state'], EtlStageState.FAILED.value, "Extraction should have failed.")
+
+    def test_runner(self):
+        # Prepare
+        runner = EtlJobRunner()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Test
+            job = runner.start(os.path.join(tmp_dir, "missing"), db_config=None)
+            # Wait for the background thread
+            for thread in [t for t in threading.enumerate() if t.name == f"etl-job-{job.job_id}"]:
+                thread.join(timeout=10)
+
+        # Assert
+        self.assertIs(runner.get(job.job_id), job)
+        self.assertTrue(job.is_finished)
+        self.assertIsNone(runner.get("unknown"))
@@ -0,0 +1,138 @@
+import threading
+from typing import List, Optional, Tuple
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.common.database import DBManager
+from Backend.common.omop_enums import OmopTableEnum
+from Backend.etl.etl import ETL_STAGES
+from Backend.etl.load import TABLE_DEPENDENCIES, load_order, load_tables
+from Backend.etl.progress import EtlProgress, EtlStageState
+
+
+class _RecordingDBManager(DBManager):
+    """
+    DBManager without a database connection, that records the staged and published tables.
+    """
+
+    def __init__(self, staged: List[OmopTableEnum], failing_table: Optional[OmopTableEnum] = None):
+        self.conn = None
+        self.vocabulary_snapshot = None
+        self._staged: List[OmopTableEnum] = staged
+        self._failing_table: Optional[OmopTableEnum] = failing_table
+        self._lock = threading.Lock()
+        self.published: List[Tuple[OmopTableEnum, str]] = list()
+        self.replaced: bool = False
+        self.upserted: bool = False
+        self.dropped: List[str] = list()
+
+    def stage_table(self, table: OmopTableEnum, df: pd.DataFrame, staged: str) -> bool:
+        if table == self._failing_table:
+            raise AttributeError("Error during database operation. Check if there is an active connection.")
+        with self._lock:
+            self._staged.append(table)
+        return True
+
+    def publish_staged_tables(self, staged_tables: List[Tuple[OmopTableEnum, str, List[str], str]],
+                              replace: bool = False, upsert: bool = False) -> bool:
+        self.published = [(table, id_column) for table, _, _, id_column in staged_tables]
+        self.replaced = replace
+        self.upserted = upsert
+        return True
+
+    def drop_staged_tables(self, staged: List[str]) -> bool:
+        self.dropped = staged
+        return True
+
+
+class TestEtlLoad(TestCase):
+
+    @staticmethod
+    def _create_tables() -> dict:
+        return {OmopTableEnum(name): pd.DataFrame({'id': [1, 2]}) for step, name in ETL_STAGES if step == 'load'}
+
+    def test_load_order(self):
+        # Test
+        levels = load_order(list(self._create_tables().keys()))
+
+        # Assert
+        self.assertListEqual(levels, [
+            [OmopTableEnum.PROVIDER, OmopTableEnum.LOCATION],
+            [OmopTableEnum.PERSON],
+            [OmopTableEnum.OBSERVATION_PERIOD, OmopTableEnum.VISIT_OCCURRENCE, OmopTableEnum.PROCEDURE_OCCURRENCE,
+             OmopTableEnum.MEASUREMENT, OmopTableEnum.CONDITION_OCCURRENCE]])
+
+    def test_load_order_ignores_missing_tables(self):
+        # Test
+        levels = load_order([OmopTableEnum.MEASUREMENT, OmopTableEnum.PERSON])
+
+        # Assert
+        self.assertListEqual(levels, [[OmopTableEnum.PERSON], [OmopTableEnum.MEASUREMENT]])
+
+    def test_load_tables(self):
+        # Prepare
+        staged: List[OmopTableEnum] = list()
+        db_manager = _RecordingDBManager(staged)
+        progress = EtlProgress(ETL_STAGES)
+        loaded: List[OmopTableEnum] = list()
+
+        # Test
+        succeeded = load_tables(self._create_tables(), lambda: _RecordingDBManager(staged), db_manager, progress,
+                                replace=True, on_loaded=loaded.append)
+
+        # Assert
+        self.assertTrue(succeeded)
+        self.assertTrue(db_manager.replaced)
+        self.assertFalse(db_manager.upserted)
+        self.assertSetEqual(set(staged), set(self._create_tables().keys()))
+        published = [table for table, _ in db_manager.published]
+        self.assertSetEqual(set(published), set(self._create_tables().keys()))
+        for table, dependencies in TABLE_DEPENDENCIES.items():
+            for dependency in dependencies:
+                self.assertLess(published.index(dependency), published.index(table),
+                                f"{dependency.value} should be published before {table.value}.")
+        self.assertListEqual(loaded, published)
+        self.assertListEqual(db_manager.dropped, [])
+        self.assertTrue(all(stage['state'] == EtlStageState.DONE.value and stage['rows'] == 2
+                            for stage in progress.stages if stage['step'] == 'load'))
+
+    def test_load_tables_failed(self):
+        for upsert in (False, True):
+            with self.subTest(upsert=upsert):
+                # Prepare
+                staged: List[OmopTableEnum] = list()
+                db_manager = _RecordingDBManager(staged)
+                progress = EtlProgress(ETL_STAGES)
+                loaded: List[OmopTableEnum] = list()
+
+                # Test
+                succeeded = load_tables(self._create_tables(),
+                                        lambda: _RecordingDBManager(staged, failing_table=OmopTableEnum.PERSON),
+                                        db_manager, progress, upsert=upsert, replace=not upsert,
+                                        on_loaded=loaded.append)
+
+                # Assert
+                self.assertFalse(succeeded)
+                self.assertListEqual(db_manager.published, [], "No table should be published if a table fails.")
+                self.assertListEqual(loaded, [])
+                self.assertNotIn(OmopTableEnum.PERSON, staged)
+                self.assertEqual(len(db_manager.dropped), len(self._create_tables()),
+                                 "The staging tables should be dropped again.")
+                self.assertTrue(all(stage['state'] == EtlStageState.FAILED.value
+                                    for stage in progress.stages if stage['step'] == 'load'))
+
+    def test_load_tables_upsert(self):
+        # Prepare
+        db_manager = _RecordingDBManager(list())
+
+        # Test
+        succeeded = load_tables(self._create_tables(), lambda: _RecordingDBManager(list()), db_manager,
+                                EtlProgress(ETL_STAGES), upsert=True)
+
+        # Assert
+        self.assertTrue(succeeded)
+        self.assertTrue(db_manager.upserted)
+        self.assertFalse(db_manager.replaced)
+        self.assertIn((OmopTableEnum.PERSON, 'person_id'), db_manager.published)
+        self.assertIn((OmopTableEnum.CONDITION_OCCURRENCE, 'condition_occurrence_id'), db_manager.published)
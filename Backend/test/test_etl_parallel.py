@@ -0,0 +1,116 @@
+import pickle
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.common.database import DBManager
+from Backend.common.omop_enums import OmopTableEnum
+from Backend.etl import transform
+from Backend.etl.etl import ETL_STAGES
+from Backend.etl.parallel import run_transforms_in_parallel, split_rows
+from Backend.etl.progress import EtlProgress, EtlStageState
+from Backend.test.helpers import create_snapshot_loader
+
+
+class TestEtlParallel(TestCase):
+
+    @staticmethod
+    def _create_loader() -> DBManager:
+        return create_snapshot_loader({'ICD10GM': {'R50.9': 437663}, 'LOINC': {'1988-5': 3020460},
+                                       'OPS': {'8-930': 4013354}})
+
+    @staticmethod
+    def _create_source_tables() -> dict:
+        return {
+            'person_df': pd.DataFrame({
+                'PROVIDER_ID': [1, 2], 'PATIENT_ID': [1, 2], 'NAME': ["Muster", "Schulz"], 'FORNAME': ["Max", "Grete"],
+                'GENDER': ["m", "w"],
+                'BIRTHDATE': ["2015-01-01", "2016-02-02"], 'CITY': ["Berlin", "Rostock"], 'ZIP': ["10115", "18055"]
+            }),
+            'case_df': pd.DataFrame({
+                'ID': [1, 2, 3], 'PROVIDER_ID': [1, 1, 2], 'PATIENT_ID': [1, 1, 2],
+                'START_DATE': ["2020-02-02", "2020-01-01", "2020-03-03"],
+                'END_DATE': ["2020-02-05", "2020-01-02", "2020-03-04"]
+            }),
+            'procedure_df': pd.DataFrame({
+                'ID': [1], 'OPS_CODE': ["8-930"], 'PATIENT_ID': [1], 'EXECUTION_DATE': ["2020-02-03"]
+            }),
+            'lab_df': pd.DataFrame({
+                'IDENTIFIER': [11, 12, 13], 'PARAMETER_NAME': ["CRP", "CRP", "LH"],
+                'PARAMETER_LOINC': ["1988-5", "1988-5", "10501-5"], 'PATIENT_ID': [1, 2, 2],
+                'TEST_DATE': ["2020-04-29", "2020-04-30", "2020-05-19"], 'NUMERIC_VALUE': [12.0, 13.0, 33.0],
+                'UCUM_UNIT': ["mg/L", "mg/L", "[IU]/L"], 'IS_NORMAL': [0, 0, 1], 'DEVIATION': ["+", "+", None]
+            }),
+            'diagnosis_df': pd.DataFrame({
+                'PROVIDER_ID': [1, 1, 2], 'PATIENT_ID': [1, 1, 2],
+                'ADMISSION_DATE': ["2020-02-02", "2020-01-01", "2020-03-03"],
+                'ICD_PRIMARY_CODE': ["R50.9", "X99", "R50.9"], 'ICD_SECONDARY_CODE': ["R50.9", None, "X99"],
+                'DIAGNOSIS_TYPE': ["HD", "ND", "HD"]
+            })
+        }
+
+    def test_split_rows(self):
+        # Prepare
+        df = pd.DataFrame({'ID': range(5)})
+
+        # Test
+        chunks = split_rows(df, 2)
+
+        # Assert
+        self.assertListEqual([start for start, _ in chunks], [0, 2, 4])
+        self.assertListEqual([len(chunk.index) for _, chunk in chunks], [2, 2, 1])
+        self.assertEqual(len(split_rows(df.iloc[0:0], 2)), 1, "An empty table should still be transformed once.")
+
+    def test_vocabulary_loader_can_be_pickled(self):
+        # Prepare
+        loader: DBManager = self._create_loader().create_vocabulary_loader()
+
+        # Test
+        copied: DBManager = pickle.loads(pickle.dumps(loader))
+
+        # Assert
+        self.assertIsNone(copied.conn)
+        self.assertDictEqual(copied.get_snomed_ids(["R50.9", "U07.1", "X99"], 'ICD10GM'),
+                             loader.get_snomed_ids(["R50.9", "U07.1", "X99"], 'ICD10GM'))
+
+    def test_run_transforms_in_parallel(self):
+        # Prepare
+        loader: DBManager = self._create_loader().create_vocabulary_loader()
+        progress = EtlProgress(ETL_STAGES)
+
+        # Test
+        result = run_transforms_in_parallel(**self._create_source_tables(), loader=loader, workers=2,
+                                            progress=progress, chunk_size=2)
+
+        # Assert
+        self.assertListEqual(list(result.keys()), [OmopTableEnum(name) for step, name in ETL_STAGES if step == 'load'],
+                             "Tables should be in the order they are loaded.")
+        self.assertTrue(all(stage['state'] == EtlStageState.DONE.value
+                            for stage in progress.stages if stage['step'] == 'transform'))
+        source = self._create_source_tables()
+        pd.testing.assert_frame_equal(result[OmopTableEnum.PERSON],
+                                      transform.generate_person_table(source['person_df']))
+        pd.testing.assert_frame_equal(result[OmopTableEnum.MEASUREMENT].reset_index(drop=True),
+                                      transform.generate_measurement_table(source['lab_df'], loader)
+                                      .reset_index(drop=True))
+        # Chunks of the diagnosis table should get the same condition occurrence ids as the whole table
+        pd.testing.assert_frame_equal(result[OmopTableEnum.CONDITION_OCCURRENCE].reset_index(drop=True),
+                                      transform.generate_condition_occurrence_table(source['diagnosis_df'], loader)
+                                      .reset_index(drop=True))
+
+    def test_run_transforms_in_parallel_completed(self):
+        # Prepare
+        loader: DBManager = self._create_loader().create_vocabulary_loader()
+        completed_person_df = pd.DataFrame({'person_id': [42]})
+        transformed: list = list()
+
+        # Test
+        result = run_transforms_in_parallel(**self._create_source_tables(), loader=loader, workers=2,
+                                            progress=EtlProgress(ETL_STAGES), chunk_size=2,
+                                            completed={OmopTableEnum.PERSON: completed_person_df},
+                                            on_transformed=lambda table, df: transformed.append(table))
+
+        # Assert
+        self.assertIs(result[OmopTableEnum.PERSON], completed_person_df, "Completed tables shouldn't run again.")
+        self.assertNotIn(OmopTableEnum.PERSON, transformed)
+        self.assertListEqual(transformed, [table for table in result if table != OmopTableEnum.PERSON])
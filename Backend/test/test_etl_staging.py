@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.etl import extract
+from Backend.etl.csv_enums import CsvFilesEnum
+from Backend.etl.csv_schemas import CSV_SCHEMAS
+from Backend.etl.staging import StagingCache
+
+CASE_CSV: str = "CASE_ID;PROVIDER_ID;PATIENT_ID;START_DATE;END_DATE\n" \
+                "1;1;7;2020-07-11 15:00:00;2020-07-11 15:59:59\n" \
+                "2;1;3;2020-10-23 15:00:00;2020-10-23 15:59:59\n"
+
+
+@unittest.skipIf(extract.pyarrow is None, "Staging requires pyarrow.")
+class TestEtlStaging(TestCase):
+
+    def test_extract_csv_staged(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            csv_path: str = os.path.join(tmp_dir, "CASE.csv")
+            with open(csv_path, "w") as file:
+                file.write(CASE_CSV)
+            cache = StagingCache(os.path.join(tmp_dir, "staging"))
+            schema = CSV_SCHEMAS[CsvFilesEnum.CASE]
+
+            # Test
+            extracted: pd.DataFrame = cache.extract_csv(csv_path, schema)
+            staged_path: str = cache.get_path(csv_path, schema)
+            staged: pd.DataFrame = cache.extract_csv(csv_path, schema)
+
+            # Assert
+            self.assertTrue(os.path.isfile(staged_path))
+            self.assertListEqual(os.listdir(cache.directory), [os.path.basename(staged_path)],
+                                 "No temporary files should be left.")
+            pd.testing.assert_frame_equal(staged, extracted)
+            pd.testing.assert_frame_equal(staged, extract.extract_csv(csv_path, schema))
+
+    def test_changed_csv_is_staged_again(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            csv_path: str = os.path.join(tmp_dir, "CASE.csv")
+            with open(csv_path, "w") as file:
+                file.write(CASE_CSV)
+            cache = StagingCache(os.path.join(tmp_dir, "staging"))
+            cache.extract_csv(csv_path)
+            old_path: str = cache.get_path(csv_path)
+
+            # Test
+            with open(csv_path, "a") as file:
+                file.write("3;1;5;2002-05-11 15:00:00;2002-05-12 15:00:00\n")
+            staged: pd.DataFrame = cache.extract_csv(csv_path)
+
+            # Assert
+            self.assertNotEqual(cache.get_path(csv_path), old_path)
+            self.assertEqual(len(staged.index), 3)
+            self.assertNotEqual(cache.get_path(csv_path, CSV_SCHEMAS[CsvFilesEnum.CASE]), cache.get_path(csv_path),
+                                "Frames extracted with a schema should be staged separately.")
@@ -1,11 +1,16 @@
 import datetime
+import os
+import tempfile
+from typing import List
 from unittest import TestCase
 
 import pandas as pd
 
 from Backend.common.omop_enums import OmopProviderFieldsEnum, OmopPersonFieldsEnum
 from Backend.etl.csv_enums import CaseColumnsEnum, PersonColumnsEnum
+from Backend.etl.extract import extract_csv_chunks
 from Backend.etl.transform import *
+from Backend.test.helpers import create_snapshot_loader
 
 
 class TestEtlTransform(TestCase):
@@ -189,3 +194,187 @@ class TestEtlTransform(TestCase):
         # Assert
         self.assertIsNotNone(result)
         self.assertEqual(len(result.index),  1)
+
+    def test_generate_observation_period_table_valid(self):
+        # Prepare
+        case_data = {
+            CaseColumnsEnum.ID.value: [1, 1, 2, 3],
+            CaseColumnsEnum.PROVIDER_ID.value: [1, 1, 1, 1],
+            CaseColumnsEnum.PATIENT_ID.value: [7, 3, 7, 5],
+            CaseColumnsEnum.START.value: ["2020-02-02", "2019-01-03", "2012-07-08", "2002-05-11"],
+            CaseColumnsEnum.END.value: ["2020-02-03", "2019-01-04", "2012-07-09", "2002-05-12"]
+        }
+        case_df: pd.DataFrame = pd.DataFrame(case_data)
+
+        # Test
+        result: pd.DataFrame = generate_observation_period_table(case_df)
+
+        # Assert
+        self.assertListEqual(list(result.columns), ['observation_period_id', 'person_id',
+                                                    'observation_period_start_date', 'observation_period_end_date',
+                                                    'period_type_concept_id'])
+        self.assertListEqual(list(result['observation_period_id']), [1, 2, 3])
+        self.assertListEqual(list(result['person_id']), [7, 3, 5],
+                             "Patients should be ordered by their first appearance in the case table.")
+        self.assertListEqual(list(result['observation_period_start_date']), ["2012-07-08", "2019-01-03", "2002-05-11"])
+        self.assertListEqual(list(result['observation_period_end_date']), ["2020-02-03", "2019-01-04", "2002-05-12"])
+        self.assertTrue((result['period_type_concept_id'] == 32817).all())
+
+    def test_observation_period_accumulator(self):
+        # Prepare
+        case_data = {
+            CaseColumnsEnum.ID.value: [1, 1, 2, 3, 4],
+            CaseColumnsEnum.PROVIDER_ID.value: [1, 1, 1, 1, 1],
+            CaseColumnsEnum.PATIENT_ID.value: [7, 3, 7, 5, 3],
+            CaseColumnsEnum.START.value: ["2020-02-02", "2019-01-03", "2012-07-08", "2002-05-11", "2018-03-01"],
+            CaseColumnsEnum.END.value: ["2020-02-03", "2019-01-04", "2012-07-09", "2002-05-12", "2021-01-01"]
+        }
+        case_df: pd.DataFrame = pd.DataFrame(case_data)
+        accumulator = ObservationPeriodAccumulator()
+
+        # Test
+        for start in range(0, len(case_df.index), 2):
+            accumulator.add(case_df.iloc[start:start + 2])
+        result: pd.DataFrame = accumulator.generate_observation_period_table()
+
+        # Assert
+        pd.testing.assert_frame_equal(result, generate_observation_period_table(case_df))
+
+    def test_observation_period_accumulator_empty(self):
+        # Test
+        result: pd.DataFrame = ObservationPeriodAccumulator().generate_observation_period_table()
+
+        # Assert
+        self.assertTrue(result.empty)
+        self.assertIn('observation_period_id', result.columns)
+
+    def test_extract_csv_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Prepare
+            path: str = os.path.join(tmp_dir, "CASE.csv")
+            with open(path, "w") as file:
+                file.write("ID;PROVIDER_ID;PATIENT_ID\n1;1;7\n2;1;3\n3;2;5\n")
+
+            # Test
+            chunks: List[pd.DataFrame] = list(extract_csv_chunks(path, 2, columns=['PATIENT_ID']))
+
+        # Assert
+        self.assertListEqual([len(chunk.index) for chunk in chunks], [2, 1])
+        self.assertListEqual(list(chunks[1].columns), ['PATIENT_ID'])
+        self.assertListEqual(list(chunks[1].index), [2], "The index should continue over the chunks.")
+
+    @staticmethod
+    def _create_loader() -> DBManager:
+        return create_snapshot_loader({'ICD10GM': {'R50.9': 437663}, 'LOINC': {'1988-5': 3020460}})
+
+    def test_generate_visit_occurrence_table_valid(self):
+        # Prepare
+        case_data = {
+            CaseColumnsEnum.ID.value: [5, 5, 6],
+            CaseColumnsEnum.PROVIDER_ID.value: [1, 1, 2],
+            CaseColumnsEnum.PATIENT_ID.value: [1, 2, 3],
+            CaseColumnsEnum.START.value: ["2020-02-02", "2019-01-03", "2012-07-08"],
+            CaseColumnsEnum.END.value: ["2020-02-03", "2019-01-04", "2012-07-09"]
+        }
+        # Rows that were removed before leave gaps in the index
+        case_df: pd.DataFrame = pd.DataFrame(case_data, index=[0, 1, 4])
+        expected: pd.DataFrame = pd.DataFrame({
+            'visit_occurrence_id': [1, 2, 5],
+            'provider_id': [1, 1, 2],
+            'person_id': [1, 2, 3],
+            'visit_start_date': ["2020-02-02", "2019-01-03", "2012-07-08"],
+            'visit_end_date': ["2020-02-03", "2019-01-04", "2012-07-09"],
+            'visit_concept_id': 38004515,
+            'visit_type_concept_id': 44818518
+        }, index=[0, 1, 4])
+
+        # Test
+        result: pd.DataFrame = generate_visit_occurrence_table(case_df)
+
+        # Assert
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_generate_measurement_table_patientidentifikator(self):
+        # Prepare
+        lab_df: pd.DataFrame = pd.DataFrame({
+            'IDENTIFIER': [11125.0, None, 1720.0],
+            'PARAMETER_NAME': ["CRP", "CRP", "LH"],
+            'PARAMETER_LOINC': ["1988-5", "1988-5", "10501-5"],
+            'Patientidentifikator': ["P_0001125", "P_0001126", "P_0000720"],
+            'TEST_DATE': ["2020-04-29 09:38:45", "2020-04-29 09:38:45", "2020-05-19 11:58:45"],
+            'NUMERIC_VALUE': [12.0, 13.0, 33.0],
+            'UCUM_UNIT': ["mg/L", "mg/L", "[IU]/L"],
+            'IS_NORMAL': [0, 0, 1],
+            'DEVIATION': ["+", "+", None]
+        })
+
+        # Test
+        result: pd.DataFrame = generate_measurement_table(lab_df, self._create_loader())
+
+        # Assert
+        self.assertListEqual(list(result['measurement_id']), [11125, 1720])
+        self.assertListEqual(list(result['person_id']), [1125, 720], "The last four characters are the patient id.")
+        self.assertEqual(result['person_id'].dtype, 'int64')
+        self.assertListEqual(list(result['measurement_concept_id']), [3020460, 0])
+        self.assertListEqual(list(result['value_as_concept_id']), [4328749, 4124457])
+
+    def test_generate_condition_occurrence_table_valid(self):
+        # Prepare
+        diagnosis_df: pd.DataFrame = pd.DataFrame({
+            'PROVIDER_ID': [1, 1, 1],
+            'PATIENT_ID': [1, 2, 3],
+            'ADMISSION_DATE': ["2020-02-02", None, "2019-01-03"],
+            'ICD_PRIMARY_CODE': ["R50.9", "R50.9", "X99"],
+            'ICD_SECONDARY_CODE': ["R50.9", None, "-"],
+            'DIAGNOSIS_TYPE': ["HD", "HD", "ND"]
+        })
+
+        # Test
+        result: pd.DataFrame = generate_condition_occurrence_table(diagnosis_df, self._create_loader())
+
+        # Assert
+        self.assertListEqual(list(result['condition_occurrence_id']), [1, 2, 3])
+        self.assertEqual(result['condition_occurrence_id'].dtype, 'int64')
+        self.assertListEqual(list(result['person_id']), [1, 3, 1], "Secondary codes should follow the primary codes.")
+        self.assertListEqual(list(result['condition_concept_id']), [437663, 0, 437663])
+        self.assertListEqual(list(result['condition_type_concept_id']), [44786627, 44786629, 44786627])
+
+    def test_generate_condition_occurrence_table_first_id(self):
+        # Prepare
+        diagnosis_df: pd.DataFrame = pd.DataFrame({
+            'PROVIDER_ID': [1, 1],
+            'PATIENT_ID': [1, 2],
+            'ADMISSION_DATE': ["2020-02-02", "2019-01-03"],
+            'ICD_PRIMARY_CODE': ["R50.9", "X99"],
+            'ICD_SECONDARY_CODE': [None, "R50.9"],
+            'DIAGNOSIS_TYPE': ["HD", "ND"]
+        })
+
+        # Test
+        result: pd.DataFrame = generate_condition_occurrence_table(diagnosis_df, self._create_loader(), first_id=11)
+
+        # Assert
+        self.assertListEqual(list(result['condition_occurrence_id']), [11, 12, 13])
+
+    def test_get_condition_occurrence_first_ids(self):
+        # Prepare
+        diagnosis_df: pd.DataFrame = pd.DataFrame({
+            'PROVIDER_ID': [1, 1, 1, 1],
+            'PATIENT_ID': [1, 2, 3, 4],
+            'ADMISSION_DATE': ["2020-02-02", None, "2019-01-03", "2019-01-04"],
+            'ICD_PRIMARY_CODE': ["R50.9", "R50.9", "X99", "R50.9"],
+            'ICD_SECONDARY_CODE': ["R50.9", "R50.9", "-", "X99"],
+            'DIAGNOSIS_TYPE': ["HD", "HD", "ND", "HD"]
+        })
+        whole: pd.DataFrame = generate_condition_occurrence_table(diagnosis_df.copy(), self._create_loader())
+
+        # Test
+        first_ids = get_condition_occurrence_first_ids(diagnosis_df, [0, 2])
+        chunks = [generate_condition_occurrence_table(diagnosis_df.iloc[start:start + 2].copy(), self._create_loader(),
+                                                      first_id=first_id, first_secondary_id=first_secondary_id)
+                  for start, (first_id, first_secondary_id) in zip([0, 2], first_ids)]
+
+        # Assert
+        self.assertListEqual(first_ids, [(1, 4), (2, 5)])
+        self.assertListEqual(sorted(pd.concat(chunks)['condition_occurrence_id']),
+                             list(whole['condition_occurrence_id']))
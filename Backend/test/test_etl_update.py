@@ -0,0 +1,54 @@
+import datetime
+from unittest import TestCase
+
+from Backend.analysis.patient import Patient
+from Backend.common.config import DbConfig
+from Backend.common.database import DBManager
+from Backend.common.omop_enums import SnomedConcepts
+from Backend.etl.etl import get_concept_changes, update_patient, UPDATABLE_CONDITIONS, UPDATABLE_MEASUREMENTS
+
+
+class TestEtlUpdate(TestCase):
+
+    @staticmethod
+    def _create_patient(conditions, measurements) -> Patient:
+        patient = Patient(patient_id=1, name="example name", birthdate=datetime.date(2015, 3, 4),
+                          case_date=datetime.date.today())
+        for condition in conditions:
+            patient.add_condition(condition)
+        for measurement in measurements:
+            patient.add_high_measurement(measurement)
+        return patient
+
+    def test_get_concept_changes(self):
+        # Prepare
+        old_patient = self._create_patient([SnomedConcepts.FEVER_WITH_CHILLS.value, SnomedConcepts.COVID_19.value],
+                                           [SnomedConcepts.CRP.value])
+        update = self._create_patient([SnomedConcepts.FEVER.value, SnomedConcepts.KAWASAKI.value],
+                                      [SnomedConcepts.D_DIMER.value])
+
+        # Test
+        removed_conditions, added_conditions = get_concept_changes(old_patient, update, UPDATABLE_CONDITIONS)
+        removed_measurements, added_measurements = get_concept_changes(old_patient, update, UPDATABLE_MEASUREMENTS)
+
+        # Assert
+        self.assertListEqual(removed_conditions, [SnomedConcepts.COVID_19.value])
+        self.assertListEqual(added_conditions, [SnomedConcepts.KAWASAKI.value],
+                             "Symptoms that are present before and after the update should not be changed.")
+        self.assertListEqual(removed_measurements, [SnomedConcepts.CRP.value])
+        self.assertListEqual(added_measurements, [SnomedConcepts.D_DIMER.value])
+
+    def test_update_patient_without_db_connection(self):
+        # Prepare
+        invalid: str = "invalid"
+        config = DbConfig(db_name=invalid, db_schema=invalid, host="localhost",
+                          password=invalid, username=invalid, port="1234")
+        db_manager = DBManager(db_config=config, clear_tables=False)
+        old_patient = self._create_patient([SnomedConcepts.COVID_19.value], [])
+        update = self._create_patient([], [])
+
+        # Test
+        result = update_patient(old_patient, update, db_manager)
+
+        # Assert
+        self.assertFalse(result, "Should return False if the transaction can not be performed.")
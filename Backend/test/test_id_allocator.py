@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+from Backend.common.id_allocator import IdAllocator
+
+
+class TestIdAllocator(TestCase):
+
+    def test_allocate_queries_max_id_once(self):
+        # Prepare
+        allocator = IdAllocator()
+        calls = list()
+
+        def fetch_max_id() -> int:
+            calls.append(1)
+            return 41
+
+        # Test
+        first_ids = allocator.allocate("person", "person_id", 3, fetch_max_id)
+        second_ids = allocator.allocate("person", "person_id", 2, fetch_max_id)
+
+        # Assert
+        self.assertListEqual(first_ids, [42, 43, 44])
+        self.assertListEqual(second_ids, [45, 46], "Ids should never be handed out twice.")
+        self.assertEqual(len(calls), 1, "The highest id should only be queried once.")
+
+    def test_allocate_respects_min_id(self):
+        # Prepare
+        allocator = IdAllocator(min_id=10000)
+
+        # Test
+        ids = allocator.allocate("measurement", "measurement_id", 2, lambda: 5)
+
+        # Assert
+        self.assertListEqual(ids, [10000, 10001])
+
+    def test_allocate_nothing(self):
+        # Prepare
+        allocator = IdAllocator()
+
+        # Test
+        ids = allocator.allocate("measurement", "measurement_id", 0, lambda: self.fail("Should not query the database."))
+
+        # Assert
+        self.assertListEqual(ids, list())
+
+    def test_invalidate(self):
+        # Prepare
+        allocator = IdAllocator()
+        allocator.allocate("person", "person_id", 1, lambda: 10)
+        allocator.allocate("measurement", "measurement_id", 1, lambda: 10)
+
+        # Test
+        allocator.invalidate("person")
+        person_ids = allocator.allocate("person", "person_id", 1, lambda: 100)
+        measurement_ids = allocator.allocate("measurement", "measurement_id", 1, lambda: 100)
+        allocator.invalidate()
+        measurement_ids_after_reset = allocator.allocate("measurement", "measurement_id", 1, lambda: 0)
+
+        # Assert
+        self.assertListEqual(person_ids, [101], "Should query the highest id again after invalidation.")
+        self.assertListEqual(measurement_ids, [12], "Other tables should not be affected.")
+        self.assertListEqual(measurement_ids_after_reset, [1])
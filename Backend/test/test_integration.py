@@ -3,7 +3,7 @@ import os
 from unittest import TestCase
 
 from Backend.backend_interface import BackendManager
-from Backend.interface import Interface, PatientData, PatientId, Disease
+from Backend.interface import Interface, PatientData, PatientId, Disease, AnalysisState
 from config.definitions import ROOT_DIR
 
 
@@ -44,6 +44,8 @@ class TestIntegration(TestCase):
         self.assertTrue(result, "Should return true if successful.")
         patients = backend_manager.analysis_data
         self.assertNotEqual(len(patients), 0, "Patient list should not be empty after analysis and etl job.")
+        self.assertEqual(backend_manager.analysis_state, AnalysisState.READY)
+        self.assertTrue(backend_manager.is_analysis_ready)
 
         # Get first patient to get valid id
         first_patient_id: int = list(patients.keys())[0]
@@ -1,7 +1,7 @@
 import datetime
 from unittest import TestCase
 
-from Backend.analysis.patient import Patient
+from Backend.analysis.patient import Patient, SymptomGroup
 from Backend.common.omop_enums import SnomedConcepts
 
 
@@ -79,6 +79,75 @@ class TestPatient(TestCase):
         self.assertTrue(test_measurement in patient.high_measurements, "Measurement should be added by the method.")
         self.assertEqual(expected_size, len(patient.high_measurements), "Should not add any other measurements.")
 
+    def test_symptom_bitmask(self):
+        # Prepare
+        patient: Patient = Patient(patient_id=self.TEST_ID,
+                                   name=self.TEST_NAME,
+                                   birthdate=self.TEST_BIRTHDATE,
+                                   case_date=self.TEST_CASEDATE)
+
+        # Test
+        # Belongs to exanthem and enanthem
+        patient.add_condition(SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_VIRUS.value)
+        patient.add_condition(SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_VIRUS.value)
+        patient.add_high_measurement(SnomedConcepts.D_DIMER.value)
+        # Unknown ids shouldn't set any bits
+        patient.add_condition(12345)
+
+        # Assert
+        self.assertEqual(2, len(patient.conditions), "Conditions should only be stored once.")
+        self.assertEqual(SymptomGroup.EXANTHEM.bit | SymptomGroup.ENANTHEM.bit | SymptomGroup.COAGULOPATHY.bit,
+                         patient.symptoms, "Should set the bits of all symptom groups of the added ids.")
+        self.assertTrue(patient.has_exanthem())
+        self.assertTrue(patient.has_enanthem())
+        self.assertTrue(patient.has_coagulopathy())
+        self.assertFalse(patient.has_fever())
+
+    def test_add_condition_float_ids(self):
+        """
+        Ids read from columns with missing values are floats and should be stored as integers, sorted and only once.
+        """
+        # Prepare
+        patient: Patient = Patient(patient_id=self.TEST_ID,
+                                   name=self.TEST_NAME,
+                                   birthdate=self.TEST_BIRTHDATE,
+                                   case_date=self.TEST_CASEDATE)
+
+        # Test
+        patient.add_condition(float(SnomedConcepts.MYOCARDITIS.value))
+        patient.add_condition(12345)
+        patient.add_condition(SnomedConcepts.MYOCARDITIS.value)
+        patient.add_high_measurement(float(SnomedConcepts.D_DIMER.value))
+
+        # Assert
+        self.assertListEqual(sorted([12345, SnomedConcepts.MYOCARDITIS.value]), patient.conditions.tolist())
+        self.assertTrue(patient.has_myocarditis())
+        self.assertFalse(patient.has_pericarditis())
+        self.assertTrue(patient.has_coagulopathy())
+
+    def test_compact_representation(self):
+        # Prepare
+        patient: Patient = Patient(patient_id=self.TEST_ID,
+                                   name=self.TEST_NAME,
+                                   birthdate=datetime.date(2020, 1, 1),
+                                   case_date=datetime.date(2021, 1, 1))
+        patient.add_condition(SnomedConcepts.KAWASAKI.value)
+        patient.add_condition(SnomedConcepts.FEVER.value)
+
+        # Test
+        patient.calculate_kawasaki_score()
+        patient.calculate_pims_score()
+
+        # Assert
+        self.assertFalse(hasattr(patient, '__dict__'), "Patient should only use slots.")
+        self.assertListEqual(patient.reasons_for_kawasaki, [Patient.REASON_YOUNGER_THAN_EIGHT, Patient.REASON_FEVER,
+                                                            Patient.REASON_KAWASAKI],
+                             "Reasons should be listed in the order they are checked.")
+        self.assertListEqual(patient.reasons_for_pims, [Patient.REASON_YOUNGER_THAN_TWENTY, Patient.REASON_FEVER,
+                                                        Patient.REASON_KAWASAKI])
+        self.assertNotIn(Patient.REASON_KAWASAKI_SYMPTOMS, patient.missing_for_pims,
+                         "Kawasaki symptoms shouldn't be missing with a kawasaki diagnosis.")
+
     def test_add_procedure(self):
         # Prepare
         patient: Patient = Patient(patient_id=self.TEST_ID,
@@ -0,0 +1,76 @@
+import datetime
+import random
+from unittest import TestCase
+
+import numpy as np
+
+from Backend.analysis.patient import Patient
+from Backend.analysis.scoring import SymptomGroup, build_feature_matrix, score_patients
+from Backend.common.omop_enums import SnomedConcepts
+
+
+class TestScoring(TestCase):
+
+    CASE_DATE: datetime.date = datetime.date(2021, 6, 1)
+    # Conditions and measurements that are relevant for at least one symptom group, and some that are not
+    CONDITIONS = [SnomedConcepts.FEVER.value, SnomedConcepts.ERUPTION.value, SnomedConcepts.SWELLING.value,
+                  SnomedConcepts.ACUTE_CONJUNCTIVITIS.value, SnomedConcepts.LYMPHADENOPATHY.value,
+                  SnomedConcepts.DISORDER_OF_LIP.value, SnomedConcepts.SKIN_OR_MUCOSA_FINDING_DUE_TO_VIRUS.value,
+                  SnomedConcepts.MYOCARDITIS.value, SnomedConcepts.PERICARDIAL_EFFUSION.value,
+                  SnomedConcepts.NAUSEA_AND_VOMITING.value, SnomedConcepts.COVID_19.value,
+                  SnomedConcepts.KAWASAKI.value, SnomedConcepts.PIMS.value, 12345]
+    MEASUREMENTS = [3020460, 3000905, SnomedConcepts.D_DIMER.value, SnomedConcepts.PT.value, 54321]
+
+    def _create_random_patients(self, count: int) -> list:
+        rng = random.Random(42)
+        patients = list()
+        for patient_id in range(count):
+            birthdate = self.CASE_DATE - datetime.timedelta(days=rng.randint(0, 25 * 365))
+            patient = Patient(patient_id, "", birthdate, self.CASE_DATE)
+            for condition in rng.sample(self.CONDITIONS, rng.randint(0, 6)):
+                patient.add_condition(condition)
+            for measurement in rng.sample(self.MEASUREMENTS, rng.randint(0, 3)):
+                patient.add_high_measurement(measurement)
+            patients.append(patient)
+        return patients
+
+    def test_feature_matrix(self):
+        # Prepare
+        patient = Patient(1, "", datetime.date(2015, 6, 2), self.CASE_DATE)
+        patient.add_condition(SnomedConcepts.FEVER.value)
+        patient.add_high_measurement(SnomedConcepts.D_DIMER.value)
+
+        # Test
+        features, ages = build_feature_matrix([patient])
+
+        # Assert
+        self.assertEqual(features.shape, (1, len(SymptomGroup)))
+        self.assertListEqual(np.flatnonzero(features[0]).tolist(),
+                             [SymptomGroup.FEVER, SymptomGroup.COAGULOPATHY])
+        self.assertEqual(ages[0], 5, "Age should be calculated like Patient.calculate_age.")
+
+    def test_scores_equal_patient_methods(self):
+        # Prepare
+        patients = self._create_random_patients(2000)
+
+        # Test
+        kawasaki_scores, pims_scores = score_patients(patients)
+
+        # Assert
+        expected_kawasaki = [patient.calculate_kawasaki_score() for patient in patients]
+        expected_pims = [patient.calculate_pims_score() for patient in patients]
+        self.assertListEqual(kawasaki_scores.tolist(), expected_kawasaki,
+                             "Should give exactly the same kawasaki scores as the patient.")
+        self.assertListEqual(pims_scores.tolist(), expected_pims,
+                             "Should give exactly the same pims scores as the patient.")
+        # Make sure all score levels are covered by the random patients
+        self.assertSetEqual(set(expected_kawasaki), {0.0, 0.5, 0.75, 1.0})
+        self.assertSetEqual(set(expected_pims), {0.0, 0.5, 0.75, 1.0})
+
+    def test_score_no_patients(self):
+        # Test
+        kawasaki_scores, pims_scores = score_patients([])
+
+        # Assert
+        self.assertEqual(len(kawasaki_scores), 0)
+        self.assertEqual(len(pims_scores), 0)
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from Backend.common.vocabulary_snapshot import VocabularySnapshot
+
+
+class TestVocabularySnapshot(TestCase):
+
+    def test_get_snomed_ids(self):
+        # Prepare
+        mappings = {
+            'LOINC': pd.DataFrame({'concept_code': ['2483-6', '1988-5', '1988-5'],
+                                   'snomed_id': [30, 3020460, 99]}),
+            'OPS': pd.DataFrame({'concept_code': [], 'snomed_id': []})
+        }
+        snapshot = VocabularySnapshot(mappings)
+
+        # Test
+        loinc_ids = snapshot.get_snomed_ids(['1988-5', '2483-6', '0000-0', 'ZZZ'], 'LOINC')
+        ops_ids = snapshot.get_snomed_ids(['1-100'], 'OPS')
+        unknown_vocabulary_ids = snapshot.get_snomed_ids(['R50.9'], 'ICD10GM')
+
+        # Assert
+        self.assertEqual(len(snapshot), 2, "Duplicated codes should only be stored once.")
+        self.assertDictEqual(loinc_ids, {'1988-5': 3020460, '2483-6': 30, '0000-0': 0, 'ZZZ': 0},
+                             "Should keep the first mapping of a code and return 0 for unknown codes.")
+        self.assertDictEqual(ops_ids, {'1-100': 0})
+        self.assertDictEqual(unknown_vocabulary_ids, {'R50.9': 0})
+
+    def test_save_and_load(self):
+        # Prepare
+        mappings = {'ICD10GM': pd.DataFrame({'concept_code': ['R50.9', 'A00'], 'snomed_id': [437663, 1]})}
+        snapshot = VocabularySnapshot(mappings, {'created': '2021-12-01'})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "snapshot.npz")
+
+            # Test
+            snapshot.save(path)
+            loaded = VocabularySnapshot.load(path)
+
+        # Assert
+        self.assertEqual(loaded.vocabulary_ids, ['ICD10GM'])
+        self.assertEqual(loaded.metadata['created'], '2021-12-01')
+        self.assertEqual(loaded.metadata['format_version'], VocabularySnapshot.FORMAT_VERSION)
+        self.assertEqual(loaded.get_snomed_id('R50.9', 'ICD10GM'), 437663)
+        self.assertEqual(loaded.get_snomed_id('A00', 'ICD10GM'), 1)
+
+    def test_load_unsupported_version(self):
+        # Prepare
+        snapshot = VocabularySnapshot({'OPS': pd.DataFrame({'concept_code': ['1-100'], 'snomed_id': [1]})})
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "snapshot.npz")
+            snapshot.FORMAT_VERSION = VocabularySnapshot.FORMAT_VERSION + 1
+            snapshot.save(path)
+
+            # Test / Assert
+            self.assertRaises(ValueError, VocabularySnapshot.load, path)
@@ -1,17 +1,70 @@
+import hashlib
+import logging
+import os
 import pandas as pd
-from typing import List
+from typing import List, Optional
 
+try:
+    import pyarrow
+except ImportError:
+    # Optional, the csv files are not staged without it
+    pyarrow = None
 
-def extract_csv(path: str) -> pd.DataFrame:
+# Has to be increased whenever the staged frames change without a change of the csv files
+STAGING_FORMAT_VERSION: int = 1
+# Size of the blocks the csv files are hashed in
+HASH_BLOCK_SIZE: int = 1 << 20
+
+
+def extract_csv(path: str, staging_dir: Optional[str] = None) -> pd.DataFrame:
     """
     Generates a pandas data frame out of a csv file, which is located under the given path.
 
+    If a staging directory is given, the data frame is cached there as a Parquet file, that is keyed by the content
+    hash of the csv file and STAGING_FORMAT_VERSION. If the same content is extracted again, the memory-mapped Parquet
+    file is read instead of parsing the csv file. Staging requires pyarrow, without it or if the staged file can't be
+    read or written, the csv file is parsed as usual.
+
     :param path: Path to the csv file
+    :param staging_dir: Optional directory the extracted csv files are staged in
     :return: a pandas dataframe of the csv file
     """
-    import os
-    os.listdir()
-    return pd.read_csv(path,  sep=';')
+    if not staging_dir:
+        return pd.read_csv(path, sep=';')
+    if pyarrow is None:
+        logging.warning("Staging the extracted csv files requires pyarrow.")
+        return pd.read_csv(path, sep=';')
+
+    file_hash = hashlib.sha256(f"{STAGING_FORMAT_VERSION}:".encode())
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            file_hash.update(block)
+    name: str = os.path.splitext(os.path.basename(path))[0]
+    staged_path: str = os.path.join(staging_dir, f"{name}-{file_hash.hexdigest()[:32]}.parquet")
+    if os.path.isfile(staged_path):
+        try:
+            df: pd.DataFrame = pd.read_parquet(staged_path, engine='pyarrow', memory_map=True)
+            logging.info(f"Read {path} from the staged file {staged_path}.")
+            return df
+        except (OSError, ValueError) as error:
+            logging.warning(f"Could not read the staged file {staged_path}. Extracting {path} again.")
+            logging.warning(error)
+
+    df: pd.DataFrame = pd.read_csv(path, sep=';')
+    # Write to a temporary file first, so a staged file is never read half written
+    tmp_path: str = f"{staged_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(staging_dir, exist_ok=True)
+        df.to_parquet(tmp_path, engine='pyarrow')
+        os.replace(tmp_path, staged_path)
+        logging.info(f"Staged {path} at {staged_path}.")
+    except (OSError, ValueError) as error:
+        # The etl job doesn't depend on the cache
+        logging.warning(f"Could not stage {path}.")
+        logging.warning(error)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
 
 
 def extract_all(paths: str) -> List[pd.DataFrame]:
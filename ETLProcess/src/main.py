@@ -11,12 +11,12 @@ from load import DBManager, OmopTableEnum, DbConfig
 from typing import Tuple, Optional, Dict
 
 
-def generate_config() -> Tuple[str, DbConfig]:
+def generate_config() -> Tuple[str, DbConfig, Optional[str]]:
     """
     Combines the config-file and command line arguments to one configuration, including database credentials and the
     path to the input directory.
 
-    :return: dir with csv files, config options for the db
+    :return: dir with csv files, config options for the db, optional staging dir for the extracted csv files
     """
     # path to default config file
     config_path = "config.yml"
@@ -25,7 +25,7 @@ def generate_config() -> Tuple[str, DbConfig]:
     argv = sys.argv[1:]
 
     # parse cmd options
-    opts, args = getopt.getopt(argv, "H:P:N:u:p:S:D:C:l:h", ["host =",
+    opts, args = getopt.getopt(argv, "H:P:N:u:p:S:D:C:l:s:h", ["host =",
                                                               "port =",
                                                               "db_name =",
                                                               "username =",
@@ -33,11 +33,13 @@ def generate_config() -> Tuple[str, DbConfig]:
                                                               "db_schema =",
                                                               "csv_dir =",
                                                               "config_file =",
-                                                              "log_level =" 
+                                                              "log_level =",
+                                                              "staging_dir =",
                                                               "help"])
     tmp_dict: dict = {}
     tmp_csv_dir: Optional[str] = None
     tmp_log_level: Optional[int] = None
+    tmp_staging_dir: Optional[str] = None
     for opt, arg in opts:
         opt = opt.strip()
         arg = arg.strip()
@@ -59,6 +61,8 @@ def generate_config() -> Tuple[str, DbConfig]:
             config_path = arg
         elif opt in ("-l", "--log_level"):
             tmp_log_level = int(arg)
+        elif opt in ("-s", "--staging_dir"):
+            tmp_staging_dir = arg
         elif opt in ("-h", "--help"):
             print('''CMD Options:
             -H, --host      \t host of the postgres-DB
@@ -80,6 +84,7 @@ def generate_config() -> Tuple[str, DbConfig]:
                                     - INFO = 20
                                     - DEBUG = 10
                                     - NOTSET = 0
+            -s, --staging_dir \t directory the extracted csv files are cached in (optional)
             -h, --help      \t opens this menu
             ''')
             sys.exit(0)
@@ -92,6 +97,8 @@ def generate_config() -> Tuple[str, DbConfig]:
     if all(key in data for key in ["db_config", "csv_dir", "log_level"]):
         data["db_config"].update(tmp_dict)
         data["csv_dir"] = tmp_csv_dir if tmp_csv_dir is not None else data["csv_dir"]
+        # staging_dir is optional
+        data["staging_dir"] = tmp_staging_dir if tmp_staging_dir is not None else data.get("staging_dir")
 
         # set log_level
         tmp_log_level = tmp_log_level if tmp_log_level is not None else data["log_level"]
@@ -135,10 +142,10 @@ def generate_config() -> Tuple[str, DbConfig]:
         logging.error("Shutting down ETL-process due to wrong configuration.")
         sys.exit(0)
 
-    return data["csv_dir"], data["db_config"]
+    return data["csv_dir"], data["db_config"], data["staging_dir"]
 
 
-def run_etl_job(csv_dir: str, db_config: DbConfig):
+def run_etl_job(csv_dir: str, db_config: DbConfig, staging_dir: Optional[str] = None):
     """
     Runs the entire ETL-Job.
     First all csv files are transformed into pandas dataframes. Then they are transformed into omop compliant tables.
@@ -146,18 +153,22 @@ def run_etl_job(csv_dir: str, db_config: DbConfig):
 
     :param csv_dir: Directory containing PERSON.csv, ..
     :param db_config: dict with keys: [host, port, db_name, username, password, db_schema]
+    :param staging_dir: Optional directory the extracted csv files are cached in, see extract.extract_csv
     :return: void
     """
     # extract original csv files
     cwd = os.getcwd()
+    if staging_dir:
+        # Relative to the current directory, not to the csv dir
+        staging_dir = os.path.abspath(staging_dir)
     os.chdir(csv_dir)
 
     logging.info("Extracting data from the given csv files...")
-    person_df: pd.DataFrame = extract.extract_csv("PERSON.csv")
-    case_df: pd.DataFrame = extract.extract_csv("CASE.csv")
-    lab_df: pd.DataFrame = extract.extract_csv("LAB.csv")
-    diagnosis_df: pd.DataFrame = extract.extract_csv("DIAGNOSIS.csv")
-    procedure_df: pd.DataFrame = extract.extract_csv("PROCEDURE.csv")
+    person_df: pd.DataFrame = extract.extract_csv("PERSON.csv", staging_dir)
+    case_df: pd.DataFrame = extract.extract_csv("CASE.csv", staging_dir)
+    lab_df: pd.DataFrame = extract.extract_csv("LAB.csv", staging_dir)
+    diagnosis_df: pd.DataFrame = extract.extract_csv("DIAGNOSIS.csv", staging_dir)
+    procedure_df: pd.DataFrame = extract.extract_csv("PROCEDURE.csv", staging_dir)
     # Remove all rows with missing data
     procedure_df = procedure_df.dropna()
 
@@ -193,7 +204,7 @@ def run_etl_job(csv_dir: str, db_config: DbConfig):
 
 
 if __name__ == "__main__":
-    csv_dir, db_config = generate_config()
-    run_etl_job(csv_dir, db_config)
+    csv_dir, db_config, staging_dir = generate_config()
+    run_etl_job(csv_dir, db_config, staging_dir)
 
 
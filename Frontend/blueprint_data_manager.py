@@ -89,11 +89,26 @@ def upload_page():
 @data_manager.route("/etl/run", methods=["POST"])
 def run_etl():
     """
-    run the etl job
+    start the etl job in the background
+
+    :return: success - the job was started; job_id - to poll the progress with
     """
     controller.reset_config()
-    success = controller.run_etl(upload_folder)
-    return jsonify({"success": success})
+    job_id = controller.start_etl(upload_folder)
+    return jsonify({"success": job_id is not None, "job_id": job_id})
+
+
+@data_manager.route("/etl/jobs/<job_id>")
+def get_etl_job(job_id: str):
+    """
+    progress of an etl job
+
+    :return: state, progress and stages of the job
+    """
+    job = controller.get_etl_job(job_id)
+    if job is None:
+        return jsonify({"success": False}), 404
+    return jsonify(job)
 
 
 @data_manager.route('/etl/upload', methods=['POST'])
@@ -24,6 +24,10 @@ def check_login():
         # needed or the logo is missing in the login form
         return None
 
+    elif request.endpoint == "ready":
+        # needed for readiness probes of the container orchestration
+        return None
+
     if "logged_in" not in session or not session["logged_in"]:
         flash("Bitte loggen Sie sich zuerst ein.", FlashMessageTypes.FAILURE.value)
         return redirect(url_for("access_control.login"))
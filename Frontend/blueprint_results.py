@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, flash
+from Frontend.FlashMessageTypes import FlashMessageTypes
 from Backend.backend_interface import BackendManager
-from Backend.interface import PatientId, Interface, DecisionReasons, Disease, PatientData
+from Backend.interface import PatientId, Interface, DecisionReasons, Disease, PatientData, AnalysisState
 
 controller: Interface = BackendManager()
 
@@ -12,8 +13,14 @@ results = Blueprint("results", __name__)
 @results.route("/all")
 def get_analysis():
     """
-    render analysis template
+    render analysis template, serves the last complete results while an analysis is running
     """
+    if controller.analysis_state == AnalysisState.RUNNING:
+        flash("Die Analyse läuft im Hintergrund. Es werden die Ergebnisse der letzten Analyse angezeigt.",
+              FlashMessageTypes.WARNING.value)
+    elif controller.analysis_state == AnalysisState.FAILED:
+        flash("Die Analyse ist fehlgeschlagen. Es werden die Ergebnisse der letzten Analyse angezeigt.",
+              FlashMessageTypes.FAILURE.value)
     return render_template("analysis.html", pagename="Analyse", analysis_data=controller.analysis_data)
 
 
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, send_from_directory, request, redirect, url_for
+from flask import Flask, render_template, send_from_directory, request, redirect, url_for, jsonify
 from datetime import timedelta
 from Backend.interface import Interface, TranslationGerman, TranslationPercentagePims, TranslationPercentageKawasaki
 from Backend.backend_interface import BackendManager
@@ -61,6 +61,17 @@ def favicon():
     return send_from_directory(os.path.join(app.root_path, 'static'), 'Icons/favicon.ico', mimetype='image/vnd.microsoft.icon')
 
 
+@app.route("/ready")
+def ready():
+    """
+    readiness of the application: ready as soon as analysis results can be served
+
+    :return: state of the analysis, status code 503 if not ready
+    """
+    is_ready = controller.is_analysis_ready
+    return jsonify({"ready": is_ready, "state": controller.analysis_state.value}), 200 if is_ready else 503
+
+
 @app.route("/")
 def main():
     """
@@ -90,4 +101,7 @@ def set_color():
 
 
 if __name__ == "__main__":
+    # analyse the patients in the background, so the server can start right away. Only if the module runs as main,
+    # because the worker processes of the etl job import it again (see Backend.etl.parallel)
+    controller.start_analysis()
     app.run(host='0.0.0.0', port=8080)